@@ -4,11 +4,12 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
 # Importamos TODOS los modelos nuevos
 from .models import Reporte, PerfilCiudadano, Noticia, Pozo, Pipa, Validacion
+from .despacho import asignar_cercana, cola_escasez, despachar_lote
 
 # 1. Configuración de PIPAS (Nuevo)
 @admin.register(Pipa)
 class PipaAdmin(GISModelAdmin):
-    list_display = ('numero_economico', 'estado', 'chofer', 'capacidad_litros')
+    list_display = ('numero_economico', 'estado', 'chofer', 'capacidad_litros', 'ubicacion_fecha')
     list_filter = ('estado',)
     search_fields = ('numero_economico', 'chofer')
     # Mapa para ver ubicación de la pipa (si tuviera GPS real)
@@ -34,6 +35,9 @@ class ReporteAdmin(GISModelAdmin):
     
     # Orden
     ordering = ('-fecha_hora',)
+
+    # Despacho de pipas
+    actions = ['asignar_pipa_cercana', 'despachar_en_lote']
     
     # Configuración del Mapa
     gis_widget_kwargs = {
@@ -44,6 +48,31 @@ class ReporteAdmin(GISModelAdmin):
         },
     }
 
+    @admin.action(description='Asignar la pipa disponible más cercana')
+    def asignar_pipa_cercana(self, request, queryset):
+        # Como en la API: solo ESCASEZ abiertos y sin pipa; lo demás de la selección se ignora
+        aviso = self._ignorados(queryset)
+        asignados = 0
+        for reporte in cola_escasez(queryset):
+            # None: sin pipas libres o ninguna a menos de DESPACHO_MAX_KM de este reporte
+            if asignar_cercana(reporte) is not None:
+                asignados += 1
+        self.message_user(request, f'{asignados} reportes con pipa asignada{aviso}.')
+
+    @admin.action(description='Despachar pipas en lote (asignación óptima)')
+    def despachar_en_lote(self, request, queryset):
+        aviso = self._ignorados(queryset)
+        asignaciones, pipas_libres, pendientes = despachar_lote(queryset)
+        self.message_user(
+            request,
+            f'{len(asignaciones)} asignados; quedan {pipas_libres} pipas libres y {pendientes} reportes sin pipa{aviso}.',
+        )
+
+    def _ignorados(self, queryset):
+        # Se cuenta antes de asignar: después los asignados ya no están en la cola
+        ignorados = queryset.count() - cola_escasez(queryset).count()
+        return f' ({ignorados} ignorados: no son ESCASEZ abiertos sin pipa)' if ignorados else ''
+
 # 3. Configuración del PERFIL dentro del Usuario
 class PerfilInline(admin.StackedInline):
     model = PerfilCiudadano
@@ -0,0 +1,141 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+
+from .models import EstadisticaDiaria, EstadisticaHoraria, EstadisticaResolucion
+
+# granularidad -> (unidad de date_trunc, paso de generate_series, duración aproximada)
+GRANULARIDADES = {
+    'hora': ('hour', '1 hour', timedelta(hours=1)),
+    'dia': ('day', '1 day', timedelta(days=1)),
+    'semana': ('week', '1 week', timedelta(weeks=1)),
+    'mes': ('month', '1 month', timedelta(days=30)),
+}
+DIMENSIONES = ('tipo_problema', 'status', 'colonia')
+PERCENTILES = (50, 90, 95)
+
+
+def cubetas_en(desde, hasta, granularidad):
+    return int((hasta - desde) / GRANULARIDADES[granularidad][2]) + 1
+
+
+def _filtros(filtros, dimensiones):
+    condiciones, params = [], {}
+    for dimension, valores in filtros.items():
+        if dimension in dimensiones and valores:
+            condiciones.append(f'AND x.{dimension} = ANY(%({dimension})s)')
+            params[dimension] = list(valores)
+    return ' '.join(condiciones), params
+
+
+# Rango en hora local: de la cubeta de `desde` a la de `hasta`, ambas completas
+RANGO = """
+    rango AS (
+        SELECT date_trunc(%(unidad)s, %(desde)s::timestamptz AT TIME ZONE %(zona)s) AS inicio,
+               date_trunc(%(unidad)s, %(hasta)s::timestamptz AT TIME ZONE %(zona)s) + %(paso)s::interval AS fin
+    ), cubetas AS (
+        SELECT generate_series(inicio, fin - %(paso)s::interval, %(paso)s::interval) AS t FROM rango
+    )
+"""
+
+
+# ---------------------------------------------------------------------
+# SERIES DE CONTEO (rollup por hora o por día, huecos en 0 con generate_series)
+# ---------------------------------------------------------------------
+def serie(desde, hasta, granularidad, por=None, filtros=None):
+    """[(grupo, t, total)] ordenado por grupo y tiempo; grupo es None sin `por`.
+
+    Por hora se lee EstadisticaHoraria; de día en adelante, EstadisticaDiaria:
+    un año por semana son ~365 días × combinaciones, no 8760 horas.
+    """
+    unidad, paso, _ = GRANULARIDADES[granularidad]
+    if granularidad == 'hora':
+        tabla = EstadisticaHoraria._meta.db_table
+        local = 'x.hora AT TIME ZONE %(zona)s'
+        en_rango = 'x.hora >= rango.inicio AT TIME ZONE %(zona)s AND x.hora < rango.fin AT TIME ZONE %(zona)s'
+    else:
+        tabla = EstadisticaDiaria._meta.db_table
+        local = 'x.fecha::timestamp'
+        en_rango = 'x.fecha >= rango.inicio::date AND x.fecha < rango.fin::date'
+    condiciones, params = _filtros(filtros or {}, DIMENSIONES)
+    grupo = f'x.{por}' if por else 'NULL::varchar'
+    # Sin `por` siempre hay una serie (en ceros si no hubo reportes)
+    grupos = 'SELECT DISTINCT grupo FROM datos' if por else 'SELECT NULL::varchar AS grupo'
+
+    params.update(unidad=unidad, paso=paso, desde=desde, hasta=hasta, zona=settings.TIME_ZONE)
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            WITH {RANGO}, datos AS (
+                SELECT date_trunc(%(unidad)s, {local}) AS t, {grupo} AS grupo, sum(x.total) AS total
+                FROM {tabla} x, rango
+                WHERE {en_rango} {condiciones}
+                GROUP BY 1, 2
+            ), grupos AS ({grupos})
+            SELECT g.grupo, c.t, coalesce(d.total, 0)
+            FROM grupos g
+            CROSS JOIN cubetas c
+            LEFT JOIN datos d ON d.t = c.t AND d.grupo IS NOT DISTINCT FROM g.grupo
+            ORDER BY g.grupo, c.t
+        """, params)
+        return cursor.fetchall()
+
+
+# ---------------------------------------------------------------------
+# TIEMPO DE RESOLUCIÓN (percentiles sobre el histograma diario)
+# ---------------------------------------------------------------------
+def horas_de_cubeta(cubeta):
+    """Centro geométrico de la cubeta del histograma, en horas."""
+    if cubeta is None:
+        return None
+    return round(2 ** ((cubeta + 0.5) / EstadisticaResolucion.CUBETAS_POR_OCTAVA) / 60, 2)
+
+
+def percentiles(desde, hasta, granularidad=None, por=None, filtros=None):
+    """[(grupo, t, resueltos, p50, p90, p95)] con los percentiles en horas.
+
+    El histograma es diario: con granularidad 'hora' las cubetas son días.
+    Sin granularidad sale una sola fila por grupo para todo el rango (t = None).
+    `por` o filtros de status no aplican: todo lo resuelto tiene el mismo.
+    """
+    unidad, paso, _ = GRANULARIDADES['dia' if granularidad in (None, 'hora') else granularidad]
+    dimensiones = ('tipo_problema', 'colonia')
+    condiciones, params = _filtros(filtros or {}, dimensiones)
+    por = por if por in dimensiones else None
+    grupo = f'x.{por}' if por else 'NULL::varchar'
+    t = 'date_trunc(%(unidad)s, x.fecha::timestamp)' if granularidad else 'NULL::timestamp'
+    grupos = 'SELECT DISTINCT grupo FROM histograma' if por else 'SELECT NULL::varchar AS grupo'
+    tiempos = 'cubetas' if granularidad else '(SELECT NULL::timestamp AS t)'
+    por_percentil = ', '.join(
+        f'min(cubeta) FILTER (WHERE acumulado >= {p / 100} * resueltos) AS p{p}' for p in PERCENTILES
+    )
+
+    params.update(unidad=unidad, paso=paso, desde=desde, hasta=hasta, zona=settings.TIME_ZONE)
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            WITH {RANGO}, histograma AS (
+                SELECT {t} AS t, {grupo} AS grupo, x.cubeta, sum(x.total) AS n
+                FROM {EstadisticaResolucion._meta.db_table} x, rango
+                WHERE x.fecha >= rango.inicio::date AND x.fecha < rango.fin::date {condiciones}
+                GROUP BY 1, 2, 3
+                HAVING sum(x.total) > 0
+            ), acumulado AS (
+                SELECT t, grupo, cubeta,
+                       sum(n) OVER (PARTITION BY t, grupo ORDER BY cubeta) AS acumulado,
+                       sum(n) OVER (PARTITION BY t, grupo) AS resueltos
+                FROM histograma
+            ), resumen AS (
+                SELECT t, grupo, max(resueltos)::bigint AS resueltos, {por_percentil}
+                FROM acumulado
+                GROUP BY 1, 2
+            ), grupos AS ({grupos})
+            SELECT g.grupo, c.t, coalesce(r.resueltos, 0), {', '.join(f'r.p{p}' for p in PERCENTILES)}
+            FROM grupos g
+            CROSS JOIN {tiempos} c
+            LEFT JOIN resumen r ON r.t IS NOT DISTINCT FROM c.t AND r.grupo IS NOT DISTINCT FROM g.grupo
+            ORDER BY g.grupo, c.t
+        """, params)
+        return [
+            (grupo, t, resueltos, *map(horas_de_cubeta, cubetas))
+            for grupo, t, resueltos, *cubetas in cursor.fetchall()
+        ]
@@ -0,0 +1,81 @@
+import json
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+
+# ---------------------------------------------------------------------
+# RESUMEN DE TIEMPOS (lo comparten bench_consultas y bench_carga)
+# ---------------------------------------------------------------------
+def resumen(tiempos_ms, segundos=None):
+    """p50/p95/p99 en ms; con `segundos` (duración de la corrida) también el throughput."""
+    tiempos = np.asarray(tiempos_ms, dtype=float)
+    if not len(tiempos):
+        return {'n': 0}
+    p50, p95, p99 = np.percentile(tiempos, [50, 95, 99])
+    datos = {
+        'n': len(tiempos),
+        'min_ms': round(float(tiempos.min()), 3),
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'max_ms': round(float(tiempos.max()), 3),
+        'media_ms': round(float(tiempos.mean()), 3),
+    }
+    if segundos:
+        datos['por_segundo'] = round(len(tiempos) / segundos, 1)
+    return datos
+
+
+def medir(funcion, repeticiones, calentamiento=1):
+    """Tiempos en ms de `repeticiones` llamadas, tras descartar las de calentamiento."""
+    for _ in range(calentamiento):
+        funcion()
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(1000 * (time.perf_counter() - inicio))
+    return tiempos
+
+
+# ---------------------------------------------------------------------
+# RESULTADOS EN JSON (para comparar contra una corrida anterior)
+# ---------------------------------------------------------------------
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def guardar(ruta, tipo, parametros, casos):
+    """Escribe {tipo, fecha, commit, maquina, parametros, casos: {nombre: resumen}}."""
+    datos = {
+        'tipo': tipo,
+        'fecha': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': _commit(),
+        'maquina': {'python': platform.python_version(), 'sistema': platform.platform()},
+        'parametros': parametros,
+        'casos': casos,
+    }
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(datos, archivo, indent=2, ensure_ascii=False)
+    return datos
+
+
+def comparar(casos, ruta_base, metrica='p95_ms', tolerancia=0.10):
+    """[(nombre, antes, ahora, cambio)] de los casos que empeoraron más que `tolerancia`."""
+    with open(ruta_base, encoding='utf-8') as archivo:
+        base = json.load(archivo)['casos']
+    regresiones = []
+    for nombre, datos in casos.items():
+        antes, ahora = base.get(nombre, {}).get(metrica), datos.get(metrica)
+        if antes and ahora and ahora > antes * (1 + tolerancia):
+            regresiones.append((nombre, antes, ahora, ahora / antes - 1))
+    return regresiones
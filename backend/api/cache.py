@@ -0,0 +1,107 @@
+import os
+import shutil
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .geo import tiles_en_bbox
+
+
+# ---------------------------------------------------------------------
+# VERSIONES: cada escritura sube la versión y las llaves viejas mueren solas
+# ---------------------------------------------------------------------
+def version(nombre):
+    return cache.get_or_set(f'version:{nombre}', 1, None)
+
+
+def incrementar_version(nombre):
+    llave = f'version:{nombre}'
+    try:
+        return cache.incr(llave)
+    except ValueError:
+        # La llave expiró o nunca existió (p. ej. caché recién reiniciada)
+        cache.add(llave, 1, None)
+        return cache.incr(llave)
+
+
+# ---------------------------------------------------------------------
+# CACHÉ DE TILES EN DISCO (acotada, se poda por antigüedad de uso)
+# ---------------------------------------------------------------------
+_escrituras = 0
+
+
+def ruta_tile(capa, z, x, y):
+    return Path(settings.TILES_CACHE_DIR) / capa / str(z) / str(x) / f'{y}.pbf'
+
+
+def leer_tile(capa, z, x, y):
+    ruta = ruta_tile(capa, z, x, y)
+    try:
+        modificado = ruta.stat().st_mtime
+        if time.time() - modificado > settings.TILES_CACHE_SEGUNDOS:
+            return None
+        contenido = ruta.read_bytes()
+        # Marcamos el acceso para que la poda respete los tiles más usados
+        os.utime(ruta, (time.time(), modificado))
+    except FileNotFoundError:
+        return None
+    return contenido
+
+
+def guardar_tile(capa, z, x, y, contenido):
+    global _escrituras
+    if z > settings.TILES_CACHE_ZOOM_MAX:
+        return
+    ruta = ruta_tile(capa, z, x, y)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    # Escritura atómica: otro worker nunca lee un tile a medias
+    temporal = ruta.with_suffix(f'.{os.getpid()}.tmp')
+    temporal.write_bytes(contenido)
+    os.replace(temporal, ruta)
+    _escrituras += 1
+    if _escrituras % 100 == 0:
+        podar_tiles()
+
+
+def invalidar_tiles_de_punto(capa, lon, lat):
+    for z in range(settings.TILES_CACHE_ZOOM_MAX + 1):
+        # Los vecinos también dibujan el punto si cae en su margen (buffer MVT)
+        margen = 360.0 / 2 ** z * settings.TILES_MARGEN_PX / 4096
+        for x, y in tiles_en_bbox((lon - margen, lat - margen, lon + margen, lat + margen), z):
+            try:
+                ruta_tile(capa, z, x, y).unlink()
+            except FileNotFoundError:
+                pass
+
+
+def invalidar_capa(capa):
+    """Tira todos los tiles de la capa; para cambios masivos, más barato que punto por punto."""
+    shutil.rmtree(Path(settings.TILES_CACHE_DIR) / capa, ignore_errors=True)
+
+
+def podar_tiles():
+    """Borra los tiles de acceso más viejo hasta quedar bajo el 90% del tope."""
+    archivos = []
+    total = 0
+    for raiz, _, nombres in os.walk(settings.TILES_CACHE_DIR):
+        for nombre in nombres:
+            try:
+                info = os.stat(os.path.join(raiz, nombre))
+            except FileNotFoundError:
+                continue
+            archivos.append((info.st_atime, info.st_size, os.path.join(raiz, nombre)))
+            total += info.st_size
+    tope = settings.TILES_CACHE_MAX_MB * 1024 * 1024
+    if total <= tope:
+        return
+    archivos.sort()
+    for _, tamano, ruta in archivos:
+        if total <= tope * 0.9:
+            break
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+        total -= tamano
@@ -0,0 +1,55 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+from .models import CeldaHexagonal
+
+VENTANAS = {'24h': timedelta(hours=24), '7d': timedelta(days=7), '30d': timedelta(days=30)}
+
+
+# ---------------------------------------------------------------------
+# MAPA DE CALOR: suma de las celdas precalculadas, GeoJSON armado en PostGIS
+# ---------------------------------------------------------------------
+def mapa_calor(tamano, ventana, tipos=(), bbox=None):
+    """FeatureCollection (texto) con el total por hexágono en la ventana.
+
+    Lee solo api_celdahexagonal (un rango del índice tamano/hora): el costo
+    depende de cuántas celdas tienen reportes, no de cuántos reportes hay.
+    La ventana empieza en la hora cerrada, igual que las cubetas.
+    """
+    celdas = CeldaHexagonal._meta.db_table
+    condiciones = ['c.tamano = %s', "c.hora >= date_trunc('hour', %s::timestamptz, 'UTC')"]
+    params = [tamano, timezone.now() - VENTANAS[ventana]]
+    if tipos:
+        condiciones.append('c.tipo_problema = ANY(%s)')
+        params.append(list(tipos))
+    params.append(tamano)
+    visible = ''
+    if bbox is not None:
+        visible = 'WHERE ST_Intersects(hexagono, ST_Transform(ST_GeomFromEWKT(%s), 3857))'
+        params.append(bbox.ewkt)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            WITH por_tipo AS (
+                SELECT c.i, c.j, c.tipo_problema, sum(c.total) AS total
+                FROM {celdas} c
+                WHERE {' AND '.join(condiciones)}
+                GROUP BY 1, 2, 3
+                HAVING sum(c.total) > 0
+            ), hexagonos AS (
+                SELECT i, j, sum(total) AS total, json_object_agg(tipo_problema, total) AS por_tipo,
+                       ST_SetSRID(ST_Hexagon(%s, i, j), 3857) AS hexagono
+                FROM por_tipo
+                GROUP BY i, j
+            )
+            SELECT json_build_object('type', 'FeatureCollection', 'features', coalesce(json_agg(json_build_object(
+                'type', 'Feature',
+                'geometry', ST_AsGeoJSON(ST_Transform(hexagono, 4326), 6)::json,
+                'properties', json_build_object('i', i, 'j', j, 'total', total, 'por_tipo', por_tipo)
+            ) ORDER BY total DESC), '[]'::json))::text
+            FROM hexagonos
+            {visible}
+        """, params)
+        return cursor.fetchone()[0]
@@ -0,0 +1,91 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.gis.geos import Polygon
+from django.core.cache import cache
+from django.db.models import Count, F, IntegerField, Sum
+from django.db.models.functions import Cast, Floor
+
+from .cache import version
+from .geo import Latitud, Longitud, limites_tile, tiles_en_bbox
+from .models import VersionTabla
+
+
+# ---------------------------------------------------------------------
+# CLUSTERS POR TILE: rejilla de CLUSTERS_CELDAS_TILE x CLUSTERS_CELDAS_TILE
+# ---------------------------------------------------------------------
+def clusters_de_tile(queryset, z, x, y):
+    """Agrupa en PostGIS los reportes del tile; Python solo suma las filas agregadas."""
+    min_lon, min_lat, max_lon, max_lat = limites_tile(z, x, y)
+    celdas = settings.CLUSTERS_CELDAS_TILE
+    dx = (max_lon - min_lon) / celdas
+    dy = (max_lat - min_lat) / celdas
+    envolvente = Polygon.from_bbox((min_lon, min_lat, max_lon, max_lat))
+    envolvente.srid = 4326
+
+    filas = (
+        queryset.filter(ubicacion__bboverlaps=envolvente)
+        .annotate(lon=Longitud('ubicacion'), lat=Latitud('ubicacion'))
+        .annotate(
+            cx=Cast(Floor((F('lon') - min_lon) / dx), IntegerField()),
+            cy=Cast(Floor((F('lat') - min_lat) / dy), IntegerField()),
+        )
+        .order_by()
+        .values('cx', 'cy', 'tipo_problema', 'status')
+        .annotate(total=Count('id'), suma_lon=Sum('lon'), suma_lat=Sum('lat'))
+    )
+
+    grupos = {}
+    for fila in filas:
+        # Los puntos justo en el borde norte/este caen en la celda siguiente
+        llave = (min(fila['cx'], celdas - 1), min(fila['cy'], celdas - 1))
+        grupo = grupos.setdefault(llave, {
+            'total': 0, 'suma_lon': 0.0, 'suma_lat': 0.0, 'por_tipo': {}, 'por_status': {},
+        })
+        grupo['total'] += fila['total']
+        grupo['suma_lon'] += fila['suma_lon']
+        grupo['suma_lat'] += fila['suma_lat']
+        tipo, estado = fila['tipo_problema'], fila['status']
+        grupo['por_tipo'][tipo] = grupo['por_tipo'].get(tipo, 0) + fila['total']
+        grupo['por_status'][estado] = grupo['por_status'].get(estado, 0) + fila['total']
+
+    return [
+        {
+            'longitud': round(g['suma_lon'] / g['total'], 6),
+            'latitud': round(g['suma_lat'] / g['total'], 6),
+            'total': g['total'],
+            'por_tipo': g['por_tipo'],
+            'por_status': g['por_status'],
+        }
+        for g in grupos.values()
+    ]
+
+
+def clusters_en_bbox(queryset, extent, z, variante='', version_tabla=None):
+    """Junta los clusters de cada tile que toca el bbox, leyendo/llenando la caché por tile.
+
+    `variante` distingue combinaciones de filtros/permisos que cambian el queryset.
+    La llave lleva también la versión de VersionTabla: la de cache.py es del
+    proceso (LocMemCache), y la escritura atendida por otro worker no la sube aquí.
+    """
+    tiles = tiles_en_bbox(extent, z)
+    if len(tiles) > settings.CLUSTERS_MAX_TILES:
+        return None
+
+    if version_tabla is None:
+        version_tabla = VersionTabla.de(queryset.model)[0]
+    prefijo = 'clusters:%s:%s:%s' % (
+        version('reportes'), version_tabla, hashlib.md5(variante.encode()).hexdigest(),
+    )
+    llaves = {f'{prefijo}:{z}:{x}:{y}': (x, y) for x, y in tiles}
+    en_cache = cache.get_many(list(llaves))
+
+    resultado = []
+    for llave, (x, y) in llaves.items():
+        clusters = en_cache.get(llave)
+        if clusters is None:
+            clusters = clusters_de_tile(queryset, z, x, y)
+            cache.set(llave, clusters, settings.CLUSTERS_CACHE_SEGUNDOS)
+        resultado.extend(clusters)
+    return resultado
+
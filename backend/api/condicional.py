@@ -0,0 +1,89 @@
+import hashlib
+import logging
+import threading
+
+from django.utils import timezone
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import VersionTabla
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------
+# CONTADORES (también los lee /metrics)
+# ---------------------------------------------------------------------
+_candado = threading.Lock()
+contadores = {'no_modificado': 0, 'completo': 0}
+
+
+def _contar(llave):
+    with _candado:
+        contadores[llave] += 1
+        total = contadores['no_modificado'] + contadores['completo']
+        if total % 100 == 0:
+            logger.info(
+                'GET condicional: %d de %d respondidas con 304 (%.0f%%)',
+                contadores['no_modificado'], total, 100.0 * contadores['no_modificado'] / total,
+            )
+
+
+# ---------------------------------------------------------------------
+# MIXIN: ETag / Last-Modified desde VersionTabla, sin serializar nada
+# ---------------------------------------------------------------------
+class ConditionalGetMixin:
+    """Responde 304 con solo leer la versión de la tabla (una consulta por índice).
+
+    El ETag combina esa versión con la URL completa, el usuario y el día, porque
+    la misma versión se ve distinta según filtros, permisos y la ventana de 30
+    días del mapa público.
+    """
+    modelo_version = None
+
+    def version_tabla(self):
+        # Una lectura por request: la comparten el ETag y la caché de respuestas
+        if not hasattr(self, '_version_tabla'):
+            self._version_tabla = VersionTabla.de(self.modelo_version or self.queryset.model)
+        return self._version_tabla
+
+    def validadores(self, request):
+        version, modificado = self.version_tabla()
+        variante = '|'.join([
+            request.get_full_path(),
+            str(request.user.pk),
+            request.headers.get('Accept', ''),
+            timezone.localdate().isoformat(),
+        ])
+        huella = hashlib.md5(variante.encode()).hexdigest()[:16]
+        return 'W/' + quote_etag(f'{version}-{huella}'), modificado
+
+    def responder_condicional(self, request, generar, *args, **kwargs):
+        etag, modificado = self.validadores(request)
+        if self._sin_cambios(request, etag, modificado):
+            _contar('no_modificado')
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            _contar('completo')
+            response = generar(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if modificado is not None:
+                response['Last-Modified'] = http_date(modificado.timestamp())
+            response['Cache-Control'] = 'private, no-cache'
+            response['Vary'] = 'Authorization, Accept'
+        return response
+
+    def _sin_cambios(self, request, etag, modificado):
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match is not None:
+            return etag in [e.strip() for e in if_none_match.split(',')] or if_none_match.strip() == '*'
+        desde = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        return desde is not None and modificado is not None and int(modificado.timestamp()) <= desde
+
+    def list(self, request, *args, **kwargs):
+        return self.responder_condicional(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.responder_condicional(request, super().retrieve, *args, **kwargs)
@@ -0,0 +1,173 @@
+import numpy as np
+from django.conf import settings
+from django.contrib.gis.db.models.functions import Distance
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+from scipy.optimize import linear_sum_assignment
+
+from .cache import incrementar_version, invalidar_tiles_de_punto
+from .geo import Latitud, Longitud
+from .models import Pipa, Reporte
+
+RADIO_TIERRA_KM = 6371.0088
+# Costo de las parejas que no se pueden asignar (más lejos que DESPACHO_MAX_KM)
+PROHIBIDO = 1e9
+
+
+# ---------------------------------------------------------------------
+# MATRIZ DE COSTOS (numpy, sin tocar la base)
+# ---------------------------------------------------------------------
+def distancias_km(lon1, lat1, lon2, lat2):
+    """Haversine de todos contra todos: matriz len(lon1) x len(lon2) en km.
+
+    En float32 (error < 1 m a esta escala): la mitad de memoria y de tiempo.
+    """
+    lon1, lat1, lon2, lat2 = (np.radians(np.asarray(v, dtype=np.float32)) for v in (lon1, lat1, lon2, lat2))
+    lon1, lat1, lon2, lat2 = lon1[:, None], lat1[:, None], lon2[None, :], lat2[None, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return np.float32(2 * RADIO_TIERRA_KM) * np.arcsin(np.sqrt(a))
+
+
+def matriz_costos(pipas, reportes):
+    """`pipas`: arreglo (n, 3) lon, lat, capacidad. `reportes`: (m, 3) lon, lat, prioridad.
+
+    Costo = km de recorrido menos un bono por prioridad (en km equivalentes),
+    mayor cuando la pipa es grande: los reportes urgentes se llevan las pipas con más agua.
+    """
+    distancia = distancias_km(pipas[:, 0], pipas[:, 1], reportes[:, 0], reportes[:, 1])
+    prioridad = (reportes[:, 2] / max(reportes[:, 2].max(), 1)).astype(np.float32)
+    capacidad = (pipas[:, 2] / max(pipas[:, 2].max(), 1)).astype(np.float32)
+    bono = np.float32(settings.DESPACHO_PESO_PRIORIDAD) * prioridad[None, :] * (
+        1 + np.float32(settings.DESPACHO_PESO_CAPACIDAD) * capacidad[:, None]
+    )
+    costo = distancia - bono
+    costo[distancia > settings.DESPACHO_MAX_KM] = PROHIBIDO
+    return costo, distancia
+
+
+def resolver(costo):
+    """Asignación óptima (Jonker-Volgenant). Regresa (filas, columnas) válidas.
+
+    Con decenas de miles de reportes solo entran al problema las columnas que
+    están entre las DESPACHO_CANDIDATOS mejores de alguna pipa; fuera de esas,
+    ninguna pipa tendría por qué elegirlas.
+    """
+    n, m = costo.shape
+    if n == 0 or m == 0:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+    k = settings.DESPACHO_CANDIDATOS
+    if m > k * n:
+        mejores = np.argpartition(costo, k - 1, axis=1)[:, :k]
+        columnas = np.unique(mejores)
+    else:
+        columnas = np.arange(m)
+    filas, elegidas = linear_sum_assignment(costo[:, columnas])
+    elegidas = columnas[elegidas]
+    validas = costo[filas, elegidas] < PROHIBIDO
+    return filas[validas], elegidas[validas]
+
+
+# ---------------------------------------------------------------------
+# APLICAR: un UPDATE por tabla, sin pisar reportes que alguien ya asignó
+# ---------------------------------------------------------------------
+def cola_escasez(reportes=None):
+    """Lo despachable: ESCASEZ abiertos y sin pipa (de `reportes`, o de todos)."""
+    reportes = Reporte.objects.all() if reportes is None else reportes
+    return reportes.filter(
+        tipo_problema='ESCASEZ', status__in=Reporte.ESTADOS_ABIERTOS, pipa_asignada__isnull=True,
+    )
+
+
+def _pipas_disponibles():
+    # SKIP LOCKED: dos despachos simultáneos no se pelean la misma pipa
+    return Pipa.objects.select_for_update(skip_locked=True).filter(
+        estado='DISPONIBLE', ubicacion_actual__isnull=False,
+    )
+
+
+def _aplicar(reporte_ids, pipa_ids):
+    """Regresa los ids de reporte que sí quedaron asignados."""
+    if not reporte_ids:
+        return set()
+    reportes, pipas = Reporte._meta.db_table, Pipa._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE {reportes} r
+            SET pipa_asignada_id = a.pipa,
+                status = CASE WHEN r.status = 'PENDIENTE' THEN 'ASIGNADO' ELSE r.status END,
+                fecha_actualizacion = now()
+            FROM unnest(%s::bigint[], %s::bigint[]) AS a(reporte, pipa)
+            WHERE r.id = a.reporte AND r.pipa_asignada_id IS NULL
+            RETURNING r.id, a.pipa, ST_X(r.ubicacion), ST_Y(r.ubicacion)
+        """, [list(reporte_ids), list(pipa_ids)])
+        asignados = cursor.fetchall()
+        cursor.execute(f"""
+            UPDATE {pipas} SET estado = 'EN_RUTA'
+            WHERE id = ANY(%s::bigint[])
+            RETURNING ST_X(ubicacion_actual), ST_Y(ubicacion_actual)
+        """, [[fila[1] for fila in asignados]])
+        puntos_pipas = cursor.fetchall()
+
+    def invalidar():
+        incrementar_version('reportes')
+        for _, _, lon, lat in asignados:
+            invalidar_tiles_de_punto('reportes', lon, lat)
+        for lon, lat in puntos_pipas:
+            invalidar_tiles_de_punto('pipas', lon, lat)
+
+    transaction.on_commit(invalidar)
+    return {fila[0] for fila in asignados}
+
+
+def asignar_cercana(reporte):
+    """Pipa DISPONIBLE más cercana al reporte (KNN sobre el índice GiST). Regresa (pipa, km) o None.
+
+    Con el mismo tope que el despacho en lote: más lejos de DESPACHO_MAX_KM no se asigna.
+    """
+    pipas = Pipa._meta.db_table
+    with transaction.atomic():
+        pipa = (
+            _pipas_disponibles()
+            .annotate(distancia=Distance('ubicacion_actual', reporte.ubicacion))
+            .order_by(RawSQL(f'"{pipas}"."ubicacion_actual" <-> ST_GeomFromEWKT(%s)', [reporte.ubicacion.ewkt]))
+            .first()
+        )
+        if pipa is None or pipa.distancia.km > settings.DESPACHO_MAX_KM or not _aplicar([reporte.pk], [pipa.pk]):
+            return None
+    return pipa, pipa.distancia.km
+
+
+def despachar_lote(reportes=None):
+    """Asignación óptima de todas las pipas libres contra la cola (o los `reportes` dados)."""
+    reportes = cola_escasez(reportes)
+    with transaction.atomic():
+        pipas = list(
+            _pipas_disponibles()
+            .annotate(lon=Longitud('ubicacion_actual'), lat=Latitud('ubicacion_actual'))
+            .values_list('id', 'numero_economico', 'lon', 'lat', 'capacidad_litros')
+        )
+        cola = list(
+            reportes.annotate(lon=Longitud('ubicacion'), lat=Latitud('ubicacion'))
+            .values_list('id', 'folio', 'lon', 'lat', 'prioridad')
+        )
+        if not pipas or not cola:
+            return [], len(pipas), len(cola)
+
+        costo, distancia = matriz_costos(
+            np.array([p[2:] for p in pipas], dtype=np.float64),
+            np.array([r[2:] for r in cola], dtype=np.float64),
+        )
+        filas, columnas = resolver(costo)
+        asignados = _aplicar([cola[j][0] for j in columnas], [pipas[i][0] for i in filas])
+
+    resultado = [
+        {
+            'reporte': cola[j][0],
+            'folio': cola[j][1],
+            'pipa': pipas[i][0],
+            'numero_economico': pipas[i][1],
+            'distancia_km': round(float(distancia[i, j]), 2),
+        }
+        for i, j in zip(filas, columnas) if cola[j][0] in asignados
+    ]
+    return resultado, len(pipas) - len(resultado), len(cola) - len(resultado)
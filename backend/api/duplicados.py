@@ -0,0 +1,71 @@
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.gis.db.models.functions import Distance
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .models import Reporte
+
+METROS_POR_GRADO = 111320
+
+
+class ReporteDuplicado(APIException):
+    """409 con el reporte existente; `validado` dice si el envío contó como voto."""
+    status_code = status.HTTP_409_CONFLICT
+    default_code = 'duplicado'
+
+    def __init__(self, reporte, validado):
+        if validado:
+            mensaje = f'Ya existe el reporte {reporte.folio}; tu envío se sumó como validación.'
+        else:
+            mensaje = f'Parece que ya existe el reporte {reporte.folio}. Reenvía con ?forzar=1 si es otro problema.'
+        super().__init__(mensaje)
+        self.detail = {
+            'detail': mensaje,
+            'validado': validado,
+            'duplicado': {
+                'id': reporte.id,
+                'folio': reporte.folio,
+                'status': reporte.status,
+                'validaciones': reporte.validaciones,
+                'distancia_metros': round(reporte.distancia.m, 1),
+            },
+        }
+
+
+# ---------------------------------------------------------------------
+# DUPLICADOS: reporte abierto del mismo tipo, cerca y reciente
+# ---------------------------------------------------------------------
+def buscar_duplicado(tipo_problema, punto):
+    """Regresa el reporte abierto más cercano que parece el mismo problema, o None.
+
+    ST_DWithin en grados acota la búsqueda con el índice GiST parcial de reportes
+    abiertos; `<->` (KNN) trae el más cercano y la distancia esférica en metros
+    decide si de verdad está dentro del radio.
+    """
+    radio = settings.DUPLICADOS_RADIO_METROS
+    # Grados de longitud por metro crecen con la latitud: tomamos el caso más ancho
+    radio_grados = radio / (METROS_POR_GRADO * max(math.cos(math.radians(punto.y)), 0.01))
+    desde = timezone.now() - timedelta(hours=settings.DUPLICADOS_VENTANA_HORAS)
+    tabla = Reporte._meta.db_table
+
+    candidato = (
+        Reporte.objects
+        .filter(
+            status__in=Reporte.ESTADOS_ABIERTOS,
+            tipo_problema=tipo_problema,
+            fecha_hora__gte=desde,
+            ubicacion__dwithin=(punto, radio_grados),
+        )
+        .annotate(distancia=Distance('ubicacion', punto))
+        .order_by(RawSQL(f'"{tabla}"."ubicacion" <-> ST_GeomFromEWKT(%s)', [punto.ewkt]))
+        .only('id', 'folio', 'status', 'validaciones', 'usuario_id', 'fecha_hora')
+        .first()
+    )
+    if candidato is None or candidato.distancia.m > radio:
+        return None
+    return candidato
@@ -0,0 +1,196 @@
+import asyncio
+import itertools
+import json
+import logging
+import weakref
+
+import psycopg2
+import psycopg2.extensions
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from .filtros import bbox_de_texto
+
+logger = logging.getLogger(__name__)
+
+# Lo emite el trigger de api_reporte (migración 0015) con pg_notify
+CANAL = 'reportes_eventos'
+
+
+# ---------------------------------------------------------------------
+# DIFUSOR: una conexión LISTEN por proceso, reparte a las suscripciones locales
+# ---------------------------------------------------------------------
+class Suscripcion:
+    def __init__(self, filtro):
+        self.filtro = filtro
+        self.cola = asyncio.Queue(maxsize=settings.EVENTOS_COLA_MAX)
+        self.desbordada = False
+
+
+class Difusor:
+    """Fan-out en proceso de las notificaciones de Postgres.
+
+    No usa hilos: el socket de la conexión LISTEN se registra en el event loop
+    (add_reader), así miles de clientes inactivos solo cuestan una cola cada uno.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.suscripciones = set()
+        self.conexion = None
+        self.conectando = None
+
+    async def suscribir(self, filtro):
+        suscripcion = Suscripcion(filtro)
+        self.suscripciones.add(suscripcion)
+        if self.conexion is None and self.conectando is None:
+            self.conectando = self.loop.create_task(self._escuchar())
+        return suscripcion
+
+    def cancelar(self, suscripcion):
+        self.suscripciones.discard(suscripcion)
+
+    def publicar(self, evento):
+        for suscripcion in list(self.suscripciones):
+            if not suscripcion.filtro(evento):
+                continue
+            try:
+                suscripcion.cola.put_nowait(evento)
+            except asyncio.QueueFull:
+                # Cliente lento: lo cortamos y EventSource reconecta solo
+                suscripcion.desbordada = True
+
+    async def _escuchar(self):
+        espera = 1
+        while self.conexion is None:
+            try:
+                self.conexion = await self.loop.run_in_executor(None, _conectar)
+            except psycopg2.OperationalError:
+                logger.warning('LISTEN %s: sin conexión, reintento en %ss', CANAL, espera)
+                await asyncio.sleep(espera)
+                espera = min(espera * 2, 30)
+        self.conectando = None
+        self.loop.add_reader(self.conexion.fileno(), self._al_leer)
+
+    def _al_leer(self):
+        try:
+            self.conexion.poll()
+        except psycopg2.Error:
+            logger.warning('LISTEN %s: conexión perdida, reconectando', CANAL)
+            self.loop.remove_reader(self.conexion.fileno())
+            self.conexion = None
+            self.conectando = self.loop.create_task(self._escuchar())
+            return
+        while self.conexion.notifies:
+            aviso = self.conexion.notifies.pop(0)
+            try:
+                self.publicar(json.loads(aviso.payload))
+            except ValueError:
+                logger.warning('LISTEN %s: payload inválido %r', CANAL, aviso.payload)
+
+
+def _conectar():
+    db = settings.DATABASES['default']
+    conexion = psycopg2.connect(
+        dbname=db['NAME'], user=db['USER'], password=db['PASSWORD'],
+        host=db['HOST'], port=db['PORT'],
+    )
+    conexion.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+    conexion.cursor().execute(f'LISTEN {CANAL}')
+    return conexion
+
+
+# Uno por event loop: con uvicorn hay un loop por worker; con runserver
+# cada petición async trae el suyo y no deben compartir el reader.
+_difusores = weakref.WeakKeyDictionary()
+
+
+def difusor():
+    loop = asyncio.get_running_loop()
+    if loop not in _difusores:
+        _difusores[loop] = Difusor(loop)
+    return _difusores[loop]
+
+
+# ---------------------------------------------------------------------
+# ENDPOINT SSE: /api/eventos/reportes/?bbox=...&folio=...&mios=1
+# ---------------------------------------------------------------------
+CAMPOS_PUBLICOS = ('evento', 'id', 'folio', 'tipo_problema', 'status', 'validaciones', 'latitud', 'longitud')
+
+
+def construir_filtro(bbox, folio, usuario_id):
+    extent = bbox.extent if bbox is not None else None
+
+    def filtro(evento):
+        if folio and evento.get('folio') != folio:
+            return False
+        if usuario_id is not None and evento.get('usuario_id') != usuario_id:
+            return False
+        if extent is not None:
+            min_lon, min_lat, max_lon, max_lat = extent
+            if not (min_lon <= evento['longitud'] <= max_lon and min_lat <= evento['latitud'] <= max_lat):
+                return False
+        return True
+
+    return filtro
+
+
+async def _usuario(request):
+    # EventSource no manda headers: el JWT puede venir en ?token=
+    crudo = request.GET.get('token')
+    if not crudo:
+        encabezado = request.headers.get('Authorization', '')
+        crudo = encabezado[7:] if encabezado.startswith('Bearer ') else None
+    if not crudo:
+        return None
+    autenticacion = JWTAuthentication()
+    try:
+        token = autenticacion.get_validated_token(crudo)
+        return await sync_to_async(autenticacion.get_user)(token)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+async def _flujo(central, filtro):
+    # La suscripción nace con el primer chunk: si el cliente se va antes, no queda colgada
+    suscripcion = await central.suscribir(filtro)
+    ids = itertools.count(1)
+    try:
+        yield f'retry: {settings.EVENTOS_REINTENTO_MS}\n\n'
+        while not suscripcion.desbordada:
+            try:
+                evento = await asyncio.wait_for(suscripcion.cola.get(), settings.EVENTOS_LATIDO_SEGUNDOS)
+            except asyncio.TimeoutError:
+                # Comentario SSE: mantiene viva la conexión a través de proxies
+                yield ': latido\n\n'
+                continue
+            datos = json.dumps({k: evento.get(k) for k in CAMPOS_PUBLICOS}, ensure_ascii=False)
+            yield f'id: {next(ids)}\nevent: {evento["evento"]}\ndata: {datos}\n\n'
+    finally:
+        central.cancelar(suscripcion)
+
+
+async def eventos_reportes(request):
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+    try:
+        bbox = bbox_de_texto(request.GET.get('bbox'))
+    except ValidationError as error:
+        return JsonResponse(error.detail, status=400)
+
+    usuario_id = None
+    if request.GET.get('mios') in ('1', 'true'):
+        usuario = await _usuario(request)
+        if usuario is None:
+            return JsonResponse({'error': 'Se requiere token para ?mios=1'}, status=401)
+        usuario_id = usuario.pk
+
+    filtro = construir_filtro(bbox, request.GET.get('folio'), usuario_id)
+    response = StreamingHttpResponse(_flujo(difusor(), filtro), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,117 @@
+import csv
+import json
+import zlib
+
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+
+from .geo import Latitud, Longitud
+
+
+# ---------------------------------------------------------------------
+# EXPORTACIÓN EN STREAMING (cursor del lado del servidor, sin instancias)
+# ---------------------------------------------------------------------
+COLUMNAS = [
+    'folio', 'tipo_problema', 'status', 'direccion_texto',
+    'latitud', 'longitud', 'fecha_hora', 'fecha_actualizacion',
+]
+ENCABEZADOS = ['Folio', 'Tipo', 'Estatus', 'Dirección', 'Latitud', 'Longitud', 'Fecha', 'Actualización']
+FILAS_POR_BLOQUE = 2000
+
+FORMATOS = {
+    'csv': ('text/csv', 'csv'),
+    'geojsonseq': ('application/geo+json-seq', 'geojsonl'),
+}
+
+
+class _Eco:
+    """Pseudo-buffer: csv.writer 'escribe' y nos devuelve la línea."""
+    def write(self, valor):
+        return valor
+
+
+def _filas(queryset):
+    return (
+        queryset.annotate(latitud=Latitud('ubicacion'), longitud=Longitud('ubicacion'))
+        .order_by('id')
+        .values_list(*COLUMNAS)
+        .iterator(chunk_size=FILAS_POR_BLOQUE)
+    )
+
+
+def _csv(queryset):
+    writer = csv.writer(_Eco())
+    yield writer.writerow(ENCABEZADOS)
+    bloque = []
+    for fila in _filas(queryset):
+        folio, tipo, estatus, direccion, lat, lon, fecha, actualizacion = fila
+        bloque.append(writer.writerow([
+            folio, tipo, estatus, direccion, lat, lon, fecha.isoformat(), actualizacion.isoformat(),
+        ]))
+        if len(bloque) >= FILAS_POR_BLOQUE:
+            yield ''.join(bloque)
+            bloque = []
+    yield ''.join(bloque)
+
+
+def _geojsonseq(queryset):
+    # RFC 8142: cada Feature va precedido de RS (0x1E) y termina en salto de línea
+    bloque = []
+    for fila in _filas(queryset):
+        folio, tipo, estatus, direccion, lat, lon, fecha, actualizacion = fila
+        feature = {
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+            'properties': {
+                'folio': folio, 'tipo_problema': tipo, 'status': estatus, 'direccion_texto': direccion,
+                'fecha_hora': fecha.isoformat(), 'fecha_actualizacion': actualizacion.isoformat(),
+            },
+        }
+        bloque.append('\x1e' + json.dumps(feature, ensure_ascii=False) + '\n')
+        if len(bloque) >= FILAS_POR_BLOQUE:
+            yield ''.join(bloque)
+            bloque = []
+    yield ''.join(bloque)
+
+
+def _gzip(partes):
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for parte in partes:
+        datos = compresor.compress(parte.encode('utf-8'))
+        if datos:
+            yield datos
+    yield compresor.flush()
+
+
+_FIN = object()
+
+
+async def _asincrono(partes):
+    """Las mismas partes como iterador async, para servirlas bajo ASGI.
+
+    Con un generador síncrono, StreamingHttpResponse lo junta completo con
+    sync_to_async(list) antes de mandar el primer byte. Aquí cada bloque se pide
+    con sync_to_async (thread_sensitive): corre en el hilo de la petición, que es
+    donde vive la conexión con el cursor del lado del servidor.
+    """
+    siguiente = sync_to_async(next)
+    try:
+        while (parte := await siguiente(partes, _FIN)) is not _FIN:
+            yield parte
+    finally:
+        # Cierra el generador (y con él el cursor) también si el cliente se desconecta
+        await sync_to_async(partes.close)()
+
+
+def respuesta_exportacion(queryset, formato='csv', comprimir=False, asincrono=False):
+    tipo_contenido, extension = FORMATOS[formato]
+    partes = _csv(queryset) if formato == 'csv' else _geojsonseq(queryset)
+    nombre = f'reporte.{extension}'
+    if comprimir:
+        partes = _gzip(partes)
+        tipo_contenido, nombre = 'application/gzip', nombre + '.gz'
+    if asincrono:
+        partes = _asincrono(partes)
+    response = StreamingHttpResponse(partes, content_type=tipo_contenido)
+    response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    return response
@@ -0,0 +1,121 @@
+import django_filters
+from django.conf import settings
+from django.contrib.gis.geos import Polygon
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db.models import DecimalField, F, Q
+from django.db.models.functions import Cast, Greatest
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+
+from .models import Reporte
+
+
+# ---------------------------------------------------------------------
+# FILTROS DE REPORTE (lista pública y exportación comparten los mismos)
+# ---------------------------------------------------------------------
+class ReporteFilter(django_filters.FilterSet):
+    fecha_desde = django_filters.IsoDateTimeFilter(field_name='fecha_hora', lookup_expr='gte')
+    fecha_hasta = django_filters.IsoDateTimeFilter(field_name='fecha_hora', lookup_expr='lte')
+
+    class Meta:
+        model = Reporte
+        fields = ['status', 'tipo_problema', 'usuario__username', 'folio']
+
+
+# ---------------------------------------------------------------------
+# BÚSQUEDA (?search=): texto completo en español + trigramas
+# ---------------------------------------------------------------------
+class BusquedaReporteFilter(filters.SearchFilter):
+    """Sustituye los ILIKE '%…%' de SearchFilter por índices GIN.
+
+    `busqueda` (tsvector español de descripción + dirección) atiende palabras
+    con stemming; los índices de trigramas sobre folio y dirección atienden
+    fragmentos como 'IXT-3F' o 'Av. Cuauh'. Sin ?ordering= se ordena por relevancia.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        texto = ' '.join(self.get_search_terms(request))
+        if not texto:
+            return queryset
+        consulta = SearchQuery(texto, config='spanish', search_type='websearch')
+        return (
+            queryset.filter(
+                Q(busqueda=consulta) | Q(folio__icontains=texto) | Q(direccion_texto__icontains=texto)
+            )
+            # numeric(12,6) y no real: el cursor de KeysetPagination la compara con igualdad
+            .annotate(relevancia=Cast(
+                SearchRank(F('busqueda'), consulta) + Greatest(
+                    TrigramSimilarity('folio', texto), TrigramSimilarity('direccion_texto', texto),
+                ),
+                DecimalField(max_digits=12, decimal_places=6),
+            ))
+            .order_by('-relevancia', '-id')
+        )
+
+
+# ---------------------------------------------------------------------
+# VIEWPORT DEL MAPA (?bbox=minLon,minLat,maxLon,maxLat&zoom=N)
+# ---------------------------------------------------------------------
+def leer_bbox(request):
+    """Devuelve el Polygon del bbox pedido o None si no viene en la URL."""
+    return bbox_de_texto(request.query_params.get('bbox'))
+
+
+def bbox_de_texto(crudo):
+    if not crudo:
+        return None
+    try:
+        min_lon, min_lat, max_lon, max_lat = [float(v) for v in crudo.split(',')]
+    except ValueError:
+        raise ValidationError({'bbox': 'Formato esperado: minLon,minLat,maxLon,maxLat'})
+    if not (-180 <= min_lon < max_lon <= 180 and -90 <= min_lat < max_lat <= 90):
+        raise ValidationError({'bbox': 'Coordenadas fuera de rango o invertidas'})
+    bbox = Polygon.from_bbox((min_lon, min_lat, max_lon, max_lat))
+    bbox.srid = 4326
+    return bbox
+
+
+def leer_zoom(request):
+    crudo = request.query_params.get('zoom')
+    if crudo in (None, ''):
+        return None
+    try:
+        zoom = int(crudo)
+    except ValueError:
+        raise ValidationError({'zoom': 'Debe ser un entero'})
+    if not 0 <= zoom <= 22:
+        raise ValidationError({'zoom': 'Debe estar entre 0 y 22'})
+    return zoom
+
+
+def limite_por_zoom(zoom):
+    # A zoom de ciudad completa los pines se enciman: mandamos menos
+    tope = settings.MAPA_MAX_RESULTADOS
+    if zoom is None or zoom >= settings.MAPA_ZOOM_DETALLE:
+        return tope
+    return max(tope >> (settings.MAPA_ZOOM_DETALLE - zoom), settings.MAPA_MIN_RESULTADOS)
+
+
+class BBoxFilter(filters.BaseFilterBackend):
+    """Filtra por ST_Intersects contra el bbox (usa el índice GiST del campo)."""
+
+    def filter_queryset(self, request, queryset, view):
+        bbox = leer_bbox(request)
+        if bbox is None:
+            return queryset
+        campo = getattr(view, 'bbox_campo', 'ubicacion')
+        return queryset.filter(**{f'{campo}__intersects': bbox})
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': 'bbox', 'required': False, 'in': 'query',
+                'description': 'minLon,minLat,maxLon,maxLat (EPSG:4326)',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': 'zoom', 'required': False, 'in': 'query',
+                'description': 'Nivel de zoom del mapa (0-22), ajusta el tope de resultados',
+                'schema': {'type': 'integer'},
+            },
+        ]
@@ -0,0 +1,48 @@
+import math
+
+from django.db.models import FloatField, Func
+
+
+# ---------------------------------------------------------------------
+# FUNCIONES SQL (coordenadas calculadas en PostGIS, sin GEOS en Python)
+# ---------------------------------------------------------------------
+class Longitud(Func):
+    function = 'ST_X'
+    output_field = FloatField()
+
+
+class Latitud(Func):
+    function = 'ST_Y'
+    output_field = FloatField()
+
+
+# ---------------------------------------------------------------------
+# MATEMÁTICA DE TILES (esquema XYZ / Web Mercator, igual que Leaflet)
+# ---------------------------------------------------------------------
+MAX_LATITUD = 85.0511287798
+
+
+def tile_de_punto(lon, lat, z):
+    n = 2 ** z
+    lat = max(min(lat, MAX_LATITUD), -MAX_LATITUD)
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def limites_tile(z, x, y):
+    """(minLon, minLat, maxLon, maxLat) del tile z/x/y."""
+    n = 2 ** z
+
+    def lat(fila):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * fila / n))))
+
+    return (x / n * 360.0 - 180.0, lat(y + 1), (x + 1) / n * 360.0 - 180.0, lat(y))
+
+
+def tiles_en_bbox(extent, z):
+    """Todos los (x, y) del zoom z que tocan el extent (minLon, minLat, maxLon, maxLat)."""
+    min_lon, min_lat, max_lon, max_lat = extent
+    x0, y0 = tile_de_punto(min_lon, max_lat, z)
+    x1, y1 = tile_de_punto(max_lon, min_lat, z)
+    return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
@@ -0,0 +1,99 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models import CharField, F, Func, Value
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------
+# PIPELINE DE FOTOS: sin EXIF, tamaño acotado y miniatura WebP
+# ---------------------------------------------------------------------
+# (campo original, campo miniatura) que procesa el pipeline
+CAMPOS_FOTO = [('foto', 'foto_miniatura'), ('foto_solucion', 'foto_solucion_miniatura')]
+
+# Tipo de Reporte.fotos_fallidas para los array_append/array_remove del UPDATE
+_LISTA = ArrayField(CharField())
+
+_pool = ThreadPoolExecutor(max_workers=settings.IMAGENES_WORKERS, thread_name_prefix='imagenes')
+
+
+def _codificar(imagen, lado, formato, calidad):
+    copia = imagen.copy()
+    copia.thumbnail((lado, lado), Image.LANCZOS)
+    salida = io.BytesIO()
+    # Sin pasar exif=..., Pillow no copia metadatos (GPS, modelo del teléfono, etc.)
+    copia.save(salida, formato, quality=calidad, optimize=True)
+    return salida.getvalue()
+
+
+def procesar_archivo(nombre):
+    """Escribe junto a `nombre` la versión recodificada y su miniatura.
+
+    Regresa (nombre_nuevo, nombre_miniatura); el original no se toca: quien
+    llama decide cuál conservar según gane o no el UPDATE.
+    """
+    with default_storage.open(nombre, 'rb') as original:
+        imagen = Image.open(original)
+        # Respetamos la orientación de la cámara antes de tirar el EXIF
+        imagen = ImageOps.exif_transpose(imagen).convert('RGB')
+
+    base, _ = os.path.splitext(nombre)
+    directorio, archivo = os.path.split(base)
+    principal = _codificar(imagen, settings.IMAGENES_MAX_LADO, 'JPEG', settings.IMAGENES_CALIDAD)
+    miniatura = _codificar(imagen, settings.IMAGENES_MINIATURA_LADO, 'WEBP', settings.IMAGENES_CALIDAD)
+
+    nombre_nuevo = default_storage.save(f'{base}.jpg', ContentFile(principal))
+    nombre_miniatura = default_storage.save(f'{directorio}/miniaturas/{archivo}.webp', ContentFile(miniatura))
+    return nombre_nuevo, nombre_miniatura
+
+
+def procesar_foto(modelo, pk, campo, campo_miniatura):
+    nombre = modelo.objects.filter(pk=pk).values_list(campo, flat=True).first()
+    if not nombre:
+        return
+    try:
+        nombre_nuevo, nombre_miniatura = procesar_archivo(nombre)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+        logger.exception('No se pudo procesar %s', nombre)
+        # Se marca para que el siguiente save no la vuelva a encolar (procesar_imagenes --todas la reintenta)
+        modelo.objects.filter(pk=pk, **{campo: nombre}).exclude(fotos_fallidas__contains=[campo]).update(
+            fotos_fallidas=Func(F('fotos_fallidas'), Value(campo), function='array_append', output_field=_LISTA),
+        )
+        return
+    # Solo si nadie cambió la foto mientras trabajábamos; UPDATE directo, sin señales
+    actualizadas = modelo.objects.filter(pk=pk, **{campo: nombre}).update(**{
+        campo: nombre_nuevo,
+        campo_miniatura: nombre_miniatura,
+        'fotos_fallidas': Func(F('fotos_fallidas'), Value(campo), function='array_remove', output_field=_LISTA),
+        'fecha_actualizacion': timezone.now(),
+    })
+    # Se borra lo que ya no apunta ninguna fila: el original si ganó el UPDATE,
+    # lo recién escrito si la foto cambió (o se borró el reporte) a medio camino
+    if not actualizadas:
+        default_storage.delete(nombre_nuevo)
+        default_storage.delete(nombre_miniatura)
+    elif nombre_nuevo != nombre:
+        default_storage.delete(nombre)
+
+
+def _tarea(modelo, pk, campo, campo_miniatura):
+    try:
+        procesar_foto(modelo, pk, campo, campo_miniatura)
+    finally:
+        # Cada hilo del pool abre su propia conexión: no la dejamos colgada
+        connection.close()
+
+
+def programar(modelo, pk, campo, campo_miniatura):
+    """Encola el procesamiento fuera del hilo de la petición."""
+    return _pool.submit(_tarea, modelo, pk, campo, campo_miniatura)
@@ -0,0 +1,294 @@
+import csv
+import io
+import json
+import logging
+import time
+from itertools import chain, islice
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .cache import incrementar_version, invalidar_capa
+from .models import EstadisticaDiaria, Reporte
+
+logger = logging.getLogger(__name__)
+
+# Columnas de la tabla de paso, en el orden del COPY
+CAMPOS = [
+    'folio', 'tipo_problema', 'descripcion', 'direccion_texto', 'colonia', 'status', 'fecha_hora', 'longitud', 'latitud',
+]
+OBLIGATORIOS = {'tipo_problema', 'longitud', 'latitud'}
+
+# Encabezados del CSV: nombres de campo o los de exportar.py (el export se puede reimportar)
+ALIAS = {
+    'tipo': 'tipo_problema', 'estatus': 'status', 'dirección': 'direccion_texto', 'direccion': 'direccion_texto',
+    'descripción': 'descripcion', 'fecha': 'fecha_hora', 'lon': 'longitud', 'lat': 'latitud',
+}
+FORMATOS = {'.csv': 'csv', '.geojson': 'geojson', '.json': 'geojson', '.geojsonl': 'geojson', '.ndjson': 'geojson'}
+
+FILAS_POR_BLOQUE = 2000
+# Coordenada en grados sin exponente: lo que pase el regex siempre se puede castear
+NUMERO = r'^\s*-?[0-9]{1,3}(\.[0-9]+)?\s*$'
+
+
+class ArchivoInvalido(ValueError):
+    pass
+
+
+def formato_de(nombre):
+    for extension, formato in FORMATOS.items():
+        if nombre.lower().endswith(extension):
+            return formato
+    raise ArchivoInvalido(f'Extensión no soportada: usa {", ".join(FORMATOS)}')
+
+
+# ---------------------------------------------------------------------
+# LECTURA: CSV o GeoJSON -> [linea, motivo, *CAMPOS] en texto
+# ---------------------------------------------------------------------
+def _texto(valor):
+    if valor is None or isinstance(valor, str):
+        # Postgres no acepta NUL en columnas de texto y abortaría todo el COPY
+        return valor.replace('\x00', '') if valor else None
+    return str(valor)
+
+
+def filas_csv(texto):
+    lector = csv.reader(texto)
+    encabezados = next(lector, None) or []
+    indice = {}
+    for posicion, nombre in enumerate(encabezados):
+        nombre = nombre.strip().lower()
+        indice.setdefault(ALIAS.get(nombre, nombre), posicion)
+    faltan = OBLIGATORIOS - indice.keys()
+    if faltan:
+        raise ArchivoInvalido(f'Faltan columnas: {", ".join(sorted(faltan))}')
+
+    posiciones = [indice.get(campo) for campo in CAMPOS]
+    for fila in lector:
+        if not fila:
+            continue
+        yield [lector.line_num, None] + [
+            _texto(fila[p]) if p is not None and p < len(fila) else None for p in posiciones
+        ]
+
+
+def _fila_feature(linea, feature):
+    try:
+        propiedades = feature.get('properties') or {}
+        geometria = feature['geometry']
+        if geometria.get('type') != 'Point':
+            return [linea, 'la geometría no es Point'] + [None] * len(CAMPOS)
+        lon, lat = geometria['coordinates'][:2]
+    except (TypeError, KeyError, ValueError, AttributeError):
+        return [linea, 'Feature inválido'] + [None] * len(CAMPOS)
+    valores = {**propiedades, 'longitud': lon, 'latitud': lat}
+    return [linea, None] + [_texto(valores.get(campo)) for campo in CAMPOS]
+
+
+def filas_geojson(texto):
+    """FeatureCollection (se carga completo) o una Feature por línea: GeoJSONSeq
+    de exportar.py o NDJSON, que se leen en streaming. Para archivos grandes,
+    preferir por línea; en la colección, `linea` es el número de Feature."""
+    primera = texto.readline()
+    try:
+        inicial = json.loads(primera.lstrip('\x1e'))
+    except ValueError:
+        inicial = None
+
+    if not isinstance(inicial, dict) or inicial.get('type') != 'Feature':
+        try:
+            coleccion = json.loads(primera + texto.read())
+        except ValueError:
+            raise ArchivoInvalido('El archivo no es GeoJSON válido')
+        if not isinstance(coleccion, dict) or coleccion.get('type') != 'FeatureCollection':
+            raise ArchivoInvalido('Se esperaba una FeatureCollection o una Feature por línea')
+        for numero, feature in enumerate(coleccion.get('features') or [], start=1):
+            yield _fila_feature(numero, feature)
+        return
+
+    yield _fila_feature(1, inicial)
+    for numero, linea in enumerate(texto, start=2):
+        linea = linea.strip().lstrip('\x1e')
+        if not linea:
+            continue
+        try:
+            yield _fila_feature(numero, json.loads(linea))
+        except ValueError:
+            yield [numero, 'JSON inválido'] + [None] * len(CAMPOS)
+
+
+class _FlujoCOPY:
+    """Archivo de solo lectura para copy_expert: arma el CSV por bloques conforme
+    Postgres lo pide, sin tener el archivo completo en memoria."""
+
+    def __init__(self, filas, progreso=None):
+        self._filas = iter(filas)
+        self._salida = io.StringIO()
+        self._escritor = csv.writer(self._salida, lineterminator='\n')
+        self._pendiente = ''
+        self._progreso = progreso
+        self.leidas = 0
+        self.error = None
+
+    def read(self, tamano=-1):
+        while tamano < 0 or len(self._pendiente) < tamano:
+            try:
+                bloque = list(islice(self._filas, FILAS_POR_BLOQUE))
+            except (csv.Error, UnicodeDecodeError) as error:
+                # Una excepción aquí cortaría el COPY desde C: se guarda y se termina el flujo
+                self.error, bloque = error, []
+            if not bloque:
+                break
+            self._salida.seek(0)
+            self._salida.truncate()
+            self._escritor.writerows(bloque)
+            self._pendiente += self._salida.getvalue()
+            anterior, self.leidas = self.leidas, self.leidas + len(bloque)
+            if self._progreso and self.leidas // settings.IMPORTACION_PROGRESO > anterior // settings.IMPORTACION_PROGRESO:
+                self._progreso('leídas', self.leidas)
+        if tamano < 0:
+            tamano = len(self._pendiente)
+        salida, self._pendiente = self._pendiente[:tamano], self._pendiente[tamano:]
+        return salida
+
+
+# ---------------------------------------------------------------------
+# CARGA: COPY a una tabla temporal, validación en SQL e INSERT ... SELECT
+# ---------------------------------------------------------------------
+def _validar(cursor):
+    """Crea importacion_validada: cada fila con su fecha y punto ya construidos
+    por la base, o con el motivo del rechazo."""
+    tipos = tuple(clave for clave, _ in Reporte.TIPOS_PROBLEMA)
+    estados = tuple(clave for clave, _ in Reporte.STATUS_OPCIONES)
+    reportes = Reporte._meta.db_table
+    # Fecha ilegible -> NULL en vez de abortar el lote (PG 15 no tiene pg_input_is_valid)
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION pg_temp.importar_fecha(texto text) RETURNS timestamptz AS $$
+        BEGIN
+            RETURN texto::timestamptz;
+        EXCEPTION WHEN others THEN
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    cursor.execute(f"""
+        CREATE TEMP TABLE importacion_validada ON COMMIT DROP AS
+        SELECT i.linea, i.folio, i.tipo_problema, i.status, i.descripcion, i.direccion_texto, i.colonia, v.fecha, v.ubicacion,
+            coalesce(i.motivo, CASE
+                WHEN i.tipo_problema IS NULL OR i.tipo_problema NOT IN %s THEN 'tipo_problema inválido'
+                WHEN i.status IS NOT NULL AND i.status NOT IN %s THEN 'status inválido'
+                WHEN v.ubicacion IS NULL THEN 'coordenadas inválidas'
+                WHEN NOT ST_Intersects(v.ubicacion, ST_MakeEnvelope(%s, %s, %s, %s, 4326))
+                    THEN 'fuera del área de servicio'
+                WHEN v.fecha IS NULL THEN 'fecha inválida'
+                WHEN v.fecha > now() THEN 'fecha en el futuro'
+                WHEN length(i.direccion_texto) > 255 THEN 'dirección de más de 255 caracteres'
+                WHEN length(i.colonia) > 100 THEN 'colonia de más de 100 caracteres'
+                WHEN length(i.folio) > 20 THEN 'folio de más de 20 caracteres'
+                WHEN i.repeticion > 1 THEN 'folio repetido en el archivo'
+                WHEN EXISTS (SELECT 1 FROM {reportes} r WHERE r.folio = i.folio) THEN 'el folio ya existe'
+            END) AS motivo
+        FROM (
+            SELECT linea, motivo, folio, descripcion, direccion_texto, trim(colonia) AS colonia, fecha_hora, longitud, latitud,
+                nullif(upper(trim(tipo_problema)), '') AS tipo_problema, nullif(upper(trim(status)), '') AS status,
+                CASE WHEN folio IS NOT NULL
+                    THEN row_number() OVER (PARTITION BY folio ORDER BY linea) END AS repeticion
+            FROM importacion_reportes
+        ) i
+        CROSS JOIN LATERAL (SELECT
+            CASE WHEN i.fecha_hora IS NULL THEN now() ELSE pg_temp.importar_fecha(i.fecha_hora) END AS fecha,
+            CASE WHEN i.longitud ~ %s AND i.latitud ~ %s
+                THEN ST_SetSRID(ST_MakePoint(i.longitud::float8, i.latitud::float8), 4326) END AS ubicacion
+        ) v
+    """, [tipos, estados, *settings.IMPORTACION_BBOX, NUMERO, NUMERO])
+
+
+def _insertar(cursor):
+    """INSERT ... SELECT de las filas válidas; los folios vacíos los pone
+    api_nuevo_folio() y la estadística diaria se suma en un solo upsert."""
+    reportes = Reporte._meta.db_table
+    diaria = EstadisticaDiaria._meta.db_table
+    cursor.execute("SET LOCAL app.silenciar_eventos = 'on'")
+    cursor.execute("SET LOCAL app.estadistica_diferida = 'on'")
+    cursor.execute(f"""
+        WITH nuevos AS (
+            INSERT INTO {reportes} (
+                folio, tipo_problema, descripcion, direccion_texto, colonia, ubicacion, status,
+                fecha_hora, fecha_actualizacion, nota_seguimiento, validaciones, prioridad
+            )
+            SELECT coalesce(folio, api_nuevo_folio()), tipo_problema, coalesce(descripcion, ''),
+                coalesce(direccion_texto, ''), coalesce(colonia, ''), ubicacion, coalesce(status, 'PENDIENTE'),
+                fecha, now(), '', 0, 0
+            FROM importacion_validada
+            WHERE motivo IS NULL
+            ORDER BY linea
+            RETURNING fecha_hora, tipo_problema, status, colonia
+        ), conteo AS (
+            INSERT INTO {diaria} (fecha, tipo_problema, status, colonia, total)
+            SELECT (fecha_hora AT TIME ZONE %s)::date, tipo_problema, status, colonia, count(*)
+            FROM nuevos
+            GROUP BY 1, 2, 3, 4
+            ON CONFLICT (fecha, tipo_problema, status, colonia)
+            DO UPDATE SET total = {diaria}.total + EXCLUDED.total
+        )
+        SELECT count(*) FROM nuevos
+    """, [settings.TIME_ZONE])
+    return cursor.fetchone()[0]
+
+
+def importar(texto, formato, progreso=None, simular=False):
+    """Carga un CSV o GeoJSON (`texto`: archivo de texto) en una sola transacción.
+
+    Regresa {leidas, insertadas, rechazadas, rechazos: [{linea, motivo}], segundos}.
+    Con `simular` se valida todo y se deshace al final. `progreso(etapa, filas)`
+    se llama cada IMPORTACION_PROGRESO filas leídas y al cambiar de etapa
+    (por defecto va al log).
+    """
+    inicio = time.perf_counter()
+    progreso = progreso or (lambda etapa, cantidad: logger.info('Importación: %s %s filas', etapa, cantidad))
+    filas = filas_csv(texto) if formato == 'csv' else filas_geojson(texto)
+    try:
+        # Encabezados y FeatureCollection se revisan aquí, antes de abrir la transacción
+        primera = next(filas, None)
+    except (csv.Error, UnicodeDecodeError) as error:
+        raise ArchivoInvalido(f'No se pudo leer el archivo: {error}')
+    flujo = _FlujoCOPY(chain([primera], filas) if primera else [], progreso)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"""
+            CREATE TEMP TABLE importacion_reportes (
+                linea bigint, motivo text, {', '.join(f'{campo} text' for campo in CAMPOS)}
+            ) ON COMMIT DROP
+        """)
+        cursor.copy_expert(
+            f"COPY importacion_reportes (linea, motivo, {', '.join(CAMPOS)}) FROM STDIN WITH (FORMAT csv)",
+            flujo, size=1 << 16,
+        )
+        if flujo.error:
+            raise ArchivoInvalido(f'No se pudo leer el archivo después de {flujo.leidas} filas: {flujo.error}')
+        progreso('validando', flujo.leidas)
+        _validar(cursor)
+        cursor.execute("""
+            SELECT linea, motivo, count(*) OVER () FROM importacion_validada
+            WHERE motivo IS NOT NULL ORDER BY linea LIMIT %s
+        """, [settings.IMPORTACION_MAX_RECHAZOS])
+        rechazos = cursor.fetchall()
+        rechazadas = rechazos[0][2] if rechazos else 0
+
+        progreso('insertando', flujo.leidas - rechazadas)
+        insertadas = _insertar(cursor)
+        if simular:
+            transaction.set_rollback(True)
+        elif insertadas:
+            def invalidar():
+                incrementar_version('reportes')
+                invalidar_capa('reportes')
+            transaction.on_commit(invalidar)
+
+    return {
+        'leidas': flujo.leidas,
+        'insertadas': insertadas,
+        'rechazadas': rechazadas,
+        'rechazos': [{'linea': linea, 'motivo': motivo} for linea, motivo, _ in rechazos],
+        'segundos': round(time.perf_counter() - inicio, 1),
+    }
@@ -0,0 +1,113 @@
+import json
+from decimal import ROUND_HALF_EVEN, Decimal
+
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+
+from .geo import Latitud, Longitud
+from .metricas import serializando
+from .serializers import ReporteCiudadanoSerializer
+
+# Mismos parámetros que JSONRenderer con los defaults de DRF
+# (UNICODE_JSON, COMPACT_JSON y STRICT_JSON en True)
+_encoder = json.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+FORMATO_FECHA = ReporteCiudadanoSerializer._declared_fields['fecha_formato'].format
+
+COLUMNAS = [
+    'id', 'folio', 'tipo_problema', 'descripcion', 'direccion_texto', 'foto', 'foto_miniatura',
+    'status', 'fecha_hora', 'usuario_id', 'usuario__username', 'nota_seguimiento',
+    'foto_solucion', 'foto_solucion_miniatura', 'validaciones', 'prioridad',
+]
+
+
+# ---------------------------------------------------------------------
+# LISTA RÁPIDA: values() planos + JSON directo, mismos bytes que el serializer
+# ---------------------------------------------------------------------
+def consulta(queryset, extra=()):
+    """Un solo SELECT (JOIN al usuario), coordenadas con ST_X/ST_Y, sin GEOS ni instancias."""
+    campos = COLUMNAS + [c for c in extra if c not in COLUMNAS]
+    return queryset.annotate(latitud=Latitud('ubicacion'), longitud=Longitud('ubicacion')).values(
+        *campos, 'latitud', 'longitud',
+    )
+
+
+def numero_wkt(valor):
+    """Un número como lo escribe el WKTWriter de GEOS (trim): el repr más corto,
+    a lo más 16 decimales, y notación científica fuera de [1e-4, 1e17)."""
+    if valor == 0:
+        return '0'
+    if abs(valor) < 1e-4 or abs(valor) >= 1e17:
+        mantisa, _, exponente = repr(valor).partition('e')
+        return f"{mantisa.removesuffix('.0')}e{exponente[0]}{exponente[1:].lstrip('0')}"
+    texto = repr(valor)
+    if 'e' in texto:
+        texto = format(valor, '.0f')
+    elif len(texto.partition('.')[2]) > 16:
+        texto = format(Decimal(texto).quantize(Decimal('1e-16'), ROUND_HALF_EVEN), 'f').rstrip('0')
+    return texto.removesuffix('.0').removesuffix('.')
+
+
+def _urls(request):
+    """nombre -> URL absoluta o None, igual que FileField.to_representation."""
+    if isinstance(default_storage, FileSystemStorage):
+        # FileSystemStorage.url() es urljoin(MEDIA_URL, nombre): el prefijo se arma una vez
+        prefijo = request.build_absolute_uri(default_storage.base_url)
+
+        def url(nombre):
+            return prefijo + filepath_to_uri(nombre) if nombre else None
+    else:
+        def url(nombre):
+            return request.build_absolute_uri(default_storage.url(nombre)) if nombre else None
+    return url
+
+
+def representar(fila, url, zona):
+    """Dict con las llaves y el orden de ReporteCiudadanoSerializer."""
+    datos = {
+        'id': fila['id'],
+        'folio': fila['folio'],
+        'tipo_problema': fila['tipo_problema'],
+        'descripcion': fila['descripcion'],
+        'direccion_texto': fila['direccion_texto'],
+        'latitud': fila['latitud'],
+        'longitud': fila['longitud'],
+        'ubicacion': f"SRID=4326;POINT ({numero_wkt(fila['longitud'])} {numero_wkt(fila['latitud'])})",
+        'foto': url(fila['foto']),
+        'foto_miniatura': url(fila['foto_miniatura']),
+        'status': fila['status'],
+        # DateTimeField de DRF: a la zona actual y strftime
+        'fecha_formato': fila['fecha_hora'].astimezone(zona).strftime(FORMATO_FECHA),
+        'usuario': fila['usuario_id'],
+    }
+    # Sin usuario, DRF omite la llave (source='usuario.username' lanza SkipField)
+    if fila['usuario_id'] is not None:
+        datos['usuario_nombre'] = fila['usuario__username']
+    datos['nota_seguimiento'] = fila['nota_seguimiento']
+    datos['foto_solucion'] = url(fila['foto_solucion'])
+    datos['foto_solucion_miniatura'] = url(fila['foto_solucion_miniatura'])
+    datos['validaciones'] = fila['validaciones']
+    datos['prioridad'] = fila['prioridad']
+    return datos
+
+
+def _json(valor):
+    # JSONRenderer escapa estos dos separadores para que el JSON sea JavaScript válido
+    return _encoder.encode(valor).replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+
+
+def json_lista(filas, request):
+    url, zona = _urls(request), timezone.get_current_timezone()
+    with serializando():
+        return _json([representar(fila, url, zona) for fila in filas])
+
+
+def respuesta_lista(filas, request):
+    return HttpResponse(json_lista(filas, request).encode(), content_type='application/json')
+
+
+def respuesta_pagina(filas, request, siguiente):
+    # Mismo sobre que KeysetPagination.get_paginated_response
+    contenido = f'{{"next":{_json(siguiente)},"results":{json_lista(filas, request)}}}'
+    return HttpResponse(contenido.encode(), content_type='application/json')
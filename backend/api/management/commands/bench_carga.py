@@ -0,0 +1,155 @@
+import threading
+import time
+from collections import defaultdict
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from api.bench import comparar, guardar, resumen
+
+# nombre -> ruta; lo que abre la app pública al cargar el mapa
+PUBLICOS = {
+    'reportes': '/api/reportes/',
+    'reportes_bbox': '/api/reportes/?bbox=-98.895,19.305,-98.870,19.330&zoom=15',
+    'clusters': '/api/reportes/clusters/?bbox=-98.98,19.24,-98.78,19.38&zoom=13',
+    'noticias': '/api/noticias/',
+    'pozos': '/api/pozos/',
+}
+# Con --token o --usuario: el tablero del gobierno
+ADMIN = {
+    'estadisticas': '/api/admin-dashboard/estadisticas_generales/',
+    'semanal': '/api/admin-dashboard/reporte_semanal/',
+    'analitica': '/api/admin-dashboard/analitica/?por=tipo_problema',
+    'mapa_calor': '/api/admin-dashboard/mapa_calor/',
+}
+
+
+class Command(BaseCommand):
+    help = ('Genera carga HTTP contra un servidor ya levantado y mide p50/p95/p99 y peticiones '
+            'por segundo de cada endpoint. Resultados en JSON con --salida.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000')
+        parser.add_argument('--endpoint', action='append', default=[], metavar='NOMBRE=RUTA',
+                            help='Se puede repetir; sin él van los endpoints públicos (y los del tablero con sesión).')
+        parser.add_argument('--concurrencia', type=int, default=8, help='Clientes en paralelo.')
+        parser.add_argument('--duracion', type=float, default=30, help='Segundos de medición.')
+        parser.add_argument('--calentamiento', type=float, default=3, help='Segundos previos que no cuentan.')
+        parser.add_argument('--token', help='Access token JWT (Bearer).')
+        parser.add_argument('--usuario', help='Obtiene el token con /auth/jwt/create/.')
+        parser.add_argument('--password')
+        parser.add_argument('--salida', help='Archivo JSON con los resultados.')
+        parser.add_argument('--comparar', help='JSON de una corrida anterior: avisa si algún p95 empeoró.')
+        parser.add_argument('--tolerancia', type=float, default=0.10)
+
+    def handle(self, *args, **options):
+        url = options['url'].rstrip('/')
+        token = options['token'] or self._token(url, options['usuario'], options['password'])
+        endpoints = self._endpoints(options['endpoint'], token)
+        encabezados = {'Accept': 'application/json'}
+        if token:
+            encabezados['Authorization'] = f'Bearer {token}'
+
+        self.stdout.write(
+            f"{len(endpoints)} endpoints, {options['concurrencia']} clientes, "
+            f"{options['calentamiento']:g} s de calentamiento + {options['duracion']:g} s"
+        )
+        tiempos, errores, bytes_ = self._correr(
+            url, endpoints, encabezados, options['concurrencia'], options['calentamiento'], options['duracion'],
+        )
+
+        resultados = {}
+        for nombre in endpoints:
+            datos = resumen(tiempos[nombre], options['duracion'])
+            datos['errores'] = errores[nombre]
+            datos['bytes_promedio'] = bytes_[nombre] // max(1, len(tiempos[nombre]))
+            resultados[nombre] = datos
+        resultados['total'] = resumen([t for lista in tiempos.values() for t in lista], options['duracion'])
+        resultados['total']['errores'] = sum(errores.values())
+
+        for nombre, datos in resultados.items():
+            if not datos['n']:
+                self.stdout.write(self.style.ERROR(f'{nombre:<16} sin respuestas exitosas ({datos["errores"]} errores)'))
+                continue
+            self.stdout.write(
+                f"{nombre:<16} {datos['por_segundo']:>8.1f} req/s   p50 {datos['p50_ms']:>8.1f} ms   "
+                f"p95 {datos['p95_ms']:>8.1f} ms   p99 {datos['p99_ms']:>8.1f} ms   {datos['errores']} errores"
+            )
+
+        if options['salida']:
+            parametros = {
+                'url': url, 'concurrencia': options['concurrencia'], 'duracion': options['duracion'],
+                'endpoints': endpoints,
+            }
+            guardar(options['salida'], 'carga', parametros, resultados)
+            self.stdout.write(f"Resultados en {options['salida']}")
+        if options['comparar']:
+            regresiones = comparar(resultados, options['comparar'], tolerancia=options['tolerancia'])
+            if not regresiones:
+                self.stdout.write(self.style.SUCCESS('Sin regresiones contra la corrida base.'))
+            for nombre, antes, ahora, cambio in regresiones:
+                self.stdout.write(self.style.WARNING(
+                    f'{nombre}: p95 {antes:.1f} -> {ahora:.1f} ms (+{100 * cambio:.0f} %)'
+                ))
+
+    def _token(self, url, usuario, password):
+        if not usuario:
+            return None
+        respuesta = requests.post(f'{url}/auth/jwt/create/', json={'username': usuario, 'password': password}, timeout=10)
+        if respuesta.status_code != 200:
+            raise CommandError(f'No se pudo iniciar sesión como {usuario}: HTTP {respuesta.status_code}')
+        return respuesta.json()['access']
+
+    def _endpoints(self, pedidos, token):
+        if not pedidos:
+            return {**PUBLICOS, **(ADMIN if token else {})}
+        endpoints = {}
+        for pedido in pedidos:
+            nombre, separador, ruta = pedido.partition('=')
+            if not separador or not ruta.startswith('/'):
+                raise CommandError(f'--endpoint espera NOMBRE=/ruta, no {pedido!r}')
+            endpoints[nombre] = ruta
+        return endpoints
+
+    # -----------------------------------------------------------------
+    # CLIENTES: cada hilo con su sesión (keep-alive) y los endpoints en rueda
+    # -----------------------------------------------------------------
+    def _correr(self, url, endpoints, encabezados, concurrencia, calentamiento, duracion):
+        tiempos, errores, bytes_ = defaultdict(list), defaultdict(int), defaultdict(int)
+        candado = threading.Lock()
+        inicio = time.perf_counter() + calentamiento
+        fin = inicio + duracion
+        nombres = list(endpoints)
+
+        def cliente(numero):
+            sesion = requests.Session()
+            sesion.headers.update(encabezados)
+            i = numero  # cada cliente empieza en un endpoint distinto
+            while True:
+                antes = time.perf_counter()
+                if antes >= fin:
+                    break
+                nombre = nombres[i % len(nombres)]
+                i += 1
+                try:
+                    respuesta = sesion.get(url + endpoints[nombre], timeout=60)
+                    ok, tamano = respuesta.status_code < 400, len(respuesta.content)
+                except requests.RequestException:
+                    ok, tamano = False, 0
+                despues = time.perf_counter()
+                # Solo cuenta lo que empezó y terminó dentro de la ventana de medición
+                if antes < inicio or despues > fin:
+                    continue
+                with candado:
+                    if ok:
+                        tiempos[nombre].append(1000 * (despues - antes))
+                        bytes_[nombre] += tamano
+                    else:
+                        errores[nombre] += 1
+
+        hilos = [threading.Thread(target=cliente, args=(n,), daemon=True) for n in range(concurrencia)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return tiempos, errores, bytes_
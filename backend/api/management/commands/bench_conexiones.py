@@ -0,0 +1,105 @@
+import copy
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.utils import load_backend
+
+from api.bench import comparar, guardar, resumen
+
+POSTGIS = 'django.contrib.gis.db.backends.postgis'
+# modo -> (backend, CONN_MAX_AGE)
+MODOS = {
+    # Lo de siempre: conexión nueva en cada petición y cerrada al final
+    'por_peticion': (POSTGIS, 0),
+    # Una conexión por hilo que nunca se cierra (CONN_MAX_AGE=None)
+    'persistente': (POSTGIS, None),
+    # Pool por proceso compartido por los hilos (mysite/pool)
+    'pool': ('mysite.pool', 0),
+}
+
+
+class Command(BaseCommand):
+    help = ('Compara el costo de conexión por petición: conexión nueva, persistente por hilo y pool '
+            'compartido, con N hilos simulando peticiones. Para el throughput HTTP de extremo a extremo '
+            'corre bench_carga contra SERVIDOR=desarrollo y contra SERVIDOR=wsgi/asgi.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modo', nargs='+', choices=list(MODOS), default=list(MODOS))
+        parser.add_argument('--hilos', type=int, default=8)
+        parser.add_argument('--peticiones', type=int, default=200, help='Por hilo.')
+        parser.add_argument('--consultas', type=int, default=3, help='SELECT por petición simulada.')
+        parser.add_argument('--pool', type=int, help='POOL_MAX para el modo pool (por defecto, uno por hilo).')
+        parser.add_argument('--salida', help='Archivo JSON con los resultados.')
+        parser.add_argument('--comparar', help='JSON de una corrida anterior: avisa si algún p95 empeoró.')
+        parser.add_argument('--tolerancia', type=float, default=0.10)
+
+    def handle(self, *args, **options):
+        resultados = {}
+        for modo in options['modo']:
+            backend, max_age = MODOS[modo]
+            configuracion = copy.deepcopy(connections.settings['default'])
+            configuracion.update(ENGINE=backend, CONN_MAX_AGE=max_age, POOL_MAX=options['pool'] or options['hilos'])
+            tiempos, segundos, abiertas = self._correr(
+                modo, configuracion, options['hilos'], options['peticiones'], options['consultas'],
+            )
+            datos = resultados[modo] = {**resumen(tiempos, segundos), 'conexiones_abiertas': abiertas}
+            self.stdout.write(
+                f"{modo:<13} {datos['por_segundo']:>9.1f} pet/s   p50 {datos['p50_ms']:>7.2f} ms   "
+                f"p95 {datos['p95_ms']:>7.2f} ms   p99 {datos['p99_ms']:>7.2f} ms   {abiertas} conexiones abiertas"
+            )
+
+        if options['salida']:
+            parametros = {k: options[k] for k in ('hilos', 'peticiones', 'consultas', 'pool')}
+            guardar(options['salida'], 'conexiones', parametros, resultados)
+            self.stdout.write(f"Resultados en {options['salida']}")
+        if options['comparar']:
+            regresiones = comparar(resultados, options['comparar'], tolerancia=options['tolerancia'])
+            if not regresiones:
+                self.stdout.write(self.style.SUCCESS('Sin regresiones contra la corrida base.'))
+            for nombre, antes, ahora, cambio in regresiones:
+                self.stdout.write(self.style.WARNING(f'{nombre}: p95 {antes:.2f} -> {ahora:.2f} ms (+{100 * cambio:.0f} %)'))
+
+    def _correr(self, modo, configuracion, hilos, peticiones, consultas):
+        DatabaseWrapper = load_backend(configuracion['ENGINE']).DatabaseWrapper
+        tiempos, abiertas = [], [0]
+        candado = threading.Lock()
+        arranque = threading.Barrier(hilos + 1)
+
+        def hilo():
+            # Un wrapper por hilo, como los de django.db.connections
+            conexion = DatabaseWrapper(copy.deepcopy(configuracion), alias=f'bench_{modo}')
+            propios, nuevas = [], 0
+            arranque.wait()
+            for _ in range(peticiones):
+                inicio = time.perf_counter()
+                # Lo que hace Django por petición: request_started/finished y las consultas de la vista
+                conexion.close_if_unusable_or_obsolete()
+                if conexion.connection is None:
+                    nuevas += 1
+                with conexion.cursor() as cursor:
+                    for _ in range(consultas):
+                        cursor.execute('SELECT 1')
+                        cursor.fetchone()
+                conexion.close_if_unusable_or_obsolete()
+                propios.append(1000 * (time.perf_counter() - inicio))
+            conexion.close()
+            with candado:
+                tiempos.extend(propios)
+                abiertas[0] += nuevas
+
+        trabajadores = [threading.Thread(target=hilo) for _ in range(hilos)]
+        for trabajador in trabajadores:
+            trabajador.start()
+        arranque.wait()
+        inicio = time.perf_counter()
+        for trabajador in trabajadores:
+            trabajador.join()
+        segundos = time.perf_counter() - inicio
+
+        if hasattr(DatabaseWrapper, 'estado_pool'):
+            # En modo pool "abrir" casi siempre es tomar una ya abierta: cuentan las creadas
+            estado = DatabaseWrapper(configuracion, alias=f'bench_{modo}').estado_pool()
+            abiertas[0] = estado['creadas']
+        return tiempos, segundos, abiertas[0]
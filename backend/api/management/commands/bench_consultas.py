@@ -0,0 +1,163 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Polygon
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.bench import comparar, guardar, medir, resumen
+from api.exportar import respuesta_exportacion
+from api.listado import consulta, json_lista
+from api.models import Pipa, Reporte, Validacion
+from api.serializers import PipaSerializer, ReporteAdminSerializer, ReporteCiudadanoSerializer
+from api.views import DashboardAdminViewSet
+
+# Centro de Ixtapaluca, ~2 km por lado: lo que ve el mapa a zoom 15
+BBOX = (-98.895, 19.305, -98.870, 19.330)
+
+
+class Command(BaseCommand):
+    help = ('Micro-benchmarks de serializers, querysets y vistas del dashboard sobre los datos de la base '
+            '(carga antes con generar_sinteticos). Resultados en JSON con --salida.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=1000, help='Reportes por serialización.')
+        parser.add_argument('--repeticiones', type=int, default=20)
+        parser.add_argument('--caso', nargs='+', default=[], help='Solo los casos que empiecen así (p. ej. serializer/).')
+        parser.add_argument('--salida', help='Archivo JSON con los resultados.')
+        parser.add_argument('--comparar', help='JSON de una corrida anterior: avisa si algún p95 empeoró.')
+        parser.add_argument('--tolerancia', type=float, default=0.10)
+        parser.add_argument('--semilla', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if not Reporte.objects.exists():
+            raise CommandError('No hay reportes: corre generar_sinteticos primero.')
+        self.azar = random.Random(options['semilla'])
+        self.fabrica = APIRequestFactory()
+        casos = {
+            **self._serializadores(options['filas']),
+            **self._consultas(),
+            **self._dashboard(),
+        }
+        if options['caso']:
+            casos = {nombre: caso for nombre, caso in casos.items() if nombre.startswith(tuple(options['caso']))}
+
+        resultados = {}
+        for nombre, caso in casos.items():
+            resultados[nombre] = resumen(medir(caso, options['repeticiones']))
+            datos = resultados[nombre]
+            self.stdout.write(
+                f"{nombre:<36} p50 {datos['p50_ms']:>9.2f} ms   p95 {datos['p95_ms']:>9.2f} ms   "
+                f"p99 {datos['p99_ms']:>9.2f} ms"
+            )
+
+        if options['salida']:
+            parametros = {
+                'filas': options['filas'], 'repeticiones': options['repeticiones'],
+                'reportes_en_base': Reporte.objects.count(),
+            }
+            guardar(options['salida'], 'consultas', parametros, resultados)
+            self.stdout.write(f"Resultados en {options['salida']}")
+        if options['comparar']:
+            self._reportar_regresiones(comparar(resultados, options['comparar'], tolerancia=options['tolerancia']))
+
+    def _reportar_regresiones(self, regresiones):
+        if not regresiones:
+            self.stdout.write(self.style.SUCCESS('Sin regresiones contra la corrida base.'))
+        for nombre, antes, ahora, cambio in regresiones:
+            self.stdout.write(self.style.WARNING(f'{nombre}: p95 {antes:.2f} -> {ahora:.2f} ms (+{100 * cambio:.0f} %)'))
+
+    # -----------------------------------------------------------------
+    # SERIALIZACIÓN: datos ya en memoria, solo se mide armar el JSON
+    # -----------------------------------------------------------------
+    def _serializadores(self, filas):
+        request = self.fabrica.get('/api/reportes/', HTTP_HOST='localhost')
+        renderer = JSONRenderer()
+        qs = Reporte.objects.order_by('-id')[:filas]
+        instancias = list(qs.select_related('usuario'))
+        valores = list(consulta(qs))
+        pipas = list(Pipa.objects.all())
+        contexto = {'request': request}
+        return {
+            'serializer/ciudadano': lambda: renderer.render(
+                ReporteCiudadanoSerializer(instancias, many=True, context=contexto).data
+            ),
+            'serializer/admin': lambda: renderer.render(
+                ReporteAdminSerializer(instancias, many=True, context=contexto).data
+            ),
+            'serializer/lista_rapida': lambda: json_lista(valores, request),
+            'serializer/pipas': lambda: renderer.render(PipaSerializer(pipas, many=True, context=contexto).data),
+        }
+
+    # -----------------------------------------------------------------
+    # QUERYSETS: lo que arma cada endpoint antes de serializar
+    # -----------------------------------------------------------------
+    def _consultas(self):
+        publicos = Reporte.objects.order_by('-prioridad', '-fecha_hora').filter(
+            Q(fecha_hora__gte=timezone.now() - timedelta(days=30)) | ~Q(status='RESUELTO')
+        )
+        vecino = (
+            User.objects.annotate(n=Count('reportes')).order_by('-n').values_list('pk', flat=True).first()
+        )
+        reportes = list(Reporte.objects.order_by('?').values_list('pk', flat=True)[:500])
+        usuarios = list(User.objects.order_by('?').values_list('pk', flat=True)[:500])
+
+        def validar():
+            # Voto real (INSERT + UPDATE con sus triggers), deshecho al final
+            with transaction.atomic():
+                Validacion.registrar(self.azar.choice(reportes), self.azar.choice(usuarios))
+                transaction.set_rollback(True)
+
+        def exportar():
+            qs = Reporte.objects.filter(fecha_hora__gte=timezone.now() - timedelta(days=30))
+            for _ in respuesta_exportacion(qs, 'csv').streaming_content:
+                pass
+
+        casos = {
+            'consulta/lista_publica': lambda: list(consulta(publicos)[:50]),
+            'consulta/bbox': lambda: list(consulta(publicos.filter(ubicacion__within=Polygon.from_bbox(BBOX)))[:500]),
+            'consulta/exportar_30d': exportar,
+        }
+        if vecino is not None:
+            casos['consulta/mis_reportes'] = lambda: list(
+                consulta(Reporte.objects.filter(usuario_id=vecino).order_by('-fecha_hora'))[:50]
+            )
+        if usuarios:
+            casos['consulta/validar'] = validar
+        return casos
+
+    # -----------------------------------------------------------------
+    # DASHBOARD: la vista completa (permisos, consulta y render), sin HTTP
+    # -----------------------------------------------------------------
+    def _dashboard(self):
+        admin = User(username='bench', is_staff=True, is_active=True)
+
+        def vista(accion, parametros=None):
+            funcion = DashboardAdminViewSet.as_view({'get': accion})
+
+            def llamar():
+                request = self.fabrica.get(f'/api/admin-dashboard/{accion}/', parametros or {}, HTTP_HOST='localhost')
+                force_authenticate(request, user=admin)
+                response = funcion(request)
+                if hasattr(response, 'render'):
+                    response.render()
+                if response.status_code != 200:
+                    raise CommandError(f'{accion}: HTTP {response.status_code}')
+            return llamar
+
+        return {
+            'dashboard/estadisticas_generales': vista('estadisticas_generales'),
+            'dashboard/reporte_semanal': vista('reporte_semanal'),
+            'dashboard/analitica_90d_colonia': vista('analitica', {
+                'desde': (timezone.now() - timedelta(days=90)).isoformat(), 'por': 'colonia',
+            }),
+            'dashboard/analitica_7d_hora': vista('analitica', {
+                'desde': (timezone.now() - timedelta(days=7)).isoformat(), 'granularidad': 'hora',
+            }),
+            'dashboard/mapa_calor': vista('mapa_calor'),
+        }
@@ -0,0 +1,56 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from api.despacho import matriz_costos, resolver
+
+# Zona de Ixtapaluca / Valle de Chalco, como en el mapa
+LON, LAT = (-98.98, -98.78), (19.24, 19.38)
+
+
+class Command(BaseCommand):
+    help = 'Mide el despacho en lote (matriz de costos + asignación) con datos sintéticos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pipas', type=int, default=300)
+        parser.add_argument('--reportes', type=int, default=20000)
+        parser.add_argument('--repeticiones', type=int, default=3)
+        parser.add_argument('--semilla', type=int, default=42)
+
+    def handle(self, *args, **options):
+        azar = np.random.default_rng(options['semilla'])
+        n, m = options['pipas'], options['reportes']
+        pipas = np.column_stack([
+            azar.uniform(*LON, n), azar.uniform(*LAT, n), azar.choice([5000, 10000, 20000], n),
+        ])
+        reportes = np.column_stack([
+            azar.uniform(*LON, m), azar.uniform(*LAT, m), azar.integers(0, 200, m),
+        ])
+        self.stdout.write(f'{n} pipas x {m} reportes')
+
+        for vuelta in range(1, options['repeticiones'] + 1):
+            inicio = time.perf_counter()
+            costo, distancia = matriz_costos(pipas, reportes)
+            matriz = time.perf_counter()
+            filas, columnas = resolver(costo)
+            fin = time.perf_counter()
+            self.stdout.write(
+                f'  #{vuelta}: matriz {1000 * (matriz - inicio):.0f} ms, '
+                f'asignación {1000 * (fin - matriz):.0f} ms, '
+                f'{len(filas)} asignados, {distancia[filas, columnas].mean():.2f} km promedio'
+            )
+
+        # Referencia: cada pipa toma el reporte libre más barato, en orden
+        inicio = time.perf_counter()
+        libres = np.ones(m, dtype=bool)
+        total = 0.0
+        for i in range(n):
+            j = int(np.argmin(np.where(libres, costo[i], np.inf)))
+            libres[j] = False
+            total += costo[i, j]
+        codicioso = time.perf_counter() - inicio
+        self.stdout.write(
+            f'Costo total: óptimo {costo[filas, columnas].sum():.1f} vs codicioso {total:.1f} '
+            f'({1000 * codicioso:.0f} ms)'
+        )
@@ -0,0 +1,86 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from api.listado import consulta, json_lista
+from api.models import Reporte
+from api.serializers import ReporteCiudadanoSerializer
+
+
+def _sinteticos(cantidad):
+    """(instancias, filas de values()) equivalentes, sin tocar la base."""
+    azar = random.Random(7)
+    usuarios = [User(id=i, username=f'vecino{i}') for i in range(1, 200)]
+    ahora = timezone.now()
+    instancias, filas = [], []
+    for i in range(1, cantidad + 1):
+        usuario = azar.choice(usuarios + [None])
+        lon, lat = azar.uniform(-98.98, -98.78), azar.uniform(19.24, 19.38)
+        foto = f'reportes/foto_{i}.jpg' if i % 3 else None
+        reporte = Reporte(
+            id=i, folio=f'IXT-{i:06d}', tipo_problema='FUGA', descripcion=f'Fuga número {i} «esquina»',
+            direccion_texto=f'Calle {i % 97}', ubicacion=Point(lon, lat, srid=4326), foto=foto,
+            status='PENDIENTE', fecha_hora=ahora - timedelta(minutes=i), usuario=usuario,
+            nota_seguimiento='', validaciones=i % 7, prioridad=i % 50,
+        )
+        instancias.append(reporte)
+        filas.append({
+            'id': i, 'folio': reporte.folio, 'tipo_problema': 'FUGA', 'descripcion': reporte.descripcion,
+            'direccion_texto': reporte.direccion_texto, 'foto': foto, 'foto_miniatura': None,
+            'status': 'PENDIENTE', 'fecha_hora': reporte.fecha_hora,
+            'usuario_id': usuario.id if usuario else None,
+            'usuario__username': usuario.username if usuario else None,
+            'nota_seguimiento': '', 'foto_solucion': None, 'foto_solucion_miniatura': None,
+            'validaciones': reporte.validaciones, 'prioridad': reporte.prioridad,
+            'latitud': lat, 'longitud': lon,
+        })
+    return instancias, filas
+
+
+class Command(BaseCommand):
+    help = 'Compara serializer vs. lista rápida (api/listado.py): tiempo y bytes idénticos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, nargs='+', default=[10000, 100000])
+        parser.add_argument('--sintetico', action='store_true',
+                            help='Datos en memoria: solo mide la serialización, sin consultas.')
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get('/api/reportes/', HTTP_HOST='localhost')
+        renderer = JSONRenderer()
+        for cantidad in options['filas']:
+            if options['sintetico']:
+                instancias, filas = _sinteticos(cantidad)
+                lento = lambda: renderer.render(
+                    ReporteCiudadanoSerializer(instancias, many=True, context={'request': request}).data
+                )
+                rapido = lambda: json_lista(filas, request).encode()
+            else:
+                qs = Reporte.objects.order_by('id')[:cantidad]
+                if qs.count() < cantidad:
+                    raise CommandError(f'Hay menos de {cantidad} reportes; usa --sintetico o carga datos.')
+                # Camino actual: instancias + GEOS + un SELECT de usuario por reporte
+                lento = lambda: renderer.render(
+                    ReporteCiudadanoSerializer(list(qs), many=True, context={'request': request}).data
+                )
+                rapido = lambda: json_lista(consulta(qs), request).encode()
+
+            inicio = time.perf_counter()
+            esperado = lento()
+            medio = time.perf_counter()
+            obtenido = rapido()
+            fin = time.perf_counter()
+            if esperado != obtenido:
+                raise CommandError(f'{cantidad} filas: la salida rápida difiere del serializer.')
+            self.stdout.write(
+                f'{cantidad} filas: serializer {1000 * (medio - inicio):.0f} ms, '
+                f'rápida {1000 * (fin - medio):.0f} ms (x{(medio - inicio) / (fin - medio):.1f}), '
+                f'{len(obtenido)} bytes idénticos'
+            )
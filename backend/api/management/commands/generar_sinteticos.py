@@ -0,0 +1,255 @@
+import csv
+import io
+import math
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.cache import incrementar_version, invalidar_capa
+from api.models import EstadisticaDiaria, PerfilCiudadano, Pipa, Reporte, Validacion
+
+# Colonias de Ixtapaluca con un centro aproximado (lon, lat) y su peso en el total
+COLONIAS = [
+    ('Centro', -98.882, 19.318, 10),
+    ('Ayotla', -98.925, 19.323, 9),
+    ('Tlapacoya', -98.911, 19.301, 7),
+    ('San Buenaventura', -98.862, 19.296, 8),
+    ('Los Héroes Ixtapaluca', -98.868, 19.305, 6),
+    ('Santa Bárbara', -98.899, 19.331, 5),
+    ('Geovillas de Santa Bárbara', -98.893, 19.337, 4),
+    ('Hornos Santa Bárbara', -98.905, 19.339, 3),
+    ('Acozac', -98.873, 19.335, 2),
+    ('El Tejolote', -98.898, 19.310, 3),
+    ('Zoquiapan', -98.849, 19.317, 2),
+]
+DISPERSION = 0.006  # grados (~650 m) alrededor del centro de la colonia
+TIPOS = (['FUGA', 'ESCASEZ', 'CALIDAD', 'ALCANTARILLADO', 'TRAMITE'], [0.40, 0.30, 0.10, 0.15, 0.05])
+ESTADOS = (['PENDIENTE', 'ASIGNADO', 'EN_PROCESO', 'RESUELTO', 'CANCELADO'], [0.20, 0.10, 0.08, 0.57, 0.05])
+# Reportes por hora del día: pocos de madrugada, picos en la mañana y al anochecer
+HORAS = np.array([1, 1, 1, 1, 1, 2, 4, 7, 9, 9, 8, 7, 6, 6, 6, 6, 7, 8, 8, 7, 5, 4, 3, 2], dtype=float)
+DESCRIPCIONES = {
+    'FUGA': 'Fuga de agua en la banqueta frente al número {n}',
+    'ESCASEZ': 'Sin agua desde el lunes en la cuadra del número {n}',
+    'CALIDAD': 'El agua sale turbia y con olor, casa {n}',
+    'ALCANTARILLADO': 'Alcantarilla tapada, se desborda con la lluvia ({n})',
+    'TRAMITE': 'Solicitud de toma nueva para el predio {n}',
+}
+CALLES = ['Av. Cuauhtémoc', 'Calle Morelos', 'Calle Hidalgo', 'Av. Juárez', 'Calle Allende', 'Calle Zaragoza',
+          'Calle Guerrero', 'Calle Aldama', 'Av. Jesús Reyes Heroles', 'Calle 5 de Mayo', 'Calle Insurgentes']
+
+
+def _copy(cursor, tabla, columnas, filas, no_nulos=()):
+    """COPY FROM STDIN de un bloque ya armado en memoria. En CSV el vacío es NULL:
+    las columnas de `no_nulos` lo leen como ''."""
+    salida = io.StringIO()
+    csv.writer(salida, lineterminator='\n').writerows(filas)
+    salida.seek(0)
+    opciones = f", FORCE_NOT_NULL ({', '.join(no_nulos)})" if no_nulos else ''
+    cursor.copy_expert(
+        f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN WITH (FORMAT csv{opciones})", salida, size=1 << 16,
+    )
+
+
+def _fechas(segundos):
+    """Epoch en segundos -> texto que COPY acepta como timestamptz (UTC)."""
+    return np.char.add(np.datetime_as_string(segundos.astype('datetime64[s]'), unit='s'), '+00')
+
+
+class Command(BaseCommand):
+    help = ('Carga datos sintéticos (usuarios, pipas, reportes y votos) alrededor de Ixtapaluca '
+            'con COPY, de 10 mil a 5 millones de reportes. Úsalo en una base de pruebas.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reportes', type=int, default=100000)
+        parser.add_argument('--usuarios', type=int, help='Por defecto, uno por cada 20 reportes.')
+        parser.add_argument('--pipas', type=int, default=60)
+        parser.add_argument('--dias', type=int, default=365, help='Antigüedad máxima de los reportes.')
+        parser.add_argument('--bloque', type=int, default=100000, help='Reportes por COPY (y por transacción).')
+        parser.add_argument('--semilla', type=int, default=42)
+
+    def handle(self, *args, **options):
+        total = options['reportes']
+        if not 1 <= total <= 5_000_000:
+            raise CommandError('--reportes va de 1 a 5,000,000.')
+        self.azar = np.random.default_rng(options['semilla'])
+        self.ahora = time.time()
+        # Medianoche local de hoy, para que las horas pico caigan en hora de Ixtapaluca
+        desfase = datetime.now(ZoneInfo(settings.TIME_ZONE)).utcoffset().total_seconds()
+        self.medianoche = self.ahora - (self.ahora + desfase) % 86400
+        inicio = time.perf_counter()
+
+        usuarios, colonias_usuario = self._usuarios(options['usuarios'] or max(50, total // 20))
+        pipas = self._pipas(options['pipas'])
+        ids = []
+        for desde in range(0, total, options['bloque']):
+            cantidad = min(options['bloque'], total - desde)
+            ids.append(self._reportes(cantidad, usuarios, colonias_usuario, pipas, options['dias']))
+            self.stdout.write(f'  {desde + cantidad} reportes ({time.perf_counter() - inicio:.0f} s)')
+        votos = self._validaciones(ids[0][0], ids[-1][1], usuarios)
+
+        incrementar_version('reportes')
+        invalidar_capa('reportes')
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(usuarios)} usuarios, {len(pipas)} pipas, {total} reportes y {votos} votos '
+            f'en {time.perf_counter() - inicio:.0f} s. Prioridad: corre recalcular_prioridad si la necesitas exacta.'
+        ))
+
+    # -----------------------------------------------------------------
+    # USUARIOS Y PERFILES (sin señales: el perfil se copia aparte)
+    # -----------------------------------------------------------------
+    def _usuarios(self, cantidad):
+        tabla = User._meta.db_table
+        colonias = self.azar.choice(len(COLONIAS), cantidad, p=self._pesos())
+        # Contraseña inutilizable: nadie entra con estas cuentas
+        clave = make_password(None)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {tabla} WHERE username LIKE %s', ['sintetico%'])
+            previos = cursor.fetchone()[0]
+            cursor.execute(f'SELECT coalesce(max(id), 0) FROM {tabla}')
+            anterior = cursor.fetchone()[0]
+            fecha = _fechas(np.array([self.ahora]))[0]
+            _copy(cursor, tabla, [
+                'password', 'is_superuser', 'username', 'first_name', 'last_name', 'email',
+                'is_staff', 'is_active', 'date_joined',
+            ], (
+                (clave, 'f', f'sintetico{previos + i}', '', '', f'sintetico{previos + i}@example.com', 'f', 't', fecha)
+                for i in range(cantidad)
+            ), no_nulos=['first_name', 'last_name'])
+            # COPY inserta en el orden del archivo: los ids salen en el mismo orden
+            cursor.execute(f'SELECT id FROM {tabla} WHERE id > %s ORDER BY id', [anterior])
+            ids = np.array([fila[0] for fila in cursor.fetchall()])
+            _copy(cursor, PerfilCiudadano._meta.db_table, ['user_id', 'colonia', 'telefono'], (
+                (usuario, COLONIAS[colonia][0], '') for usuario, colonia in zip(ids.tolist(), colonias.tolist())
+            ))
+        return ids, colonias
+
+    def _pipas(self, cantidad):
+        tabla = Pipa._meta.db_table
+        lon, lat = self._puntos(self.azar.choice(len(COLONIAS), cantidad, p=self._pesos()))
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {tabla} WHERE numero_economico LIKE %s', ['SINT-%'])
+            previas = cursor.fetchone()[0]
+            cursor.execute(f'SELECT coalesce(max(id), 0) FROM {tabla}')
+            anterior = cursor.fetchone()[0]
+            estados = self.azar.choice(['DISPONIBLE', 'EN_RUTA', 'TALLER'], cantidad, p=[0.5, 0.4, 0.1])
+            capacidades = self.azar.choice([5000, 10000, 20000], cantidad)
+            fecha = _fechas(np.array([self.ahora]))[0]
+            _copy(cursor, tabla, [
+                'numero_economico', 'capacidad_litros', 'chofer', 'estado', 'ubicacion_actual', 'ubicacion_fecha',
+            ], (
+                (f'SINT-{previas + i:05d}', capacidades[i], f'Chofer {previas + i}', estados[i],
+                 f'SRID=4326;POINT({lon[i]:.6f} {lat[i]:.6f})', fecha)
+                for i in range(cantidad)
+            ))
+            cursor.execute(f'SELECT id FROM {tabla} WHERE id > %s ORDER BY id', [anterior])
+            return np.array([fila[0] for fila in cursor.fetchall()])
+
+    # -----------------------------------------------------------------
+    # REPORTES: un COPY por bloque; la estadística diaria en un upsert
+    # -----------------------------------------------------------------
+    def _reportes(self, cantidad, usuarios, colonias_usuario, pipas, dias):
+        azar = self.azar
+        # 70 % con cuenta (colonia del perfil), el resto anónimos en cualquier colonia
+        con_usuario = azar.random(cantidad) < 0.7
+        usuario = np.where(con_usuario, azar.integers(0, len(usuarios), cantidad), -1)
+        colonia = np.where(con_usuario, colonias_usuario[usuario], azar.choice(len(COLONIAS), cantidad, p=self._pesos()))
+        lon, lat = self._puntos(colonia)
+
+        dia = np.floor(azar.random(cantidad) ** 1.5 * dias)  # más reportes recientes que viejos
+        hora = azar.choice(24, cantidad, p=HORAS / HORAS.sum())
+        fecha = self.medianoche - dia * 86400 + hora * 3600 + azar.integers(0, 3600, cantidad)
+        fecha = np.minimum(fecha, self.ahora - azar.integers(60, 3600, cantidad))
+
+        tipo = azar.choice(TIPOS[0], cantidad, p=TIPOS[1])
+        estado = azar.choice(ESTADOS[0], cantidad, p=ESTADOS[1])
+        # Tiempo de resolución log-normal, mediana ~36 h; lo que aún no termina sigue en proceso
+        resolucion = fecha + np.exp(azar.normal(math.log(36), 1.2, cantidad)) * 3600
+        estado = np.where((estado == 'RESUELTO') & (resolucion > self.ahora), 'EN_PROCESO', estado)
+        resuelto = estado == 'RESUELTO'
+        votos = np.minimum(azar.poisson(1.5, cantidad), min(30, len(usuarios) - 1))
+        con_pipa = np.isin(estado, ['ASIGNADO', 'EN_PROCESO', 'RESUELTO']) & (azar.random(cantidad) < 0.7)
+        if len(pipas):
+            pipa = pipas[azar.integers(0, len(pipas), cantidad)]
+        else:
+            pipa, con_pipa = np.zeros(cantidad, dtype=int), np.zeros(cantidad, dtype=bool)
+        numero = azar.integers(1, 400, cantidad)
+        calle = azar.integers(0, len(CALLES), cantidad)
+        texto_fecha, texto_resolucion = _fechas(fecha), _fechas(resolucion)
+        nombres = [nombre for nombre, *_ in COLONIAS]
+
+        # Columnas ya como listas de Python: indexar arreglos de numpy fila por fila es lo lento
+        columnas = zip(*(arreglo.tolist() for arreglo in (
+            tipo, numero, calle, lon, lat, estado, texto_fecha, texto_resolucion, resuelto, colonia,
+            np.where(con_usuario, usuarios[np.maximum(usuario, 0)], 0), con_usuario,
+            pipa, con_pipa, votos,
+        )))
+        filas = (
+            (
+                t, DESCRIPCIONES[t].format(n=n), f'{CALLES[c]} {n}', f'SRID=4326;POINT({x:.6f} {y:.6f})', e,
+                f, r if ok else f, nombres[col], r if ok else None, u if con_u else None, p if con_p else None,
+                'Atendido por la cuadrilla' if ok else '', v, v * Validacion.PUNTOS_POR_VOTO,
+            )
+            for t, n, c, x, y, e, f, r, ok, col, u, con_u, p, con_p, v in columnas
+        )
+        tabla = Reporte._meta.db_table
+        diaria = EstadisticaDiaria._meta.db_table
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Igual que api/importar.py: sin NOTIFY por fila y la diaria en un solo upsert
+            cursor.execute("SET LOCAL app.silenciar_eventos = 'on'")
+            cursor.execute("SET LOCAL app.estadistica_diferida = 'on'")
+            cursor.execute(f'SELECT coalesce(max(id), 0) FROM {tabla}')
+            anterior = cursor.fetchone()[0]
+            _copy(cursor, tabla, [
+                'tipo_problema', 'descripcion', 'direccion_texto', 'ubicacion', 'status', 'fecha_hora',
+                'fecha_actualizacion', 'colonia', 'fecha_resolucion', 'usuario_id', 'pipa_asignada_id',
+                'nota_seguimiento', 'validaciones', 'prioridad',
+            ], filas, no_nulos=['nota_seguimiento'])
+            cursor.execute(f"""
+                INSERT INTO {diaria} (fecha, tipo_problema, status, colonia, total)
+                SELECT (fecha_hora AT TIME ZONE %s)::date, tipo_problema, status, colonia, count(*)
+                FROM {tabla}
+                WHERE id > %s
+                GROUP BY 1, 2, 3, 4
+                ON CONFLICT (fecha, tipo_problema, status, colonia)
+                DO UPDATE SET total = {diaria}.total + EXCLUDED.total
+            """, [settings.TIME_ZONE, anterior])
+            cursor.execute(f'SELECT max(id) FROM {tabla}')
+            return anterior, cursor.fetchone()[0]
+
+    # -----------------------------------------------------------------
+    # VOTOS: derivados de reporte.validaciones, así que se arman en la base
+    # -----------------------------------------------------------------
+    def _validaciones(self, anterior, ultimo, usuarios):
+        # Paso coprimo con el número de usuarios: los k votantes de un reporte son distintos
+        n = len(usuarios)
+        paso = next(p for p in range(104729, 104729 + n + 2) if math.gcd(p, n) == 1)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute('CREATE TEMP TABLE sinteticos_votantes (i integer PRIMARY KEY, id integer) ON COMMIT DROP')
+            _copy(cursor, 'sinteticos_votantes', ['i', 'id'], enumerate(usuarios.tolist()))
+            cursor.execute(f"""
+                INSERT INTO {Validacion._meta.db_table} (reporte_id, usuario_id, fecha_voto)
+                SELECT r.id, u.id, least(now(), r.fecha_hora + k * interval '20 minutes')
+                FROM {Reporte._meta.db_table} r
+                CROSS JOIN LATERAL generate_series(1, r.validaciones) AS k
+                JOIN sinteticos_votantes u ON u.i = (r.id::bigint * 7919 + k::bigint * %s) %% %s
+                WHERE r.id > %s AND r.id <= %s
+                ON CONFLICT (reporte_id, usuario_id) DO NOTHING
+            """, [paso, n, anterior, ultimo])
+            return cursor.rowcount
+
+    # -----------------------------------------------------------------
+    def _pesos(self):
+        pesos = np.array([peso for *_, peso in COLONIAS], dtype=float)
+        return pesos / pesos.sum()
+
+    def _puntos(self, colonias):
+        centros = np.array([(lon, lat) for _, lon, lat, _ in COLONIAS])[colonias]
+        puntos = centros + self.azar.normal(0, DISPERSION, centros.shape)
+        return puntos[:, 0], puntos[:, 1]
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importar import FORMATOS, ArchivoInvalido, formato_de, importar
+
+
+class Command(BaseCommand):
+    help = ('Carga masiva de reportes (call center, sistema anterior) desde CSV o GeoJSON: '
+            'COPY a una tabla de paso, validación en la base y un solo INSERT.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo')
+        parser.add_argument('--formato', choices=sorted(set(FORMATOS.values())),
+                            help='Por defecto se deduce de la extensión.')
+        parser.add_argument('--encoding', default='utf-8-sig')
+        parser.add_argument('--simular', action='store_true',
+                            help='Valida y cuenta, pero deshace la carga al final.')
+
+    def progreso(self, etapa, filas):
+        self.stdout.write(f'  {etapa}: {filas} filas')
+
+    def handle(self, *args, **options):
+        try:
+            formato = options['formato'] or formato_de(options['archivo'])
+            with open(options['archivo'], encoding=options['encoding'], newline='') as texto:
+                resumen = importar(texto, formato, progreso=self.progreso, simular=options['simular'])
+        except (ArchivoInvalido, OSError) as error:
+            raise CommandError(str(error))
+
+        for rechazo in resumen['rechazos'][:20]:
+            self.stdout.write(f"  línea {rechazo['linea']}: {rechazo['motivo']}")
+        if resumen['rechazadas'] > 20:
+            self.stdout.write(f"  ... y {resumen['rechazadas'] - 20} rechazos más")
+        accion = 'validadas (simulación, nada se guardó)' if options['simular'] else 'insertadas'
+        self.stdout.write(self.style.SUCCESS(
+            f"{resumen['leidas']} filas leídas, {resumen['insertadas']} {accion}, "
+            f"{resumen['rechazadas']} rechazadas ({resumen['segundos']} s)."
+        ))
@@ -0,0 +1,43 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+
+from api.imagenes import CAMPOS_FOTO, procesar_foto
+from api.models import Reporte
+
+
+class Command(BaseCommand):
+    help = 'Recodifica las fotos existentes (reportes/ y soluciones/) y genera sus miniaturas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todas', action='store_true',
+                            help='Reprocesa también las que ya tienen miniatura o fallaron antes.')
+        parser.add_argument('--workers', type=int, default=4)
+
+    def handle(self, *args, **options):
+        pendientes = []
+        for campo, campo_miniatura in CAMPOS_FOTO:
+            qs = Reporte.objects.exclude(Q(**{f'{campo}__isnull': True}) | Q(**{campo: ''}))
+            if not options['todas']:
+                qs = qs.filter(Q(**{f'{campo_miniatura}__isnull': True}) | Q(**{campo_miniatura: ''}))
+                qs = qs.exclude(fotos_fallidas__contains=[campo])
+            pendientes += [(pk, campo, campo_miniatura) for pk in qs.values_list('pk', flat=True)]
+
+        total = len(pendientes)
+        self.stdout.write(f'{total} fotos por procesar.')
+
+        def tarea(pk, campo, campo_miniatura):
+            try:
+                procesar_foto(Reporte, pk, campo, campo_miniatura)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            futuros = [pool.submit(tarea, *p) for p in pendientes]
+            for hechas, futuro in enumerate(as_completed(futuros), 1):
+                futuro.result()
+                if hechas % 100 == 0 or hechas == total:
+                    self.stdout.write(f'  {hechas}/{total}')
+        self.stdout.write(self.style.SUCCESS('Listo.'))
@@ -0,0 +1,30 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.prioridad import recalcular
+
+
+class Command(BaseCommand):
+    help = ('Recalcula la prioridad de los reportes abiertos (edad, validaciones, densidad y pozos). '
+            'Pensado para cron: completo cada hora y --incremental cada 5 minutos.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--incremental', action='store_true',
+                            help='Solo los reportes cambiados en los últimos --minutos y sus vecinos.')
+        parser.add_argument('--minutos', type=int, default=10,
+                            help='Ventana de --incremental; que traslape con el intervalo del cron.')
+
+    def handle(self, *args, **options):
+        desde = None
+        if options['incremental']:
+            desde = timezone.now() - timedelta(minutes=options['minutos'])
+
+        inicio = time.perf_counter()
+        evaluados, actualizados = recalcular(cambiados_desde=desde)
+        self.stdout.write(self.style.SUCCESS(
+            f'{evaluados} reportes evaluados, {actualizados} con prioridad nueva '
+            f'({1000 * (time.perf_counter() - inicio):.0f} ms).'
+        ))
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from api.models import CeldaHexagonal, EstadisticaDiaria, EstadisticaHoraria, EstadisticaResolucion, Reporte
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los rollups del dashboard (diario, analítica y mapa de calor) a partir de la tabla de reportes.'
+
+    def handle(self, *args, **options):
+        reportes = Reporte._meta.db_table
+        diaria = EstadisticaDiaria._meta.db_table
+        celdas = CeldaHexagonal._meta.db_table
+        with transaction.atomic(), connection.cursor() as cursor:
+            # SHARE bloquea escrituras mientras reconstruimos; las lecturas siguen
+            cursor.execute(f'LOCK TABLE {reportes} IN SHARE MODE')
+            cursor.execute(f'DELETE FROM {diaria}')
+            cursor.execute(f"""
+                INSERT INTO {diaria} (fecha, tipo_problema, status, colonia, total)
+                SELECT (fecha_hora AT TIME ZONE %s)::date, tipo_problema, status, colonia, count(*)
+                FROM {reportes}
+                GROUP BY 1, 2, 3, 4
+            """, [settings.TIME_ZONE])
+            filas = cursor.rowcount
+            # Serie por hora e histograma de resolución (migración 0023)
+            cursor.execute(f'DELETE FROM {EstadisticaHoraria._meta.db_table}')
+            cursor.execute(f'DELETE FROM {EstadisticaResolucion._meta.db_table}')
+            cursor.execute(f"""
+                SELECT api_analitica_sumar(
+                    array_agg(fecha_hora), array_agg(tipo_problema), array_agg(status),
+                    array_agg(colonia), array_agg(fecha_resolucion), 1
+                )
+                FROM {reportes}
+            """)
+            # Mapa de calor: misma función que usa el trigger (migración 0022)
+            cursor.execute(f'DELETE FROM {celdas}')
+            cursor.execute(f"""
+                SELECT api_celdahexagonal_sumar(
+                    array_agg(ubicacion), array_agg(tipo_problema), array_agg(fecha_hora), 1
+                )
+                FROM {reportes}
+            """)
+            cursor.execute(f'SELECT count(*) FROM {celdas}')
+            hexagonos = cursor.fetchone()[0]
+        self.stdout.write(self.style.SUCCESS(f'Estadística diaria reconstruida: {filas} filas.'))
+        self.stdout.write(self.style.SUCCESS(f'Mapa de calor reconstruido: {hexagonos} celdas.'))
@@ -0,0 +1,321 @@
+import hmac
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+logger = logging.getLogger(__name__)
+
+SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CONSULTAS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+# Cuántas consultas se guardan por petición para el log de lentas
+MAX_SQL_LENTAS = 200
+
+
+# ---------------------------------------------------------------------
+# MEDICIÓN DE LA PETICIÓN EN CURSO (SQL y serialización)
+# ---------------------------------------------------------------------
+class Medicion:
+    def __init__(self, guardar_sql):
+        self.consultas = 0
+        self.sql_segundos = 0.0
+        self.serializacion = 0.0
+        self.serializando = False
+        self.sql = [] if guardar_sql else None
+
+    def ejecutar(self, execute, sql, params, many, context):
+        """execute_wrapper: cuenta y cronometra cada consulta."""
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            self.consultas += 1
+            self.sql_segundos += duracion
+            if self.sql is not None and len(self.sql) < MAX_SQL_LENTAS:
+                self.sql.append((duracion, sql))
+
+
+_actual = ContextVar('metricas_medicion', default=None)
+
+
+def _medir_sql(execute, sql, params, many, context):
+    """execute_wrapper fijo de cada conexión: mide solo si hay una petición en curso."""
+    medicion = _actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    return medicion.ejecutar(execute, sql, params, many, context)
+
+
+def _instalar(conexion):
+    if _medir_sql not in conexion.execute_wrappers:
+        conexion.execute_wrappers.append(_medir_sql)
+
+
+@receiver(connection_created)
+def _conexion_creada(sender, connection, **kwargs):
+    # Cada hilo tiene sus conexiones (también los de sync_to_async bajo ASGI)
+    _instalar(connection)
+
+
+class _Serializando:
+    __slots__ = ('medicion', 'inicio')
+
+    def __enter__(self):
+        medicion = _actual.get()
+        # Los serializers anidados ya cuentan dentro del de afuera
+        if medicion is None or medicion.serializando:
+            self.medicion = None
+            return
+        medicion.serializando = True
+        self.medicion, self.inicio = medicion, time.perf_counter()
+
+    def __exit__(self, *exc):
+        if self.medicion is not None:
+            self.medicion.serializacion += time.perf_counter() - self.inicio
+            self.medicion.serializando = False
+
+
+def serializando():
+    """Cuenta el bloque como tiempo de serialización de la petición en curso."""
+    return _Serializando()
+
+
+class SerializacionMedida:
+    """Mixin de serializer: to_representation va al tiempo de serialización."""
+
+    def to_representation(self, instance):
+        with serializando():
+            return super().to_representation(instance)
+
+
+class JSONRendererMedido(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with serializando():
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+# ---------------------------------------------------------------------
+# REGISTRO EN MEMORIA (por proceso: cada worker expone lo suyo)
+# ---------------------------------------------------------------------
+class Histograma:
+    __slots__ = ('limites', 'cubetas', 'suma', 'total')
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.cubetas = [0] * (len(limites) + 1)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.cubetas[bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+
+HISTOGRAMAS = {
+    # nombre: (límites, descripción)
+    'api_http_peticion_segundos': (SEGUNDOS, 'Latencia hasta que la vista regresa la respuesta'),
+    'api_http_sql_consultas': (CONSULTAS, 'Consultas SQL por petición'),
+    'api_http_sql_segundos': (SEGUNDOS, 'Tiempo en la base por petición'),
+    'api_http_serializacion_segundos': (SEGUNDOS, 'Tiempo en serializers y render del JSON por petición'),
+    'api_http_respuesta_bytes': (BYTES, 'Tamaño del cuerpo (no incluye respuestas en streaming)'),
+}
+
+
+class Registro:
+    def __init__(self):
+        self._candado = threading.Lock()
+        self._series = {}  # (ruta, metodo) -> {nombre: Histograma}
+        self._peticiones = {}  # (ruta, metodo, codigo) -> total
+
+    def observar(self, ruta, metodo, codigo, valores):
+        with self._candado:
+            serie = self._series.get((ruta, metodo))
+            if serie is None:
+                serie = self._series[(ruta, metodo)] = {
+                    nombre: Histograma(limites) for nombre, (limites, _) in HISTOGRAMAS.items()
+                }
+            for nombre, valor in valores.items():
+                if valor is not None:
+                    serie[nombre].observar(valor)
+            llave = (ruta, metodo, codigo)
+            self._peticiones[llave] = self._peticiones.get(llave, 0) + 1
+
+    def texto(self):
+        """Formato de exposición de Prometheus (text/plain 0.0.4)."""
+        with self._candado:
+            lineas = [
+                '# HELP api_http_peticiones_total Peticiones atendidas por ruta, método y código',
+                '# TYPE api_http_peticiones_total counter',
+            ]
+            for (ruta, metodo, codigo), total in sorted(self._peticiones.items()):
+                lineas.append(f'api_http_peticiones_total{_etiquetas(ruta=ruta, metodo=metodo, codigo=codigo)} {total}')
+            for nombre, (limites, ayuda) in HISTOGRAMAS.items():
+                lineas += [f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} histogram']
+                for (ruta, metodo), serie in sorted(self._series.items()):
+                    histograma = serie[nombre]
+                    acumulado = 0
+                    for limite, cuenta in zip([*limites, '+Inf'], histograma.cubetas):
+                        acumulado += cuenta
+                        lineas.append(f'{nombre}_bucket{_etiquetas(ruta=ruta, metodo=metodo, le=limite)} {acumulado}')
+                    lineas.append(f'{nombre}_sum{_etiquetas(ruta=ruta, metodo=metodo)} {histograma.suma:.6f}')
+                    lineas.append(f'{nombre}_count{_etiquetas(ruta=ruta, metodo=metodo)} {histograma.total}')
+        return lineas
+
+
+registro = Registro()
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(**valores):
+    return '{' + ','.join(f'{clave}="{_escapar(valor)}"' for clave, valor in valores.items()) + '}'
+
+
+# ---------------------------------------------------------------------
+# MIDDLEWARE (sync y async: el SSE de eventos no debe pasar a un hilo)
+# ---------------------------------------------------------------------
+def _ruta(request):
+    # Nombre de la vista (p. ej. reporte-list), no la URL: acota las series a las rutas que existen
+    coincidencia = getattr(request, 'resolver_match', None)
+    return coincidencia.view_name if coincidencia else 'sin_ruta'
+
+
+def _tamano(response):
+    return None if response.streaming else len(response.content)
+
+
+class MetricasMiddleware:
+    """Latencia, consultas SQL, serialización y tamaño por ruta y método.
+
+    La Medicion de la petición viaja en un ContextVar y el execute_wrapper de
+    cada conexión (puesto al crearla) la lee, así que el SQL se cuenta igual con
+    WSGI que con ASGI. De las respuestas en streaming (eventos SSE) solo cuenta
+    la latencia hasta los encabezados. Con METRICAS_LENTAS_MS > 0, las peticiones
+    más lentas que eso van al log con sus consultas más caras.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+        # Las conexiones abiertas antes de cargar el middleware no vieron connection_created
+        for conexion in connections.all(initialized_only=True):
+            _instalar(conexion)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self._acall(request)
+        if not settings.METRICAS_ACTIVAS or request.path == '/metrics':
+            return self.get_response(request)
+        medicion = Medicion(guardar_sql=settings.METRICAS_LENTAS_MS > 0)
+        token = _actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _actual.reset(token)
+        self._registrar(request, response, time.perf_counter() - inicio, medicion)
+        return response
+
+    async def _acall(self, request):
+        if not settings.METRICAS_ACTIVAS or request.path == '/metrics':
+            return await self.get_response(request)
+        # Bajo ASGI todas las vistas pasan por aquí: las síncronas corren en un hilo de
+        # sync_to_async, que copia el contexto y con él la Medicion
+        medicion = Medicion(guardar_sql=settings.METRICAS_LENTAS_MS > 0)
+        token = _actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _actual.reset(token)
+        self._registrar(request, response, time.perf_counter() - inicio, medicion)
+        return response
+
+    def _registrar(self, request, response, duracion, medicion):
+        ruta = _ruta(request)
+        registro.observar(ruta, request.method, response.status_code, {
+            'api_http_peticion_segundos': duracion,
+            'api_http_sql_consultas': medicion and medicion.consultas,
+            'api_http_sql_segundos': medicion and medicion.sql_segundos,
+            'api_http_serializacion_segundos': medicion and medicion.serializacion,
+            'api_http_respuesta_bytes': _tamano(response),
+        })
+        if medicion is not None and medicion.sql is not None and 1000 * duracion > settings.METRICAS_LENTAS_MS:
+            caras = sorted(medicion.sql, key=lambda consulta: consulta[0], reverse=True)[:10]
+            logger.warning(
+                'Petición lenta %s %s (%s): %.0f ms, %d consultas en %.0f ms, serialización %.0f ms\n%s',
+                request.method, request.get_full_path(), ruta, 1000 * duracion, medicion.consultas,
+                1000 * medicion.sql_segundos, 1000 * medicion.serializacion,
+                '\n'.join(f'  {1000 * segundos:8.1f} ms  {sql[:500]}' for segundos, sql in caras),
+            )
+
+
+# ---------------------------------------------------------------------
+# /metrics
+# ---------------------------------------------------------------------
+def vista_metricas(request):
+    if settings.METRICAS_TOKEN:
+        enviado = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(enviado, settings.METRICAS_TOKEN):
+            return HttpResponse(status=401)
+    from .condicional import contadores
+    from .respuestas import respuestas
+
+    lineas = registro.texto()
+    lineas += [
+        '# HELP api_get_condicional_total GET condicionales por resultado (304 o respuesta completa)',
+        '# TYPE api_get_condicional_total counter',
+    ]
+    lineas += [f'api_get_condicional_total{_etiquetas(resultado=clave)} {valor}' for clave, valor in contadores.items()]
+    estado = respuestas.estado()
+    lineas += [
+        '# HELP api_cache_respuestas_total Eventos de la caché LRU de respuestas',
+        '# TYPE api_cache_respuestas_total counter',
+    ]
+    lineas += [
+        f'api_cache_respuestas_total{_etiquetas(evento=evento)} {estado[evento]}'
+        for evento in ('aciertos', 'fallos', 'desalojos', 'invalidaciones')
+    ]
+    lineas += [
+        '# HELP api_cache_respuestas_entradas Respuestas guardadas en la caché LRU',
+        '# TYPE api_cache_respuestas_entradas gauge',
+        f"api_cache_respuestas_entradas {estado['entradas']}",
+        '# HELP api_cache_respuestas_bytes Bytes ocupados por la caché LRU',
+        '# TYPE api_cache_respuestas_bytes gauge',
+        f"api_cache_respuestas_bytes {estado['bytes']}",
+    ]
+    if hasattr(connection, 'estado_pool'):
+        # Backend mysite.pool (DB_POOL_MAX > 0)
+        pool = connection.estado_pool()
+        lineas += [
+            '# HELP api_db_pool_total Eventos del pool de conexiones del worker',
+            '# TYPE api_db_pool_total counter',
+        ]
+        lineas += [
+            f'api_db_pool_total{_etiquetas(evento=evento)} {pool[evento]}'
+            for evento in ('creadas', 'reusadas', 'descartadas', 'esperas_agotadas')
+        ]
+        lineas += [
+            '# HELP api_db_pool_libres Conexiones abiertas esperando en el pool',
+            '# TYPE api_db_pool_libres gauge',
+            f"api_db_pool_libres {pool['libres']}",
+        ]
+    return HttpResponse('\n'.join(lineas) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
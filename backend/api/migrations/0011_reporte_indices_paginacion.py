@@ -0,0 +1,23 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_alter_reporte_folio'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reporte',
+            index=models.Index(fields=['prioridad', 'fecha_hora', 'id'], name='reporte_prioridad_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reporte',
+            index=models.Index(fields=['usuario', 'fecha_hora', 'id'], name='reporte_usuario_fecha_idx'),
+        ),
+    ]
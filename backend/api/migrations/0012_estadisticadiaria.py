@@ -0,0 +1,75 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# El día se corta en la zona del proyecto, igual que TruncDate en el dashboard
+ZONA = settings.TIME_ZONE
+
+CREAR_TRIGGER = f"""
+CREATE OR REPLACE FUNCTION api_estadisticadiaria_trg() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND OLD.status IS NOT DISTINCT FROM NEW.status
+       AND OLD.tipo_problema IS NOT DISTINCT FROM NEW.tipo_problema
+       AND OLD.fecha_hora IS NOT DISTINCT FROM NEW.fecha_hora THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE api_estadisticadiaria SET total = total - 1
+        WHERE fecha = (OLD.fecha_hora AT TIME ZONE '{ZONA}')::date
+          AND tipo_problema = OLD.tipo_problema
+          AND status = OLD.status;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO api_estadisticadiaria (fecha, tipo_problema, status, total)
+        VALUES ((NEW.fecha_hora AT TIME ZONE '{ZONA}')::date, NEW.tipo_problema, NEW.status, 1)
+        ON CONFLICT (fecha, tipo_problema, status)
+        DO UPDATE SET total = api_estadisticadiaria.total + 1;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER api_reporte_estadisticadiaria
+AFTER INSERT OR DELETE OR UPDATE OF status, tipo_problema, fecha_hora ON api_reporte
+FOR EACH ROW EXECUTE FUNCTION api_estadisticadiaria_trg();
+
+INSERT INTO api_estadisticadiaria (fecha, tipo_problema, status, total)
+SELECT (fecha_hora AT TIME ZONE '{ZONA}')::date, tipo_problema, status, count(*)
+FROM api_reporte
+GROUP BY 1, 2, 3;
+"""
+
+BORRAR_TRIGGER = """
+DROP TRIGGER IF EXISTS api_reporte_estadisticadiaria ON api_reporte;
+DROP FUNCTION IF EXISTS api_estadisticadiaria_trg();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_reporte_indices_paginacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('tipo_problema', models.CharField(choices=[('FUGA', 'Fuga de Agua'), ('ESCASEZ', 'Escasez / No hay agua'), ('CALIDAD', 'Mala Calidad / Agua Sucia'), ('ALCANTARILLADO', 'Falla en Drenaje/Alcantarilla'), ('TRAMITE', 'Solicitud de Trámite')], max_length=20)),
+                ('status', models.CharField(choices=[('PENDIENTE', 'Recibido / Pendiente'), ('ASIGNADO', 'Asignado a Cuadrilla'), ('EN_PROCESO', 'En Reparación'), ('RESUELTO', 'Concluido'), ('CANCELADO', 'Improcedente')], max_length=20)),
+                ('total', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('fecha', 'tipo_problema', 'status')},
+            },
+        ),
+        migrations.RunSQL(CREAR_TRIGGER, BORRAR_TRIGGER),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+TABLAS = ['api_reporte', 'api_noticia', 'api_pozo']
+
+CREAR_FUNCION = """
+CREATE OR REPLACE FUNCTION api_versiontabla_trg() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO api_versiontabla (tabla, version, modificado)
+    VALUES (TG_TABLE_NAME, 1, now())
+    ON CONFLICT (tabla)
+    DO UPDATE SET version = api_versiontabla.version + 1, modificado = now();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# Un disparo por statement, no por fila: un UPDATE masivo sube la versión una vez
+CREAR_TRIGGERS = CREAR_FUNCION + ''.join(f"""
+CREATE TRIGGER {tabla}_versiontabla
+AFTER INSERT OR UPDATE OR DELETE ON {tabla}
+FOR EACH STATEMENT EXECUTE FUNCTION api_versiontabla_trg();
+
+INSERT INTO api_versiontabla (tabla, version, modificado) VALUES ('{tabla}', 1, now());
+""" for tabla in TABLAS)
+
+BORRAR_TRIGGERS = ''.join(
+    f'DROP TRIGGER IF EXISTS {tabla}_versiontabla ON {tabla};\n' for tabla in TABLAS
+) + 'DROP FUNCTION IF EXISTS api_versiontabla_trg();\n'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_estadisticadiaria'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionTabla',
+            fields=[
+                ('tabla', models.CharField(max_length=63, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+                ('modificado', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunSQL(CREAR_TRIGGERS, BORRAR_TRIGGERS),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+CREAR_TRIGGER = """
+CREATE OR REPLACE FUNCTION api_reporteeliminado_trg() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO api_reporteeliminado (reporte_id, folio, fecha_eliminacion)
+    VALUES (OLD.id, OLD.folio, now());
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER api_reporte_reporteeliminado
+AFTER DELETE ON api_reporte
+FOR EACH ROW EXECUTE FUNCTION api_reporteeliminado_trg();
+"""
+
+BORRAR_TRIGGER = """
+DROP TRIGGER IF EXISTS api_reporte_reporteeliminado ON api_reporte;
+DROP FUNCTION IF EXISTS api_reporteeliminado_trg();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_versiontabla'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReporteEliminado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reporte_id', models.BigIntegerField()),
+                ('folio', models.CharField(max_length=20, null=True)),
+                ('fecha_eliminacion', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['fecha_eliminacion', 'id'], name='eliminado_fecha_idx')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='reporte',
+            index=models.Index(fields=['fecha_actualizacion', 'id'], name='reporte_actualizacion_idx'),
+        ),
+        migrations.RunSQL(CREAR_TRIGGER, BORRAR_TRIGGER),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:00
+
+from django.db import migrations
+
+
+# Eventos en tiempo real: cada alta, voto o cambio de estatus sale por pg_notify
+# y lo reparte el Difusor de api/eventos.py en cada worker.
+# Las cargas masivas pueden silenciarlo con SET LOCAL app.silenciar_eventos = 'on'.
+CREAR_TRIGGER = """
+CREATE OR REPLACE FUNCTION api_reporte_eventos_trg() RETURNS trigger AS $$
+DECLARE
+    evento text;
+BEGIN
+    IF current_setting('app.silenciar_eventos', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'INSERT' THEN
+        evento := 'creado';
+    ELSIF NEW.status IS DISTINCT FROM OLD.status THEN
+        evento := 'estatus';
+    ELSIF NEW.validaciones IS DISTINCT FROM OLD.validaciones THEN
+        evento := 'validado';
+    ELSE
+        RETURN NULL;
+    END IF;
+
+    PERFORM pg_notify('reportes_eventos', json_build_object(
+        'evento', evento,
+        'id', NEW.id,
+        'folio', NEW.folio,
+        'tipo_problema', NEW.tipo_problema,
+        'status', NEW.status,
+        'validaciones', NEW.validaciones,
+        'usuario_id', NEW.usuario_id,
+        'longitud', ST_X(NEW.ubicacion),
+        'latitud', ST_Y(NEW.ubicacion)
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER api_reporte_eventos
+AFTER INSERT OR UPDATE ON api_reporte
+FOR EACH ROW EXECUTE FUNCTION api_reporte_eventos_trg();
+"""
+
+BORRAR_TRIGGER = """
+DROP TRIGGER IF EXISTS api_reporte_eventos ON api_reporte;
+DROP FUNCTION IF EXISTS api_reporte_eventos_trg();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_reporteeliminado_reporte_actualizacion_idx'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREAR_TRIGGER, BORRAR_TRIGGER),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_reporte_eventos_notify'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reporte',
+            name='foto_miniatura',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='reportes/miniaturas/'),
+        ),
+        migrations.AddField(
+            model_name='reporte',
+            name='foto_solucion_miniatura',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='soluciones/miniaturas/'),
+        ),
+    ]
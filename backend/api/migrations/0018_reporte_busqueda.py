@@ -0,0 +1,34 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:00
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_subidafoto'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='reporte',
+            name='busqueda',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.SearchVector('descripcion', 'direccion_texto', config='spanish'), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='reporte',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['busqueda'], name='reporte_busqueda_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='reporte',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['folio'], name='reporte_folio_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='reporte',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['direccion_texto'], name='reporte_direccion_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:00
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_reporte_busqueda'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reporte',
+            index=django.contrib.postgres.indexes.GistIndex(condition=models.Q(('status__in', ['PENDIENTE', 'ASIGNADO', 'EN_PROCESO'])), fields=['ubicacion'], name='reporte_abiertos_gist'),
+        ),
+    ]
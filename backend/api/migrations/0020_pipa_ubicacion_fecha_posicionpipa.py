@@ -0,0 +1,36 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:00
+
+import django.contrib.gis.db.models.fields
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_reporte_abiertos_gist'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pipa',
+            name='ubicacion_fecha',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='PosicionPipa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField()),
+                ('ubicacion', django.contrib.gis.db.models.fields.PointField(spatial_index=False, srid=4326)),
+                ('velocidad', models.FloatField(blank=True, null=True)),
+                ('rumbo', models.FloatField(blank=True, null=True)),
+                ('pipa', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='posiciones', to='api.pipa')),
+            ],
+            options={
+                'indexes': [django.contrib.postgres.indexes.BrinIndex(fields=['fecha'], name='posicionpipa_fecha_brin')],
+                'constraints': [models.UniqueConstraint(fields=('pipa', 'fecha'), name='posicionpipa_pipa_fecha')],
+            },
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Folios en la base: una secuencia pasada por una permutación de 32 bits
+# (multiplicar por un impar y el XOR son biyectivos módulo 2^32), así que dos
+# nextval() nunca dan el mismo folio y no hace falta reintentar por lote.
+# Los folios uuid anteriores viven en el mismo espacio 'IXT-XXXXXXXX':
+# si alguno ya existe se salta al siguiente.
+CREAR_FOLIO = """
+CREATE SEQUENCE api_reporte_folio_seq MINVALUE 1 MAXVALUE 4294967295 NO CYCLE;
+
+CREATE OR REPLACE FUNCTION api_nuevo_folio() RETURNS varchar AS $$
+DECLARE
+    candidato varchar;
+BEGIN
+    LOOP
+        candidato := 'IXT-' || upper(lpad(to_hex(
+            ((nextval('api_reporte_folio_seq') * 1103515245) & 4294967295) # 1541459225
+        ), 8, '0'));
+        EXIT WHEN NOT EXISTS (SELECT 1 FROM api_reporte WHERE folio = candidato);
+    END LOOP;
+    RETURN candidato;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+BORRAR_FOLIO = """
+DROP FUNCTION IF EXISTS api_nuevo_folio();
+DROP SEQUENCE IF EXISTS api_reporte_folio_seq;
+"""
+
+ZONA = settings.TIME_ZONE
+
+# Mismo trigger de 0012, pero las cargas masivas (api/importar.py) pueden diferirlo
+# con SET LOCAL app.estadistica_diferida = 'on' y sumar sus conteos en un solo upsert.
+TRIGGER_ESTADISTICA = """
+CREATE OR REPLACE FUNCTION api_estadisticadiaria_trg() RETURNS trigger AS $$
+BEGIN
+    {diferida}IF TG_OP = 'UPDATE'
+       AND OLD.status IS NOT DISTINCT FROM NEW.status
+       AND OLD.tipo_problema IS NOT DISTINCT FROM NEW.tipo_problema
+       AND OLD.fecha_hora IS NOT DISTINCT FROM NEW.fecha_hora THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE api_estadisticadiaria SET total = total - 1
+        WHERE fecha = (OLD.fecha_hora AT TIME ZONE '{zona}')::date
+          AND tipo_problema = OLD.tipo_problema
+          AND status = OLD.status;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO api_estadisticadiaria (fecha, tipo_problema, status, total)
+        VALUES ((NEW.fecha_hora AT TIME ZONE '{zona}')::date, NEW.tipo_problema, NEW.status, 1)
+        ON CONFLICT (fecha, tipo_problema, status)
+        DO UPDATE SET total = api_estadisticadiaria.total + 1;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+DIFERIDA = """IF current_setting('app.estadistica_diferida', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+
+    """
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_pipa_ubicacion_fecha_posicionpipa'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREAR_FOLIO, BORRAR_FOLIO),
+        migrations.AlterField(
+            model_name='reporte',
+            name='folio',
+            field=models.CharField(db_default=models.Func(function='api_nuevo_folio', output_field=models.CharField()), editable=False, max_length=20, null=True, unique=True),
+        ),
+        migrations.RunSQL(
+            TRIGGER_ESTADISTICA.format(diferida=DIFERIDA, zona=ZONA),
+            TRIGGER_ESTADISTICA.format(diferida='', zona=ZONA),
+        ),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+# Mismos lados que CeldaHexagonal.TAMANOS (metros en EPSG:3857)
+TAMANOS = 'ARRAY[250, 1000]'
+
+# Celda de la malla de ST_HexagonGrid que contiene al punto (en la orilla de
+# dos celdas gana la de menor índice, siempre la misma)
+CREAR_TRIGGER = f"""
+CREATE OR REPLACE FUNCTION api_celda_hex(punto geometry, tamano integer, OUT i integer, OUT j integer) AS $$
+    SELECT g.i, g.j
+    FROM ST_HexagonGrid(tamano, ST_Transform(punto, 3857)) g
+    WHERE ST_Intersects(g.geom, ST_Transform(punto, 3857))
+    ORDER BY g.i, g.j
+    LIMIT 1
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+-- Suma (signo = 1) o resta (signo = -1) un lote de reportes en un solo upsert
+CREATE OR REPLACE FUNCTION api_celdahexagonal_sumar(
+    ubicaciones geometry[], tipos varchar[], fechas timestamptz[], signo integer
+) RETURNS void AS $$
+    INSERT INTO api_celdahexagonal (tamano, i, j, tipo_problema, hora, total)
+    SELECT t.tamano, c.i, c.j, r.tipo, date_trunc('hour', r.fecha, 'UTC'), signo * count(*)
+    FROM unnest(ubicaciones, tipos, fechas) AS r(ubicacion, tipo, fecha)
+    CROSS JOIN unnest({TAMANOS}) AS t(tamano)
+    CROSS JOIN LATERAL api_celda_hex(r.ubicacion, t.tamano) c
+    GROUP BY 1, 2, 3, 4, 5
+    ON CONFLICT (tamano, hora, tipo_problema, i, j)
+    DO UPDATE SET total = api_celdahexagonal.total + EXCLUDED.total;
+$$ LANGUAGE sql;
+
+-- Por statement con tablas de transición: una carga masiva es un upsert, no uno por fila.
+-- Postgres no permite tablas de transición con varios eventos: un trigger por evento.
+CREATE OR REPLACE FUNCTION api_celdahexagonal_trg() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM api_celdahexagonal_sumar(array_agg(ubicacion), array_agg(tipo_problema), array_agg(fecha_hora), 1)
+        FROM nuevos;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM api_celdahexagonal_sumar(array_agg(ubicacion), array_agg(tipo_problema), array_agg(fecha_hora), -1)
+        FROM viejos;
+    ELSE
+        -- Votos y prioridad no mueven el mapa: solo cuentan ubicación, tipo y fecha
+        PERFORM api_celdahexagonal_sumar(array_agg(v.ubicacion), array_agg(v.tipo_problema), array_agg(v.fecha_hora), -1)
+        FROM viejos v JOIN nuevos n ON n.id = v.id
+        WHERE (v.ubicacion, v.tipo_problema, v.fecha_hora) IS DISTINCT FROM (n.ubicacion, n.tipo_problema, n.fecha_hora);
+        PERFORM api_celdahexagonal_sumar(array_agg(n.ubicacion), array_agg(n.tipo_problema), array_agg(n.fecha_hora), 1)
+        FROM viejos v JOIN nuevos n ON n.id = v.id
+        WHERE (v.ubicacion, v.tipo_problema, v.fecha_hora) IS DISTINCT FROM (n.ubicacion, n.tipo_problema, n.fecha_hora);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER api_reporte_celdahexagonal_ins
+AFTER INSERT ON api_reporte REFERENCING NEW TABLE AS nuevos
+FOR EACH STATEMENT EXECUTE FUNCTION api_celdahexagonal_trg();
+
+CREATE TRIGGER api_reporte_celdahexagonal_del
+AFTER DELETE ON api_reporte REFERENCING OLD TABLE AS viejos
+FOR EACH STATEMENT EXECUTE FUNCTION api_celdahexagonal_trg();
+
+CREATE TRIGGER api_reporte_celdahexagonal_upd
+AFTER UPDATE ON api_reporte REFERENCING OLD TABLE AS viejos NEW TABLE AS nuevos
+FOR EACH STATEMENT EXECUTE FUNCTION api_celdahexagonal_trg();
+
+SELECT api_celdahexagonal_sumar(array_agg(ubicacion), array_agg(tipo_problema), array_agg(fecha_hora), 1)
+FROM api_reporte;
+"""
+
+BORRAR_TRIGGER = """
+DROP TRIGGER IF EXISTS api_reporte_celdahexagonal_ins ON api_reporte;
+DROP TRIGGER IF EXISTS api_reporte_celdahexagonal_del ON api_reporte;
+DROP TRIGGER IF EXISTS api_reporte_celdahexagonal_upd ON api_reporte;
+DROP FUNCTION IF EXISTS api_celdahexagonal_trg();
+DROP FUNCTION IF EXISTS api_celdahexagonal_sumar(geometry[], varchar[], timestamptz[], integer);
+DROP FUNCTION IF EXISTS api_celda_hex(geometry, integer);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_reporte_folio_secuencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CeldaHexagonal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tamano', models.IntegerField()),
+                ('i', models.IntegerField()),
+                ('j', models.IntegerField()),
+                ('tipo_problema', models.CharField(choices=[('FUGA', 'Fuga de Agua'), ('ESCASEZ', 'Escasez / No hay agua'), ('CALIDAD', 'Mala Calidad / Agua Sucia'), ('ALCANTARILLADO', 'Falla en Drenaje/Alcantarilla'), ('TRAMITE', 'Solicitud de Trámite')], max_length=20)),
+                ('hora', models.DateTimeField()),
+                ('total', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('tamano', 'hora', 'tipo_problema', 'i', 'j')},
+            },
+        ),
+        migrations.RunSQL(CREAR_TRIGGER, BORRAR_TRIGGER),
+    ]
@@ -0,0 +1,246 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:00
+
+from importlib import import_module
+
+from django.conf import settings
+from django.db import migrations, models
+
+ZONA = settings.TIME_ZONE
+anterior = import_module('api.migrations.0021_reporte_folio_secuencia')
+
+# Colonia (la del perfil al crear el reporte, fija aunque el vecino se mude
+# después: así los rollups nunca restan de una colonia que no sumaron) y hora
+# de resolución. En un trigger para que también valgan en los UPDATE directos.
+CREAR_DERIVADOS = """
+UPDATE api_reporte r SET colonia = p.colonia
+FROM api_perfilciudadano p
+WHERE p.user_id = r.usuario_id AND p.colonia <> '';
+
+-- Sin historial de estatus: lo mejor que hay para los ya resueltos
+UPDATE api_reporte SET fecha_resolucion = fecha_actualizacion WHERE status = 'RESUELTO';
+
+CREATE OR REPLACE FUNCTION api_reporte_derivados_trg() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        IF NEW.colonia = '' AND NEW.usuario_id IS NOT NULL THEN
+            NEW.colonia := coalesce((SELECT colonia FROM api_perfilciudadano WHERE user_id = NEW.usuario_id), '');
+        END IF;
+        -- Un alta ya resuelta (carga de históricos) conserva la fecha que traiga
+        IF NEW.status <> 'RESUELTO' THEN
+            NEW.fecha_resolucion := NULL;
+        END IF;
+    ELSIF NEW.status = 'RESUELTO' THEN
+        NEW.fecha_resolucion := CASE WHEN OLD.status = 'RESUELTO' THEN OLD.fecha_resolucion ELSE now() END;
+    ELSE
+        NEW.fecha_resolucion := NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER api_reporte_derivados
+BEFORE INSERT OR UPDATE ON api_reporte
+FOR EACH ROW EXECUTE FUNCTION api_reporte_derivados_trg();
+"""
+
+BORRAR_DERIVADOS = """
+DROP TRIGGER IF EXISTS api_reporte_derivados ON api_reporte;
+DROP FUNCTION IF EXISTS api_reporte_derivados_trg();
+"""
+
+# El trigger diario de 0012/0021, ahora también por colonia
+CREAR_DIARIA = f"""
+CREATE OR REPLACE FUNCTION api_estadisticadiaria_trg() RETURNS trigger AS $$
+BEGIN
+    IF current_setting('app.estadistica_diferida', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'UPDATE'
+       AND OLD.status IS NOT DISTINCT FROM NEW.status
+       AND OLD.tipo_problema IS NOT DISTINCT FROM NEW.tipo_problema
+       AND OLD.fecha_hora IS NOT DISTINCT FROM NEW.fecha_hora
+       AND OLD.colonia IS NOT DISTINCT FROM NEW.colonia THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE api_estadisticadiaria SET total = total - 1
+        WHERE fecha = (OLD.fecha_hora AT TIME ZONE '{ZONA}')::date
+          AND tipo_problema = OLD.tipo_problema
+          AND status = OLD.status
+          AND colonia = OLD.colonia;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO api_estadisticadiaria (fecha, tipo_problema, status, colonia, total)
+        VALUES ((NEW.fecha_hora AT TIME ZONE '{ZONA}')::date, NEW.tipo_problema, NEW.status, NEW.colonia, 1)
+        ON CONFLICT (fecha, tipo_problema, status, colonia)
+        DO UPDATE SET total = api_estadisticadiaria.total + 1;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS api_reporte_estadisticadiaria ON api_reporte;
+CREATE TRIGGER api_reporte_estadisticadiaria
+AFTER INSERT OR DELETE OR UPDATE OF status, tipo_problema, fecha_hora, colonia ON api_reporte
+FOR EACH ROW EXECUTE FUNCTION api_estadisticadiaria_trg();
+
+DELETE FROM api_estadisticadiaria;
+INSERT INTO api_estadisticadiaria (fecha, tipo_problema, status, colonia, total)
+SELECT (fecha_hora AT TIME ZONE '{ZONA}')::date, tipo_problema, status, colonia, count(*)
+FROM api_reporte
+GROUP BY 1, 2, 3, 4;
+"""
+
+BORRAR_DIARIA = anterior.TRIGGER_ESTADISTICA.format(diferida=anterior.DIFERIDA, zona=ZONA) + """
+DROP TRIGGER IF EXISTS api_reporte_estadisticadiaria ON api_reporte;
+CREATE TRIGGER api_reporte_estadisticadiaria
+AFTER INSERT OR DELETE OR UPDATE OF status, tipo_problema, fecha_hora ON api_reporte
+FOR EACH ROW EXECUTE FUNCTION api_estadisticadiaria_trg();
+"""
+
+# Serie por hora e histograma de resolución: por statement, como el mapa de calor (0022)
+CREAR_ANALITICA = f"""
+CREATE OR REPLACE FUNCTION api_cubeta_resolucion(duracion interval) RETURNS smallint AS $$
+    SELECT floor(4 * log(2, greatest(extract(epoch FROM duracion) / 60, 1)))::smallint
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+CREATE OR REPLACE FUNCTION api_analitica_sumar(
+    fechas timestamptz[], tipos varchar[], estados varchar[], colonias varchar[],
+    resoluciones timestamptz[], signo integer
+) RETURNS void AS $$
+    INSERT INTO api_estadisticahoraria (hora, tipo_problema, status, colonia, total)
+    SELECT date_trunc('hour', r.fecha, 'UTC'), r.tipo, r.estado, r.colonia, signo * count(*)
+    FROM unnest(fechas, tipos, estados, colonias) AS r(fecha, tipo, estado, colonia)
+    GROUP BY 1, 2, 3, 4
+    ON CONFLICT (hora, tipo_problema, status, colonia)
+    DO UPDATE SET total = api_estadisticahoraria.total + EXCLUDED.total;
+
+    INSERT INTO api_estadisticaresolucion (fecha, tipo_problema, colonia, cubeta, total)
+    SELECT (r.resolucion AT TIME ZONE '{ZONA}')::date, r.tipo, r.colonia,
+           api_cubeta_resolucion(r.resolucion - r.fecha), signo * count(*)
+    FROM unnest(fechas, tipos, colonias, resoluciones) AS r(fecha, tipo, colonia, resolucion)
+    WHERE r.resolucion IS NOT NULL
+    GROUP BY 1, 2, 3, 4
+    ON CONFLICT (fecha, tipo_problema, colonia, cubeta)
+    DO UPDATE SET total = api_estadisticaresolucion.total + EXCLUDED.total;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION api_analitica_trg() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM api_analitica_sumar(array_agg(fecha_hora), array_agg(tipo_problema), array_agg(status),
+                                    array_agg(colonia), array_agg(fecha_resolucion), 1)
+        FROM nuevos;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM api_analitica_sumar(array_agg(fecha_hora), array_agg(tipo_problema), array_agg(status),
+                                    array_agg(colonia), array_agg(fecha_resolucion), -1)
+        FROM viejos;
+    ELSE
+        PERFORM api_analitica_sumar(array_agg(v.fecha_hora), array_agg(v.tipo_problema), array_agg(v.status),
+                                    array_agg(v.colonia), array_agg(v.fecha_resolucion), -1)
+        FROM viejos v JOIN nuevos n ON n.id = v.id
+        WHERE (v.fecha_hora, v.tipo_problema, v.status, v.colonia, v.fecha_resolucion)
+              IS DISTINCT FROM (n.fecha_hora, n.tipo_problema, n.status, n.colonia, n.fecha_resolucion);
+        PERFORM api_analitica_sumar(array_agg(n.fecha_hora), array_agg(n.tipo_problema), array_agg(n.status),
+                                    array_agg(n.colonia), array_agg(n.fecha_resolucion), 1)
+        FROM viejos v JOIN nuevos n ON n.id = v.id
+        WHERE (v.fecha_hora, v.tipo_problema, v.status, v.colonia, v.fecha_resolucion)
+              IS DISTINCT FROM (n.fecha_hora, n.tipo_problema, n.status, n.colonia, n.fecha_resolucion);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER api_reporte_analitica_ins
+AFTER INSERT ON api_reporte REFERENCING NEW TABLE AS nuevos
+FOR EACH STATEMENT EXECUTE FUNCTION api_analitica_trg();
+
+CREATE TRIGGER api_reporte_analitica_del
+AFTER DELETE ON api_reporte REFERENCING OLD TABLE AS viejos
+FOR EACH STATEMENT EXECUTE FUNCTION api_analitica_trg();
+
+CREATE TRIGGER api_reporte_analitica_upd
+AFTER UPDATE ON api_reporte REFERENCING OLD TABLE AS viejos NEW TABLE AS nuevos
+FOR EACH STATEMENT EXECUTE FUNCTION api_analitica_trg();
+
+SELECT api_analitica_sumar(array_agg(fecha_hora), array_agg(tipo_problema), array_agg(status),
+                           array_agg(colonia), array_agg(fecha_resolucion), 1)
+FROM api_reporte;
+"""
+
+BORRAR_ANALITICA = """
+DROP TRIGGER IF EXISTS api_reporte_analitica_ins ON api_reporte;
+DROP TRIGGER IF EXISTS api_reporte_analitica_del ON api_reporte;
+DROP TRIGGER IF EXISTS api_reporte_analitica_upd ON api_reporte;
+DROP FUNCTION IF EXISTS api_analitica_trg();
+DROP FUNCTION IF EXISTS api_analitica_sumar(timestamptz[], varchar[], varchar[], varchar[], timestamptz[], integer);
+DROP FUNCTION IF EXISTS api_cubeta_resolucion(interval);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_celdahexagonal'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='estadisticadiaria',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='estadisticadiaria',
+            name='colonia',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='reporte',
+            name='colonia',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='reporte',
+            name='fecha_resolucion',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='estadisticadiaria',
+            unique_together={('fecha', 'tipo_problema', 'status', 'colonia')},
+        ),
+        migrations.CreateModel(
+            name='EstadisticaHoraria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hora', models.DateTimeField()),
+                ('tipo_problema', models.CharField(choices=[('FUGA', 'Fuga de Agua'), ('ESCASEZ', 'Escasez / No hay agua'), ('CALIDAD', 'Mala Calidad / Agua Sucia'), ('ALCANTARILLADO', 'Falla en Drenaje/Alcantarilla'), ('TRAMITE', 'Solicitud de Trámite')], max_length=20)),
+                ('status', models.CharField(choices=[('PENDIENTE', 'Recibido / Pendiente'), ('ASIGNADO', 'Asignado a Cuadrilla'), ('EN_PROCESO', 'En Reparación'), ('RESUELTO', 'Concluido'), ('CANCELADO', 'Improcedente')], max_length=20)),
+                ('colonia', models.CharField(blank=True, max_length=100)),
+                ('total', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('hora', 'tipo_problema', 'status', 'colonia')},
+            },
+        ),
+        migrations.CreateModel(
+            name='EstadisticaResolucion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('tipo_problema', models.CharField(choices=[('FUGA', 'Fuga de Agua'), ('ESCASEZ', 'Escasez / No hay agua'), ('CALIDAD', 'Mala Calidad / Agua Sucia'), ('ALCANTARILLADO', 'Falla en Drenaje/Alcantarilla'), ('TRAMITE', 'Solicitud de Trámite')], max_length=20)),
+                ('colonia', models.CharField(blank=True, max_length=100)),
+                ('cubeta', models.SmallIntegerField()),
+                ('total', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('fecha', 'tipo_problema', 'colonia', 'cubeta')},
+            },
+        ),
+        migrations.RunSQL(CREAR_DERIVADOS, BORRAR_DERIVADOS),
+        migrations.RunSQL(CREAR_DIARIA, BORRAR_DIARIA),
+        migrations.RunSQL(CREAR_ANALITICA, BORRAR_ANALITICA),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:00
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_analitica'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='reporte',
+            name='reporte_folio_trgm',
+        ),
+        migrations.RemoveIndex(
+            model_name='reporte',
+            name='reporte_direccion_trgm',
+        ),
+        migrations.AddIndex(
+            model_name='reporte',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('folio'), name='gin_trgm_ops'), name='reporte_folio_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='reporte',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('direccion_texto'), name='gin_trgm_ops'), name='reporte_direccion_trgm'),
+        ),
+    ]
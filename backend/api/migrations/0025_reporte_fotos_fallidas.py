@@ -0,0 +1,19 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:00
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_reporte_trgm_upper'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reporte',
+            name='fotos_fallidas',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=30), blank=True, editable=False, null=True, size=None),
+        ),
+    ]
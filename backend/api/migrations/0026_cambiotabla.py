@@ -0,0 +1,53 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+# El trigger ya no toca la fila de api_versiontabla: un INSERT por statement no
+# toma candados que compartan los escritores concurrentes
+CREAR_FUNCION = """
+CREATE OR REPLACE FUNCTION api_versiontabla_trg() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO api_cambiotabla (tabla, modificado) VALUES (TG_TABLE_NAME, now());
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# De regreso a 0013: lo pendiente se pliega antes de borrar api_cambiotabla
+RESTAURAR_FUNCION = """
+UPDATE api_versiontabla v
+SET version = v.version + c.total, modificado = greatest(v.modificado, c.modificado)
+FROM (SELECT tabla, count(*) AS total, max(modificado) AS modificado FROM api_cambiotabla GROUP BY tabla) c
+WHERE v.tabla = c.tabla;
+
+CREATE OR REPLACE FUNCTION api_versiontabla_trg() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO api_versiontabla (tabla, version, modificado)
+    VALUES (TG_TABLE_NAME, 1, now())
+    ON CONFLICT (tabla)
+    DO UPDATE SET version = api_versiontabla.version + 1, modificado = now();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0025_reporte_fotos_fallidas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CambioTabla',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tabla', models.CharField(db_index=True, max_length=63)),
+                ('modificado', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunSQL(CREAR_FUNCION, RESTAURAR_FUNCION),
+    ]
@@ -1,10 +1,20 @@
 import uuid
 from django.contrib.gis.db import models
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import BrinIndex, GinIndex, GistIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.db import connection, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Upper
 from django.dispatch import receiver
 from django.utils import timezone
 
+from .cache import incrementar_version, invalidar_tiles_de_punto
+from .imagenes import CAMPOS_FOTO, programar as programar_imagen
+from .subidas import borrar_parcial
+
 # ---------------------------------------------------------------------
 # MODELO NUEVO: PIPA / UNIDAD (Para gestión de recursos)
 # ---------------------------------------------------------------------
@@ -19,16 +29,49 @@ class Pipa(models.Model):
     capacidad_litros = models.IntegerField(default=10000)
     chofer = models.CharField(max_length=100, blank=True)
     estado = models.CharField(max_length=20, choices=ESTADOS_PIPA, default='DISPONIBLE')
-    ubicacion_actual = models.PointField(srid=4326, null=True, blank=True) # Para rastreo GPS futuro
+    ubicacion_actual = models.PointField(srid=4326, null=True, blank=True) # Última posición GPS (api/telemetria.py)
+    ubicacion_fecha = models.DateTimeField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return f"{self.numero_economico} ({self.get_estado_display()})"
 
+# ---------------------------------------------------------------------
+# MODELO: POSICIÓN DE PIPA (bitácora GPS, solo se agrega)
+# ---------------------------------------------------------------------
+class PosicionPipa(models.Model):
+    """Una fila por lectura GPS; se escribe en lote con INSERT ... SELECT unnest."""
+    # Sin índice propio: lo cubre la restricción única (pipa, fecha)
+    pipa = models.ForeignKey(Pipa, on_delete=models.CASCADE, related_name='posiciones', db_index=False)
+    fecha = models.DateTimeField()
+    ubicacion = models.PointField(srid=4326, spatial_index=False)
+    velocidad = models.FloatField(null=True, blank=True)  # km/h
+    rumbo = models.FloatField(null=True, blank=True)  # grados desde el norte
+
+    class Meta:
+        indexes = [
+            # Las filas llegan en orden de tiempo: BRIN pesa KB donde un B-tree pesaría GB
+            BrinIndex(fields=['fecha'], name='posicionpipa_fecha_brin'),
+        ]
+        constraints = [
+            # Recorrido de una pipa y reintentos del GPS (ON CONFLICT DO NOTHING)
+            models.UniqueConstraint(fields=['pipa', 'fecha'], name='posicionpipa_pipa_fecha'),
+        ]
+
 # ---------------------------------------------------------------------
 # MODELO: REPORTE (Actualizado con Pipa)
 # ---------------------------------------------------------------------
+class ReporteManager(models.Manager):
+    def get_queryset(self):
+        # El tsvector de `busqueda` solo se usa en el WHERE de ?search=: no viaja en cada SELECT
+        return super().get_queryset().defer('busqueda')
+
+
 class Reporte(models.Model):
-    folio = models.CharField(max_length=20, unique=True, editable=False, null=True)
+    # Lo pone la base (api_nuevo_folio(), migración 0021): único también en cargas masivas
+    folio = models.CharField(
+        max_length=20, unique=True, editable=False, null=True,
+        db_default=models.Func(function='api_nuevo_folio', output_field=models.CharField()),
+    )
     
     TIPOS_PROBLEMA = [
         ('FUGA', 'Fuga de Agua'),
@@ -45,6 +88,7 @@ class Reporte(models.Model):
         ('RESUELTO', 'Concluido'),
         ('CANCELADO', 'Improcedente'),
     ]
+    ESTADOS_ABIERTOS = ['PENDIENTE', 'ASIGNADO', 'EN_PROCESO']
 
     # Geometría
     ubicacion = models.PointField(srid=4326)
@@ -54,39 +98,94 @@ class Reporte(models.Model):
     tipo_problema = models.CharField(max_length=20, choices=TIPOS_PROBLEMA)
     descripcion = models.TextField()
     foto = models.ImageField(upload_to='reportes/', null=True, blank=True)
+    foto_miniatura = models.ImageField(upload_to='reportes/miniaturas/', null=True, blank=True, editable=False)
     usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='reportes')
     
     # Datos Gestión Interna
     status = models.CharField(max_length=20, choices=STATUS_OPCIONES, default='PENDIENTE')
     fecha_hora = models.DateTimeField(auto_now_add=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
+    # Las pone un trigger (migración 0023): la colonia del perfil al crear y la hora en que pasó a RESUELTO
+    colonia = models.CharField(max_length=100, blank=True)
+    fecha_resolucion = models.DateTimeField(null=True, blank=True, editable=False)
     
     # Seguimiento y Asignación (Solo Admin)
     nota_seguimiento = models.TextField(blank=True, help_text="Respuesta oficial")
     foto_solucion = models.ImageField(upload_to='soluciones/', null=True, blank=True)
+    foto_solucion_miniatura = models.ImageField(upload_to='soluciones/miniaturas/', null=True, blank=True, editable=False)
+    # Campos de CAMPOS_FOTO cuya foto no se pudo procesar (api/imagenes.py): no se reintentan en cada save
+    fotos_fallidas = ArrayField(models.CharField(max_length=30), null=True, blank=True, editable=False)
     pipa_asignada = models.ForeignKey(Pipa, on_delete=models.SET_NULL, null=True, blank=True, related_name='servicios')
 
     # Inteligencia
     validaciones = models.IntegerField(default=0)
     prioridad = models.IntegerField(default=0)
 
+    # Búsqueda: tsvector en español que Postgres recalcula solo al escribir
+    busqueda = models.GeneratedField(
+        expression=SearchVector('descripcion', 'direccion_texto', config='spanish'),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    objects = ReporteManager()
+
     class Meta:
         verbose_name = "Solicitud ciudadana"
         verbose_name_plural = "Ventanilla unica"
         ordering = ['-fecha_hora']
-
-    def save(self, *args, **kwargs):
-        if not self.folio:
-            self.folio = 'IXT-' + str(uuid.uuid4())[:8].upper()
-        super().save(*args, **kwargs)   
+        indexes = [
+            # Paginación por llave: cada página es un rango del índice, sin sort
+            models.Index(fields=['prioridad', 'fecha_hora', 'id'], name='reporte_prioridad_fecha_idx'),
+            models.Index(fields=['usuario', 'fecha_hora', 'id'], name='reporte_usuario_fecha_idx'),
+            # Feed de cambios (?since=): rango por fecha de actualización
+            models.Index(fields=['fecha_actualizacion', 'id'], name='reporte_actualizacion_idx'),
+            # Búsqueda: texto completo y fragmentos con pg_trgm. icontains compila a
+            # UPPER(col) LIKE UPPER(%s): los trigramas van sobre UPPER(col) para servirlo
+            GinIndex(fields=['busqueda'], name='reporte_busqueda_gin'),
+            GinIndex(OpClass(Upper('folio'), name='gin_trgm_ops'), name='reporte_folio_trgm'),
+            GinIndex(OpClass(Upper('direccion_texto'), name='gin_trgm_ops'), name='reporte_direccion_trgm'),
+            # Duplicados: KNN solo sobre reportes abiertos
+            GistIndex(
+                fields=['ubicacion'], condition=Q(status__in=['PENDIENTE', 'ASIGNADO', 'EN_PROCESO']),
+                name='reporte_abiertos_gist',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.folio} - {self.tipo_problema}"
 
+@receiver([post_save, post_delete], sender=Reporte)
+def invalidar_cache_reportes(sender, **kwargs):
+    # Clusters y demás cachés de reportes llevan esta versión en la llave
+    incrementar_version('reportes')
+
+def _reporte_modificado_en_sql(lon, lat):
+    # Los UPDATE directos no disparan post_save: invalidamos a mano
+    incrementar_version('reportes')
+    invalidar_tiles_de_punto('reportes', lon, lat)
+
+# ---------------------------------------------------------------------
+# MODELO: REPORTE ELIMINADO (lápidas para el feed de cambios)
+# ---------------------------------------------------------------------
+class ReporteEliminado(models.Model):
+    """Lo llena un trigger AFTER DELETE sobre api_reporte (migración 0014)."""
+    reporte_id = models.BigIntegerField()
+    folio = models.CharField(max_length=20, null=True)
+    fecha_eliminacion = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['fecha_eliminacion', 'id'], name='eliminado_fecha_idx'),
+        ]
+
 # ---------------------------------------------------------------------
 # MODELO: VALIDACIÓN
 # ---------------------------------------------------------------------
 class Validacion(models.Model):
+    VOTOS_PARA_ASIGNAR = 5
+    PUNTOS_POR_VOTO = 10
+
     reporte = models.ForeignKey(Reporte, on_delete=models.CASCADE, related_name='votos')
     usuario = models.ForeignKey(User, on_delete=models.CASCADE)
     fecha_voto = models.DateTimeField(auto_now_add=True)
@@ -94,15 +193,212 @@ class Validacion(models.Model):
     class Meta:
         unique_together = ('reporte', 'usuario')
 
+    @classmethod
+    def registrar(cls, reporte_id, usuario_id):
+        """Voto atómico en un solo statement: INSERT ... ON CONFLICT DO NOTHING y,
+        solo si insertó, UPDATE del reporte con los incrementos hechos en SQL.
+
+        Regresa (validaciones, status) nuevos, o None si el usuario ya había votado.
+        Lanza IntegrityError si el reporte no existe.
+        """
+        sql = f"""
+            WITH voto AS (
+                INSERT INTO {cls._meta.db_table} (reporte_id, usuario_id, fecha_voto)
+                VALUES (%s, %s, now())
+                ON CONFLICT (reporte_id, usuario_id) DO NOTHING
+                RETURNING reporte_id
+            )
+            UPDATE {Reporte._meta.db_table} r
+            SET validaciones = r.validaciones + 1,
+                prioridad = r.prioridad + %s,
+                status = CASE WHEN r.validaciones + 1 >= %s AND r.status = 'PENDIENTE'
+                              THEN 'ASIGNADO' ELSE r.status END,
+                fecha_actualizacion = now()
+            FROM voto
+            WHERE r.id = voto.reporte_id
+            RETURNING r.validaciones, r.status, ST_X(r.ubicacion), ST_Y(r.ubicacion)
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [reporte_id, usuario_id, cls.PUNTOS_POR_VOTO, cls.VOTOS_PARA_ASIGNAR])
+            fila = cursor.fetchone()
+        if fila is None:
+            return None
+        validaciones, status, lon, lat = fila
+        _reporte_modificado_en_sql(lon, lat)
+        return validaciones, status
+
     def save(self, *args, **kwargs):
         es_nuevo = self.pk is None
         super().save(*args, **kwargs)
         if es_nuevo:
-            self.reporte.validaciones += 1
-            self.reporte.prioridad += 10
-            if self.reporte.validaciones >= 5 and self.reporte.status == 'PENDIENTE':
-                self.reporte.status = 'ASIGNADO' # Cambio lógico a Asignado/Revisado
-            self.reporte.save()
+            # Mismo cálculo que registrar(): en la base, sin leer-modificar-escribir
+            Reporte.objects.filter(pk=self.reporte_id).update(
+                validaciones=F('validaciones') + 1,
+                prioridad=F('prioridad') + self.PUNTOS_POR_VOTO,
+                status=Case(
+                    When(status='PENDIENTE', validaciones__gte=self.VOTOS_PARA_ASIGNAR - 1, then=Value('ASIGNADO')),
+                    default=F('status'),
+                ),
+                fecha_actualizacion=timezone.now(),
+            )
+            ubicacion = self.reporte.ubicacion
+            _reporte_modificado_en_sql(ubicacion.x, ubicacion.y)
+
+# ---------------------------------------------------------------------
+# MODELO: ESTADÍSTICA DIARIA (rollup para el dashboard)
+# ---------------------------------------------------------------------
+class EstadisticaDiaria(models.Model):
+    """Conteo de reportes por día × tipo × estatus × colonia.
+
+    Lo mantiene un trigger de Postgres sobre api_reporte (ver migraciones 0012
+    y 0023), así cuadra también con los UPDATE directos (votos) y las cargas
+    masivas. `manage.py reconciliar_estadisticas` lo reconstruye desde cero.
+    """
+    fecha = models.DateField()
+    tipo_problema = models.CharField(max_length=20, choices=Reporte.TIPOS_PROBLEMA)
+    status = models.CharField(max_length=20, choices=Reporte.STATUS_OPCIONES)
+    colonia = models.CharField(max_length=100, blank=True)
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('fecha', 'tipo_problema', 'status', 'colonia')
+
+# ---------------------------------------------------------------------
+# MODELOS: ROLLUPS DE ANALÍTICA (serie por hora y tiempos de resolución)
+# ---------------------------------------------------------------------
+class EstadisticaHoraria(models.Model):
+    """Como EstadisticaDiaria, pero por hora (UTC): atiende las series por hora."""
+    hora = models.DateTimeField()
+    tipo_problema = models.CharField(max_length=20, choices=Reporte.TIPOS_PROBLEMA)
+    status = models.CharField(max_length=20, choices=Reporte.STATUS_OPCIONES)
+    colonia = models.CharField(max_length=100, blank=True)
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('hora', 'tipo_problema', 'status', 'colonia')
+
+
+class EstadisticaResolucion(models.Model):
+    """Histograma del tiempo de resolución por día en que se resolvió.
+
+    `cubeta` es floor(CUBETAS_POR_OCTAVA · log2(minutos)): cada cubeta es ~19%
+    más ancha que la anterior, así que los percentiles salen con ese error
+    relativo sin guardar una fila por reporte.
+    """
+    CUBETAS_POR_OCTAVA = 4
+
+    fecha = models.DateField()
+    tipo_problema = models.CharField(max_length=20, choices=Reporte.TIPOS_PROBLEMA)
+    colonia = models.CharField(max_length=100, blank=True)
+    cubeta = models.SmallIntegerField()
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('fecha', 'tipo_problema', 'colonia', 'cubeta')
+
+# ---------------------------------------------------------------------
+# MODELO: CELDA HEXAGONAL (rollup del mapa de calor)
+# ---------------------------------------------------------------------
+class CeldaHexagonal(models.Model):
+    """Conteo de reportes por hexágono × tipo × hora.
+
+    Las celdas son las de ST_HexagonGrid en EPSG:3857 con lado `tamano` (m);
+    (i, j) es su índice en la malla. Lo mantiene un trigger por statement sobre
+    api_reporte (migración 0022) y `manage.py reconciliar_estadisticas` lo
+    reconstruye desde cero.
+    """
+    TAMANOS = [250, 1000]
+
+    tamano = models.IntegerField()
+    i = models.IntegerField()
+    j = models.IntegerField()
+    tipo_problema = models.CharField(max_length=20, choices=Reporte.TIPOS_PROBLEMA)
+    hora = models.DateTimeField()
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        # Una ventana (últimas N horas) es un rango de este índice
+        unique_together = ('tamano', 'hora', 'tipo_problema', 'i', 'j')
+
+# ---------------------------------------------------------------------
+# MODELO: VERSIÓN POR TABLA (validador barato para ETag / Last-Modified)
+# ---------------------------------------------------------------------
+class VersionTabla(models.Model):
+    """Contador de cambios por tabla: esta fila más los CambioTabla aún sin plegar.
+
+    El trigger por statement (migraciones 0013 y 0026) solo inserta en
+    CambioTabla, así que los escritores no se forman por el candado de esta
+    fila. Cada cambio cuenta al hacerse commit, en el orden que sea.
+    """
+    tabla = models.CharField(max_length=63, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    modificado = models.DateTimeField(default=timezone.now)
+
+    # Con tantos cambios pendientes, la siguiente lectura los pliega en la fila
+    PLEGAR_CADA = 1000
+
+    @classmethod
+    def de(cls, modelo):
+        tabla = modelo._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT v.version + count(c.id), greatest(v.modificado, max(c.modificado)), count(c.id)
+                FROM {cls._meta.db_table} v
+                LEFT JOIN {CambioTabla._meta.db_table} c ON c.tabla = v.tabla
+                WHERE v.tabla = %s
+                GROUP BY v.version, v.modificado
+            """, [tabla])
+            fila = cursor.fetchone()
+        if fila is None:
+            return 0, None
+        version, modificado, pendientes = fila
+        if pendientes >= cls.PLEGAR_CADA:
+            cls.plegar(tabla)
+        return version, modificado
+
+    @classmethod
+    def plegar(cls, tabla):
+        """Pasa los cambios ya confirmados de `tabla` a su fila, en un statement.
+
+        La suma version + pendientes no cambia para nadie; dos plegados a la vez
+        no cuentan doble porque cada uno solo suma las filas que él borró.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                WITH plegados AS (
+                    DELETE FROM {CambioTabla._meta.db_table} WHERE tabla = %s RETURNING modificado
+                )
+                UPDATE {cls._meta.db_table}
+                SET version = version + (SELECT count(*) FROM plegados),
+                    modificado = greatest(modificado, (SELECT max(modificado) FROM plegados))
+                WHERE tabla = %s
+            """, [tabla, tabla])
+
+
+class CambioTabla(models.Model):
+    """Un statement que escribió en `tabla`; VersionTabla.plegar los junta por lotes."""
+    tabla = models.CharField(max_length=63, db_index=True)
+    modificado = models.DateTimeField(default=timezone.now)
+
+# ---------------------------------------------------------------------
+# MODELO: SUBIDA DE FOTO REANUDABLE (por bloques, antes de crear el reporte)
+# ---------------------------------------------------------------------
+class SubidaFoto(models.Model):
+    """El archivo parcial vive en SUBIDAS_DIR/<token>.part (ver api/subidas.py)."""
+    token = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='subidas')
+    tamano_total = models.BigIntegerField()
+    recibido = models.BigIntegerField(default=0)
+    tipo_contenido = models.CharField(max_length=50)
+    creada = models.DateTimeField(auto_now_add=True)
+
+    @property
+    def completa(self):
+        return self.recibido == self.tamano_total
+
+@receiver(post_delete, sender=SubidaFoto)
+def borrar_archivo_parcial(sender, instance, **kwargs):
+    borrar_parcial(instance.token)
 
 # ---------------------------------------------------------------------
 # MODELO: PERFIL
@@ -145,4 +441,69 @@ class Pozo(models.Model):
     ubicacion = models.PointField(srid=4326)
     estado = models.CharField(max_length=20, default='OPERATIVO')
     profundidad = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
-    notas = models.TextField(blank=True)
\ No newline at end of file
+    notas = models.TextField(blank=True)
+
+# Versiones de los catálogos públicos: van en la llave de la caché de respuestas
+@receiver([post_save, post_delete], sender=Noticia)
+def invalidar_cache_noticias(sender, **kwargs):
+    incrementar_version('noticias')
+
+@receiver([post_save, post_delete], sender=Pozo)
+def invalidar_cache_pozos(sender, **kwargs):
+    incrementar_version('pozos')
+
+# ---------------------------------------------------------------------
+# INVALIDACIÓN DE TILES MVT (posición vieja y nueva de cada punto)
+# ---------------------------------------------------------------------
+CAPAS_TILES = {
+    Reporte: ('reportes', 'ubicacion'),
+    Pozo: ('pozos', 'ubicacion'),
+    Pipa: ('pipas', 'ubicacion_actual'),
+}
+
+def _invalidar_tiles(capa, punto):
+    if punto is not None:
+        invalidar_tiles_de_punto(capa, punto.x, punto.y)
+
+# Campos que se leen antes de guardar para comparar con lo nuevo
+CAMPOS_PREVIOS = {
+    Reporte: ['ubicacion', 'foto', 'foto_solucion'],
+    Pozo: ['ubicacion'],
+    Pipa: ['ubicacion_actual'],
+}
+
+@receiver(pre_save)
+def recordar_valores_previos(sender, instance, **kwargs):
+    if sender not in CAMPOS_PREVIOS or instance.pk is None:
+        return
+    instance._previo = sender.objects.filter(pk=instance.pk).values(*CAMPOS_PREVIOS[sender]).first() or {}
+
+@receiver([post_save, post_delete])
+def invalidar_tiles(sender, instance, **kwargs):
+    if sender not in CAPAS_TILES:
+        return
+    capa, campo = CAPAS_TILES[sender]
+    _invalidar_tiles(capa, getattr(instance, campo))
+    _invalidar_tiles(capa, getattr(instance, '_previo', {}).get(campo))
+
+# ---------------------------------------------------------------------
+# FOTOS: se recodifican en segundo plano (api/imagenes.py)
+# ---------------------------------------------------------------------
+@receiver(pre_save, sender=Reporte)
+def descartar_miniaturas_viejas(sender, instance, **kwargs):
+    previo = getattr(instance, '_previo', {})
+    for campo, campo_miniatura in CAMPOS_FOTO:
+        if previo.get(campo) != getattr(instance, campo).name:
+            setattr(instance, campo_miniatura, None)
+            # Foto nueva: se vuelve a intentar aunque la anterior haya fallado
+            if instance.fotos_fallidas and campo in instance.fotos_fallidas:
+                instance.fotos_fallidas = [c for c in instance.fotos_fallidas if c != campo]
+
+@receiver(post_save, sender=Reporte)
+def procesar_fotos_nuevas(sender, instance, **kwargs):
+    for campo, campo_miniatura in CAMPOS_FOTO:
+        fallida = campo in (instance.fotos_fallidas or ())
+        if getattr(instance, campo) and not getattr(instance, campo_miniatura) and not fallida:
+            transaction.on_commit(
+                lambda c=campo, m=campo_miniatura: programar_imagen(Reporte, instance.pk, c, m)
+            )
@@ -0,0 +1,133 @@
+import base64
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+# ---------------------------------------------------------------------
+# PAGINACIÓN POR LLAVE (keyset): la página N cuesta lo mismo que la 1
+# ---------------------------------------------------------------------
+class KeysetPagination(BasePagination):
+    """Pagina con WHERE (col1, col2, id) < (ultimo...) en vez de OFFSET.
+
+    El cursor guarda los valores de orden de la última fila entregada, así que
+    los inserts y borrados concurrentes no recorren la página. Una fila cuya llave
+    de orden cambia entre dos páginas (p. ej. `prioridad` o `validaciones` tras un
+    voto) sí puede repetirse o saltarse: solo `fecha_hora` e `id` no cambian.
+    El orden sale del queryset (incluye ?ordering=) y se desempata siempre por id.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.orden = self.get_ordering(queryset)
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            queryset = queryset.filter(self.despues_de(queryset, cursor))
+
+        filas = list(queryset.order_by(*self.orden)[:self.page_size + 1])
+        self.siguiente = None
+        if len(filas) > self.page_size:
+            filas = filas[:self.page_size]
+            ultima = filas[-1]
+            # Las filas pueden ser instancias o dicts de values() (lista rápida)
+            leer = ultima.get if isinstance(ultima, dict) else lambda campo: getattr(ultima, campo)
+            self.siguiente = [leer(campo.lstrip('-')) for campo in self.orden]
+        return filas
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            pedido = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return settings.PAGINA_TAMANO
+        return max(1, min(pedido, settings.PAGINA_TAMANO_MAX))
+
+    def get_ordering(self, queryset):
+        orden = list(queryset.query.order_by or queryset.model._meta.ordering)
+        if not all(isinstance(c, str) for c in orden):
+            raise ValueError('KeysetPagination solo soporta orden por campos')
+        orden = [{'pk': 'id', '-pk': '-id'}.get(c, c) for c in orden]
+        if not any(c.lstrip('-') == 'id' for c in orden):
+            orden.append('-id' if orden and orden[0].startswith('-') else 'id')
+        return orden
+
+    def despues_de(self, queryset, valores):
+        """Condición 'fila posterior al cursor' en el orden actual."""
+        modelo = queryset.model
+        nombres = [c.lstrip('-') for c in self.orden]
+        descendente = [c.startswith('-') for c in self.orden]
+        campos = {f.name: f for f in modelo._meta.concrete_fields}
+        # El orden puede incluir anotaciones (p. ej. la relevancia de la búsqueda)
+        anotaciones = queryset.query.annotations
+        tipos = [campos[n] if n in campos else anotaciones[n].output_field if n in anotaciones else None for n in nombres]
+        try:
+            valores = [tipo.to_python(v) if tipo else v for tipo, v in zip(tipos, valores)]
+        except DjangoValidationError:
+            raise NotFound('Cursor inválido')
+
+        if len(set(descendente)) == 1 and all(n in campos for n in nombres):
+            # Todos en el mismo sentido: comparación de filas, la usa el índice compuesto
+            tabla = modelo._meta.db_table
+            columnas = ', '.join(f'"{tabla}"."{campos[n].column}"' for n in nombres)
+            marcas = ', '.join(['%s'] * len(nombres))
+            operador = '<' if descendente[0] else '>'
+            return RawSQL(f'({columnas}) {operador} ({marcas})', valores, output_field=BooleanField())
+
+        # Sentidos mezclados o anotaciones: (a > x) OR (a = x AND b < y) OR ...
+        condicion = Q()
+        for i, nombre in enumerate(nombres):
+            paso = Q(**{nombres[j]: valores[j] for j in range(i)})
+            lookup = 'lt' if descendente[i] else 'gt'
+            paso &= Q(**{f'{nombre}__{lookup}': valores[i]})
+            condicion |= paso
+        return condicion
+
+    def encode_cursor(self, valores):
+        # isoformat completo: DjangoJSONEncoder recorta a milisegundos y saltaría filas.
+        # Decimal como texto exacto (la relevancia); float la redondearía
+        crudo = json.dumps([
+            v.isoformat() if hasattr(v, 'isoformat') else str(v) if isinstance(v, Decimal) else v for v in valores
+        ]).encode()
+        return base64.urlsafe_b64encode(crudo).decode()
+
+    def decode_cursor(self, request):
+        crudo = request.query_params.get(self.cursor_query_param)
+        if not crudo:
+            return None
+        try:
+            valores = json.loads(base64.urlsafe_b64decode(crudo.encode()))
+        except (ValueError, TypeError):
+            raise NotFound('Cursor inválido')
+        if not isinstance(valores, list) or len(valores) != len(self.orden):
+            raise NotFound('Cursor inválido')
+        return valores
+
+    def get_next_link(self):
+        if self.siguiente is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.siguiente))
@@ -0,0 +1,130 @@
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from scipy.spatial import cKDTree
+
+from .cache import incrementar_version, invalidar_capa, invalidar_tiles_de_punto
+from .geo import Latitud, Longitud
+from .models import Pozo, Reporte, Validacion
+
+METROS_POR_GRADO = 111320
+# Arriba de esto se tira la capa de tiles completa en vez de punto por punto
+MAX_INVALIDACIONES_PUNTUALES = 200
+
+
+# ---------------------------------------------------------------------
+# PUNTAJE (numpy sobre una foto de los reportes abiertos)
+# ---------------------------------------------------------------------
+def a_metros(lon, lat, lat0):
+    """Proyección equirectangular local: suficiente para distancias de cientos de metros."""
+    return np.column_stack([lon * METROS_POR_GRADO * np.cos(np.radians(lat0)), lat * METROS_POR_GRADO])
+
+
+def calcular(xy, validaciones, edad_dias, xy_pozos):
+    """Prioridad entera de cada reporte.
+
+    - validaciones: los mismos puntos por voto que suma Validacion al instante.
+    - edad: sube con los días sin resolver y se satura (1 - e^(-edad/τ)).
+    - densidad: reportes abiertos vecinos en el radio, con rendimiento decreciente (log).
+    - pozos: más urgente cuanto más cerca de infraestructura (decae exponencialmente).
+    """
+    puntaje = Validacion.PUNTOS_POR_VOTO * validaciones.astype(np.float64)
+    puntaje += settings.PRIORIDAD_PESO_EDAD * (1 - np.exp(-edad_dias / settings.PRIORIDAD_DIAS_EDAD))
+
+    arbol = cKDTree(xy)
+    vecinos = arbol.query_ball_point(xy, settings.PRIORIDAD_RADIO_DENSIDAD, return_length=True) - 1
+    puntaje += settings.PRIORIDAD_PESO_DENSIDAD * np.log1p(vecinos)
+
+    if len(xy_pozos):
+        distancia, _ = cKDTree(xy_pozos).query(xy, distance_upper_bound=settings.PRIORIDAD_RADIO_POZO * 3)
+        # Sin pozo en 3 radios: distancia = inf y el término vale 0
+        puntaje += settings.PRIORIDAD_PESO_POZO * np.exp(-distancia / settings.PRIORIDAD_RADIO_POZO)
+    return np.rint(puntaje).astype(np.int64)
+
+
+def _foto(queryset):
+    return list(
+        queryset.annotate(lon=Longitud('ubicacion'), lat=Latitud('ubicacion'))
+        .values_list('id', 'lon', 'lat', 'validaciones', 'fecha_hora', 'prioridad')
+    )
+
+
+# ---------------------------------------------------------------------
+# RECÁLCULO: todo lo abierto, o solo lo que cambió y sus vecinos
+# ---------------------------------------------------------------------
+def recalcular(cambiados_desde=None):
+    """Regresa (evaluados, actualizados).
+
+    Con `cambiados_desde` solo se evalúan los reportes modificados desde esa
+    fecha y sus vecinos dentro del radio de densidad (su conteo también cambió);
+    la densidad se sigue midiendo contra todos los abiertos.
+    """
+    filas = _foto(Reporte.objects.filter(status__in=Reporte.ESTADOS_ABIERTOS))
+    if not filas:
+        return 0, 0
+    ids = np.array([f[0] for f in filas], dtype=np.int64)
+    lon = np.array([f[1] for f in filas])
+    lat = np.array([f[2] for f in filas])
+    validaciones = np.array([f[3] for f in filas])
+    ahora = timezone.now().timestamp()
+    edad_dias = (ahora - np.array([f[4].timestamp() for f in filas])) / 86400
+    previa = np.array([f[5] for f in filas], dtype=np.int64)
+
+    lat0 = float(lat.mean())
+    xy = a_metros(lon, lat, lat0)
+    pozos = np.array(list(
+        Pozo.objects.annotate(lon=Longitud('ubicacion'), lat=Latitud('ubicacion')).values_list('lon', 'lat')
+    )).reshape(-1, 2)
+    xy_pozos = a_metros(pozos[:, 0], pozos[:, 1], lat0)
+
+    nueva = calcular(xy, validaciones, edad_dias, xy_pozos)
+    evaluar = np.ones(len(ids), dtype=bool)
+    if cambiados_desde is not None:
+        cambiados = set(Reporte.objects.filter(
+            status__in=Reporte.ESTADOS_ABIERTOS, fecha_actualizacion__gte=cambiados_desde,
+        ).values_list('id', flat=True))
+        evaluar = np.isin(ids, list(cambiados))
+        if evaluar.any():
+            cercanos = cKDTree(xy).query_ball_point(xy[evaluar], settings.PRIORIDAD_RADIO_DENSIDAD)
+            evaluar[np.concatenate([np.asarray(c, dtype=np.int64) for c in cercanos])] = True
+
+    distinta = evaluar & (nueva != previa)
+    actualizados = escribir(ids[distinta], nueva[distinta], validaciones[distinta])
+    return int(evaluar.sum()), actualizados
+
+
+def escribir(ids, prioridades, validaciones):
+    """Un UPDATE por lote de PRIORIDAD_LOTE filas, cada uno en su transacción.
+
+    Solo el resto del puntaje (edad, densidad, pozos) sale de la foto; los votos
+    se toman de la fila viva, así un voto que entra entre la lectura y el UPDATE
+    (Validacion.registrar suma PUNTOS_POR_VOTO al instante) no se pierde. Una
+    fila que ya tiene esa prioridad no se toca: ni fecha_actualizacion ni tiles.
+    """
+    reportes = Reporte._meta.db_table
+    por_voto = Validacion.PUNTOS_POR_VOTO
+    resto = prioridades - por_voto * validaciones
+    puntos = []
+    for inicio in range(0, len(ids), settings.PRIORIDAD_LOTE):
+        lote = slice(inicio, inicio + settings.PRIORIDAD_LOTE)
+        with transaction.atomic(), connection.cursor() as cursor:
+            # La prioridad no viaja en los eventos SSE: no despertamos a los clientes
+            cursor.execute("SET LOCAL app.silenciar_eventos = 'on'")
+            cursor.execute(f"""
+                UPDATE {reportes} r
+                SET prioridad = a.resto + r.validaciones * %s, fecha_actualizacion = now()
+                FROM unnest(%s::bigint[], %s::int[]) AS a(id, resto)
+                WHERE r.id = a.id AND r.prioridad IS DISTINCT FROM a.resto + r.validaciones * %s
+                RETURNING ST_X(r.ubicacion), ST_Y(r.ubicacion)
+            """, [por_voto, ids[lote].tolist(), resto[lote].tolist(), por_voto])
+            puntos += cursor.fetchall()
+
+    if puntos:
+        incrementar_version('reportes')
+        if len(puntos) > MAX_INVALIDACIONES_PUNTUALES:
+            invalidar_capa('reportes')
+        else:
+            for lon, lat in puntos:
+                invalidar_tiles_de_punto('reportes', lon, lat)
+    return len(puntos)
@@ -0,0 +1,140 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponse
+from django.utils import timezone
+
+from .cache import version
+from .condicional import ConditionalGetMixin
+from .models import Noticia, Pozo, Reporte
+
+
+# ---------------------------------------------------------------------
+# LRU EN MEMORIA (por proceso, acotada en bytes)
+# ---------------------------------------------------------------------
+class CacheLRU:
+    """Respuestas ya renderizadas; al pasar del tope sale la de uso más viejo."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()  # llave -> (contenido, content-type, nombre, encabezados)
+        self._bytes = 0
+        self._candado = threading.Lock()
+        self.contadores = {'aciertos': 0, 'fallos': 0, 'desalojos': 0, 'invalidaciones': 0}
+
+    def obtener(self, llave):
+        with self._candado:
+            entrada = self._entradas.get(llave)
+            if entrada is None:
+                self.contadores['fallos'] += 1
+                return None
+            self._entradas.move_to_end(llave)
+            self.contadores['aciertos'] += 1
+            return entrada
+
+    def guardar(self, llave, contenido, tipo, nombre, encabezados=()):
+        if len(contenido) > self.max_bytes // 10:
+            return
+        with self._candado:
+            anterior = self._entradas.pop(llave, None)
+            if anterior is not None:
+                self._bytes -= len(anterior[0])
+            self._entradas[llave] = (contenido, tipo, nombre, tuple(encabezados))
+            self._bytes += len(contenido)
+            while self._bytes > self.max_bytes:
+                _, (viejo, *_) = self._entradas.popitem(last=False)
+                self._bytes -= len(viejo)
+                self.contadores['desalojos'] += 1
+
+    def invalidar(self, nombre):
+        """Suelta ya las entradas de `nombre`: su versión cambió y nadie las volverá a pedir."""
+        with self._candado:
+            for llave in [llave for llave, entrada in self._entradas.items() if entrada[2] == nombre]:
+                self._bytes -= len(self._entradas.pop(llave)[0])
+                self.contadores['invalidaciones'] += 1
+
+    def estado(self):
+        with self._candado:
+            return {**self.contadores, 'entradas': len(self._entradas), 'bytes': self._bytes}
+
+
+respuestas = CacheLRU(settings.RESPUESTAS_CACHE_MAX_MB * 1024 * 1024)
+
+NOMBRES = {Noticia: 'noticias', Pozo: 'pozos', Reporte: 'reportes'}
+# Encabezados que se vuelven a calcular en cada petición: no se guardan con la respuesta
+REGENERADOS = {
+    'content-type', 'content-length', 'etag', 'last-modified', 'cache-control', 'vary', 'allow',
+}
+
+
+def _soltar(sender, **kwargs):
+    respuestas.invalidar(NOMBRES[sender])
+
+
+for _modelo in NOMBRES:
+    post_save.connect(_soltar, sender=_modelo, dispatch_uid=f'respuestas_{_modelo.__name__}_save')
+    post_delete.connect(_soltar, sender=_modelo, dispatch_uid=f'respuestas_{_modelo.__name__}_delete')
+
+
+# ---------------------------------------------------------------------
+# MIXIN: list/retrieve desde la LRU cuando ya se renderizó esa misma variante
+# ---------------------------------------------------------------------
+class RespuestaCacheMixin(ConditionalGetMixin):
+    """Guarda el JSON de list/retrieve por URL completa (filtros incluidos).
+
+    La llave lleva dos versiones: la de cache.py, que suben las señales
+    post_save/post_delete, y la de VersionTabla (trigger por statement), que
+    también ven los demás workers y los UPDATE directos en SQL; el ETag ya la
+    leyó, así que no cuesta otra consulta. Solo JSON: la API navegable lleva
+    el usuario y el token CSRF en el HTML. Las acciones fuera de
+    `acciones_cache` (p. ej. mis_reportes, que depende del usuario) no se guardan.
+    """
+    nombre_cache = None
+    acciones_cache = ('list', 'retrieve')
+
+    def responder_condicional(self, request, generar, *args, **kwargs):
+        return super().responder_condicional(request, self._con_cache(generar), *args, **kwargs)
+
+    def llave_cache(self, request):
+        return (
+            self.nombre_cache,
+            version(self.nombre_cache),
+            self.version_tabla()[0],
+            request.build_absolute_uri(),
+            request.accepted_media_type,
+            request.user.is_staff,
+            # Misma ventana diaria que el ETag (p. ej. los 30 días del mapa público)
+            timezone.localdate(),
+        )
+
+    def _con_cache(self, generar):
+        def generar_o_leer(request, *args, **kwargs):
+            if self.action not in self.acciones_cache or request.accepted_renderer.format != 'json':
+                return generar(request, *args, **kwargs)
+            llave = self.llave_cache(request)
+            guardada = respuestas.obtener(llave)
+            if guardada is not None:
+                contenido, tipo, _, encabezados = guardada
+                response = HttpResponse(contenido, content_type=tipo)
+                for nombre, valor in encabezados:
+                    response[nombre] = valor
+                return response
+            response = generar(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                # Se guarda en finalize_response, ya renderizada
+                response.llave_cache = llave
+            return response
+        return generar_o_leer
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        llave = getattr(response, 'llave_cache', None)
+        if llave is not None:
+            if hasattr(response, 'render'):
+                response.render()
+            # Los de la vista (p. ej. X-Resultados-Truncados) se repiten en cada acierto
+            encabezados = [(n, v) for n, v in response.items() if n.lower() not in REGENERADOS]
+            respuestas.guardar(llave, response.content, response['Content-Type'], self.nombre_cache, encabezados)
+        return response
@@ -0,0 +1,40 @@
+import logging
+
+from django.db import DatabaseError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.http import JsonResponse
+
+logger = logging.getLogger(__name__)
+
+# Las migraciones no se deshacen solas: basta con verlas aplicadas una vez por proceso
+_migraciones_al_dia = False
+
+
+# ---------------------------------------------------------------------
+# /healthz: el proceso responde (sin tocar la base)
+# ---------------------------------------------------------------------
+def vivo(request):
+    return JsonResponse({'estado': 'ok'})
+
+
+# ---------------------------------------------------------------------
+# /readyz: puede atender tráfico (base arriba y migraciones aplicadas)
+# ---------------------------------------------------------------------
+def listo(request):
+    global _migraciones_al_dia
+    datos = {'estado': 'ok'}
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if not _migraciones_al_dia:
+            ejecutor = MigrationExecutor(connection)
+            pendientes = ejecutor.migration_plan(ejecutor.loader.graph.leaf_nodes())
+            if pendientes:
+                return JsonResponse({'estado': 'migraciones pendientes', 'pendientes': len(pendientes)}, status=503)
+            _migraciones_al_dia = True
+    except DatabaseError as error:
+        logger.warning('readyz: la base no responde: %s', error)
+        return JsonResponse({'estado': 'sin base', 'error': str(error)}, status=503)
+    if hasattr(connection, 'estado_pool'):
+        datos['pool'] = connection.estado_pool()
+    return JsonResponse(datos)
@@ -1,14 +1,17 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Reporte, PerfilCiudadano, Noticia, Pozo, Validacion, Pipa
+from django.core.files import File
+from .models import Reporte, PerfilCiudadano, Noticia, Pozo, Validacion, Pipa, SubidaFoto
+from .metricas import SerializacionMedida
+from .subidas import EXTENSIONES, ruta_parcial
 
 # --- SERIALIZADORES AUXILIARES ---
-class PerfilCiudadanoSerializer(serializers.ModelSerializer):
+class PerfilCiudadanoSerializer(SerializacionMedida, serializers.ModelSerializer):
     class Meta:
         model = PerfilCiudadano
         fields = ['colonia', 'telefono']
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SerializacionMedida, serializers.ModelSerializer):
     perfil = PerfilCiudadanoSerializer()
     class Meta:
         model = User
@@ -25,33 +28,36 @@ class UserSerializer(serializers.ModelSerializer):
         perfil.save()
         return instance
 
-class PipaSerializer(serializers.ModelSerializer):
+class PipaSerializer(SerializacionMedida, serializers.ModelSerializer):
     class Meta:
         model = Pipa
         fields = '__all__'
 
 # --- SERIALIZADOR CIUDADANO (Restringido) ---
-class ReporteCiudadanoSerializer(serializers.ModelSerializer):
+class ReporteCiudadanoSerializer(SerializacionMedida, serializers.ModelSerializer):
     latitud = serializers.SerializerMethodField()
     longitud = serializers.SerializerMethodField()
     usuario_nombre = serializers.CharField(source='usuario.username', read_only=True)
     fecha_formato = serializers.DateTimeField(source='fecha_hora', format="%d/%m/%Y %H:%M", read_only=True)
     ubicacion = serializers.CharField() 
+    # Token de /api/subidas/ ya completa: la foto llegó por bloques
+    subida = serializers.UUIDField(write_only=True, required=False)
 
     class Meta:
         model = Reporte
         fields = [
             'id', 'folio', 'tipo_problema', 'descripcion', 'direccion_texto',
             'latitud', 'longitud', 'ubicacion', 
-            'foto', 'status', 'fecha_formato', 
+            'foto', 'foto_miniatura', 'status', 'fecha_formato', 
             'usuario', 'usuario_nombre', 
-            'nota_seguimiento', 'foto_solucion', 'validaciones', 'prioridad'
+            'nota_seguimiento', 'foto_solucion', 'foto_solucion_miniatura', 'validaciones', 'prioridad',
+            'subida'
         ]
         # EL CIUDADANO NO PUEDE EDITAR ESTO:
         read_only_fields = [
             'id', 'folio', 'status', 'fecha_formato', 'usuario', 'usuario_nombre',
             'nota_seguimiento', 'foto_solucion', 'validaciones', 'prioridad',
-            'pipa_asignada'
+            'pipa_asignada', 'foto_miniatura', 'foto_solucion_miniatura'
         ]
 
     def get_latitud(self, obj):
@@ -59,22 +65,42 @@ class ReporteCiudadanoSerializer(serializers.ModelSerializer):
     def get_longitud(self, obj):
         return obj.ubicacion.x if obj.ubicacion else None
 
+    def validate_subida(self, token):
+        request = self.context['request']
+        subida = SubidaFoto.objects.filter(pk=token, usuario=request.user).first()
+        if subida is None or not subida.completa:
+            raise serializers.ValidationError("La subida no existe o no ha terminado.")
+        return subida
+
+    def create(self, validated_data):
+        subida = validated_data.pop('subida', None)
+        reporte = Reporte(**validated_data)
+        if subida is not None:
+            with open(ruta_parcial(subida.token), 'rb') as archivo:
+                nombre = f'{subida.token}.{EXTENSIONES[subida.tipo_contenido]}'
+                reporte.foto.save(nombre, File(archivo), save=False)
+        reporte.save()
+        if subida is not None:
+            subida.delete()
+        return reporte
+
 # --- SERIALIZADOR ADMIN (Poder Total) ---
 class ReporteAdminSerializer(ReporteCiudadanoSerializer):
     # Hereda todo del ciudadano, pero sobreescribe los read_only
     class Meta(ReporteCiudadanoSerializer.Meta):
         # El Admin SÍ puede editar status, notas y asignar pipas
         read_only_fields = [
-            'id', 'folio', 'fecha_formato', 'usuario', 'usuario_nombre', 'validaciones'
+            'id', 'folio', 'fecha_formato', 'usuario', 'usuario_nombre', 'validaciones',
+            'foto_miniatura', 'foto_solucion_miniatura'
         ]
 
 # --- OTROS ---
-class NoticiaSerializer(serializers.ModelSerializer):
+class NoticiaSerializer(SerializacionMedida, serializers.ModelSerializer):
     class Meta:
         model = Noticia
         fields = '__all__'
 
-class PozoSerializer(serializers.ModelSerializer):
+class PozoSerializer(SerializacionMedida, serializers.ModelSerializer):
     latitud = serializers.SerializerMethodField()
     longitud = serializers.SerializerMethodField()
     class Meta:
@@ -0,0 +1,103 @@
+import base64
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, ExpressionWrapper
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .models import ReporteEliminado
+
+
+# ---------------------------------------------------------------------
+# FEED DE CAMBIOS (?since=): altas/cambios por fecha_actualizacion + lápidas
+# ---------------------------------------------------------------------
+INICIO = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def leer_cursor(crudo):
+    """El cursor es opaco para el cliente: (fecha, id) de cambios y de lápidas."""
+    if not crudo:
+        return {'c': [INICIO, 0], 'e': [INICIO, 0]}
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(crudo.encode()))
+        cursor = {k: [parse_datetime(datos[k][0]), int(datos[k][1])] for k in ('c', 'e')}
+    except (ValueError, TypeError, KeyError, IndexError):
+        cursor = None
+    if cursor is None or any(v[0] is None for v in cursor.values()):
+        raise ValidationError({'since': 'Cursor inválido'})
+    return cursor
+
+
+def escribir_cursor(cursor):
+    datos = {k: [v[0].isoformat(), v[1]] for k, v in cursor.items()}
+    return base64.urlsafe_b64encode(json.dumps(datos).encode()).decode()
+
+
+def corte_seguro():
+    """Hasta dónde es seguro leer: nada estampado después puede faltar todavía.
+
+    now() en Postgres es el inicio de la transacción, así que una transacción
+    larga (p. ej. la carga masiva de importar.py) hace commit de filas con fecha
+    muy anterior a su commit. El corte no pasa del inicio de la transacción
+    abierta más vieja de esta base, ni del margen para las cortas.
+    """
+    corte = timezone.now() - timedelta(seconds=settings.SINCRONIZACION_MARGEN_SEGUNDOS)
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT min(xact_start) FROM pg_stat_activity
+            WHERE datname = current_database() AND backend_type = 'client backend'
+              AND pid <> pg_backend_pid() AND xact_start IS NOT NULL
+        """)
+        abierta = cursor.fetchone()[0]
+    return corte if abierta is None else min(corte, abierta)
+
+
+def _posteriores(queryset, columna_fecha, fecha, ultimo_id, limite, corte):
+    tabla = queryset.model._meta.db_table
+    condicion = RawSQL(
+        f'("{tabla}"."{columna_fecha}", "{tabla}"."id") > (%s, %s)', [fecha, ultimo_id],
+        output_field=BooleanField(),
+    )
+    return list(
+        queryset.filter(condicion, **{f'{columna_fecha}__lt': corte})
+        .order_by(columna_fecha, 'id')[:limite + 1]
+    )
+
+
+def cambios_desde(queryset, crudo, limite, visible=None):
+    """Regresa (reportes, lápidas, cursor_nuevo, hay_mas).
+
+    `visible` es el Q de lo que puede ver quien pregunta (None = todo). Los
+    reportes cambiados que no lo cumplen (p. ej. resueltos hace más de 30 días)
+    salen como lápida: el cliente que los tenía los quita en vez de quedarse
+    con la versión abierta.
+    """
+    cursor = leer_cursor(crudo)
+    corte = corte_seguro()
+    if visible is not None:
+        queryset = queryset.annotate(visible=ExpressionWrapper(visible, output_field=BooleanField()))
+    reportes = _posteriores(queryset.select_related('usuario'), 'fecha_actualizacion', *cursor['c'], limite, corte)
+    eliminados = _posteriores(ReporteEliminado.objects.all(), 'fecha_eliminacion', *cursor['e'], limite, corte)
+    hay_mas = len(reportes) > limite or len(eliminados) > limite
+    reportes, eliminados = reportes[:limite], eliminados[:limite]
+
+    if reportes:
+        cursor['c'] = [reportes[-1].fecha_actualizacion, reportes[-1].pk]
+    if eliminados:
+        cursor['e'] = [eliminados[-1].fecha_eliminacion, eliminados[-1].pk]
+    lapidas = [
+        {'id': e.reporte_id, 'folio': e.folio, 'eliminado': True, 'fecha_eliminacion': e.fecha_eliminacion}
+        for e in eliminados
+    ]
+    if visible is not None:
+        lapidas += [
+            {'id': r.pk, 'folio': r.folio, 'eliminado': True, 'fecha_eliminacion': r.fecha_actualizacion}
+            for r in reportes if not r.visible
+        ]
+        reportes = [r for r in reportes if r.visible]
+    return reportes, lapidas, escribir_cursor(cursor), hay_mas
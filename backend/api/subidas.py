@@ -0,0 +1,85 @@
+import fcntl
+import os
+from pathlib import Path
+
+from django.conf import settings
+
+BLOQUE = 64 * 1024
+
+# Firmas de archivo: no confiamos en el Content-Type que manda el cliente
+FIRMAS = {
+    'image/jpeg': lambda b: b[:3] == b'\xff\xd8\xff',
+    'image/png': lambda b: b[:8] == b'\x89PNG\r\n\x1a\n',
+    'image/webp': lambda b: b[:4] == b'RIFF' and b[8:12] == b'WEBP',
+}
+EXTENSIONES = {'image/jpeg': 'jpg', 'image/png': 'png', 'image/webp': 'webp'}
+
+
+class SubidaInvalida(Exception):
+    def __init__(self, mensaje, status):
+        super().__init__(mensaje)
+        self.status = status
+
+
+def ruta_parcial(token):
+    return Path(settings.SUBIDAS_DIR) / f'{token}.part'
+
+
+# ---------------------------------------------------------------------
+# ESCRITURA EN STREAMING: del socket al disco en bloques de 64 KB
+# ---------------------------------------------------------------------
+def recibir_bloque(subida, flujo, offset, longitud):
+    """Anexa al archivo parcial lo que viene en `flujo` y regresa el nuevo offset.
+
+    Los límites (tamaño declarado, tamaño por petición, tipo real del archivo)
+    se revisan mientras llegan los bytes, no al final.
+    """
+    if offset != subida.recibido:
+        raise SubidaInvalida(f'Offset esperado: {subida.recibido}', 409)
+    if longitud is not None and offset + longitud > subida.tamano_total:
+        raise SubidaInvalida('El bloque rebasa el tamaño declarado', 413)
+
+    ruta = ruta_parcial(subida.token)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    with open(ruta, 'ab') as archivo:
+        try:
+            # Un solo PATCH a la vez por subida; el segundo recibe 409 y reintenta
+            fcntl.flock(archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise SubidaInvalida('Hay otro bloque en curso para esta subida', 409)
+        # Si un PATCH anterior se cortó, lo escrito después de `recibido` no cuenta
+        archivo.truncate(offset)
+        archivo.seek(offset)
+        escrito = 0
+        cabecera = b''
+        while True:
+            datos = flujo.read(BLOQUE)
+            if not datos:
+                break
+            escrito += len(datos)
+            if escrito > settings.SUBIDAS_MAX_BLOQUE or offset + escrito > subida.tamano_total:
+                archivo.truncate(offset)
+                raise SubidaInvalida('El bloque rebasa el tamaño permitido', 413)
+            if offset == 0 and len(cabecera) < 12:
+                cabecera += datos[:12 - len(cabecera)]
+                if len(cabecera) >= 12 or offset + escrito == subida.tamano_total:
+                    if not FIRMAS[subida.tipo_contenido](cabecera):
+                        archivo.truncate(0)
+                        raise SubidaInvalida(f'El archivo no es {subida.tipo_contenido}', 415)
+            archivo.write(datos)
+        archivo.flush()
+        os.fsync(archivo.fileno())
+    return offset + escrito
+
+
+def firma_valida(subida):
+    """Revisión final, por si el primer bloque traía menos de 12 bytes."""
+    with open(ruta_parcial(subida.token), 'rb') as archivo:
+        return FIRMAS[subida.tipo_contenido](archivo.read(12))
+
+
+def borrar_parcial(token):
+    try:
+        ruta_parcial(token).unlink()
+    except FileNotFoundError:
+        pass
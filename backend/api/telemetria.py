@@ -0,0 +1,144 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .geo import Latitud, Longitud
+from .models import Pipa, PosicionPipa
+
+
+# ---------------------------------------------------------------------
+# LECTURAS GPS: validación del lote sin un serializer por punto
+# ---------------------------------------------------------------------
+def leer_lote(datos):
+    """Convierte [{'pipa', 'fecha', 'lon', 'lat', 'velocidad'?, 'rumbo'?}, ...] en columnas.
+
+    `pipa` es el número económico, que es lo que trae configurado cada GPS.
+    """
+    if not isinstance(datos, list) or not datos:
+        raise ValidationError({'posiciones': 'Se espera una lista no vacía'})
+    if len(datos) > settings.TELEMETRIA_MAX_LOTE:
+        raise ValidationError({'posiciones': f'Máximo {settings.TELEMETRIA_MAX_LOTE} lecturas por petición'})
+
+    numeros = {str(d.get('pipa')) for d in datos if isinstance(d, dict)}
+    ids = dict(Pipa.objects.filter(numero_economico__in=numeros).values_list('numero_economico', 'id'))
+    # Tolerancia para relojes de GPS adelantados
+    limite = timezone.now() + timedelta(minutes=5)
+    columnas = {'pipa': [], 'fecha': [], 'lon': [], 'lat': [], 'velocidad': [], 'rumbo': []}
+    for i, d in enumerate(datos):
+        try:
+            pipa = ids[str(d['pipa'])]
+            fecha = parse_datetime(d['fecha'])
+            lon, lat = float(d['lon']), float(d['lat'])
+            velocidad = float(d['velocidad']) if d.get('velocidad') is not None else None
+            rumbo = float(d['rumbo']) if d.get('rumbo') is not None else None
+        except (KeyError, TypeError, ValueError):
+            raise ValidationError({'posiciones': f'Lectura {i} inválida'})
+        if fecha is None or fecha.tzinfo is None or fecha > limite:
+            raise ValidationError({'posiciones': f'Lectura {i}: fecha inválida (ISO 8601 con zona)'})
+        if not (-180 <= lon <= 180 and -90 <= lat <= 90):
+            raise ValidationError({'posiciones': f'Lectura {i}: coordenadas fuera de rango'})
+        for nombre, valor in zip(columnas, (pipa, fecha, lon, lat, velocidad, rumbo)):
+            columnas[nombre].append(valor)
+    return columnas
+
+
+# ---------------------------------------------------------------------
+# BITÁCORA: un INSERT por lote, reintentos del GPS se ignoran
+# ---------------------------------------------------------------------
+def guardar_lote(columnas):
+    """Regresa cuántas lecturas eran nuevas."""
+    tabla = PosicionPipa._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO {tabla} (pipa_id, fecha, ubicacion, velocidad, rumbo)
+            SELECT a.pipa, a.fecha, ST_SetSRID(ST_MakePoint(a.lon, a.lat), 4326), a.velocidad, a.rumbo
+            FROM unnest(%s::bigint[], %s::timestamptz[], %s::float8[], %s::float8[], %s::float8[], %s::float8[])
+                 AS a(pipa, fecha, lon, lat, velocidad, rumbo)
+            ON CONFLICT (pipa_id, fecha) DO NOTHING
+        """, [columnas[c] for c in ('pipa', 'fecha', 'lon', 'lat', 'velocidad', 'rumbo')])
+        nuevas = cursor.rowcount
+    registrar_ultimas(columnas)
+    return nuevas
+
+
+# ---------------------------------------------------------------------
+# ÚLTIMA POSICIÓN: una sola escritura por lote, con la lectura más nueva de cada pipa
+# ---------------------------------------------------------------------
+def registrar_ultimas(columnas):
+    """Vuelca a Pipa la lectura más nueva de cada pipa del lote.
+
+    Va con el mismo lote y nada se queda en memoria: con varios workers, lo
+    pendiente de una pipa que dejó de reportar nunca llegaría a la base.
+    """
+    ultimas = {}  # pipa_id -> (fecha, lon, lat)
+    for pipa, fecha, lon, lat in zip(columnas['pipa'], columnas['fecha'], columnas['lon'], columnas['lat']):
+        previa = ultimas.get(pipa)
+        if previa is None or previa[0] < fecha:
+            ultimas[pipa] = (fecha, lon, lat)
+    return volcar_ultimas(ultimas)
+
+
+def volcar_ultimas(lote):
+    """Un UPDATE para todas las pipas del lote.
+
+    La condición sobre ubicacion_fecha evita que un lote atrasado (reintentos del
+    GPS, otro worker) regrese una pipa a donde ya no está. No pasa por save()
+    ni señales: la capa de tiles 'pipas' no se cachea en disco.
+    """
+    if not lote:
+        return 0
+    tabla = Pipa._meta.db_table
+    # Mismo orden de candados en lotes concurrentes que tocan las mismas pipas
+    ids = sorted(lote)
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE {tabla} p
+            SET ubicacion_actual = ST_SetSRID(ST_MakePoint(a.lon, a.lat), 4326),
+                ubicacion_fecha = a.fecha
+            FROM unnest(%s::bigint[], %s::timestamptz[], %s::float8[], %s::float8[]) AS a(pipa, fecha, lon, lat)
+            WHERE p.id = a.pipa AND (p.ubicacion_fecha IS NULL OR p.ubicacion_fecha < a.fecha)
+        """, [ids, [lote[i][0] for i in ids], [lote[i][1] for i in ids], [lote[i][2] for i in ids]])
+        return cursor.rowcount
+
+
+# ---------------------------------------------------------------------
+# CONSULTAS: recorrido de una pipa y foto de la flota a una hora dada
+# ---------------------------------------------------------------------
+def leer_fecha(request, nombre, defecto):
+    crudo = request.query_params.get(nombre)
+    if not crudo:
+        return defecto
+    try:
+        fecha = parse_datetime(crudo)
+    except ValueError:
+        fecha = None
+    if fecha is None:
+        raise ValidationError({nombre: 'Fecha inválida (ISO 8601)'})
+    return fecha if fecha.tzinfo else timezone.make_aware(fecha)
+
+
+def _puntos(queryset):
+    return queryset.annotate(lon=Longitud('ubicacion'), lat=Latitud('ubicacion')).values(
+        'pipa_id', 'fecha', 'lon', 'lat', 'velocidad', 'rumbo',
+    )
+
+
+def recorrido(pipa_id, desde, hasta):
+    qs = PosicionPipa.objects.filter(pipa_id=pipa_id, fecha__gte=desde, fecha__lte=hasta).order_by('fecha')
+    return list(_puntos(qs)[:settings.TELEMETRIA_MAX_PUNTOS])
+
+
+def posiciones_en(fecha):
+    """Última lectura de cada pipa antes de `fecha`, dentro de la ventana configurada."""
+    inicio = fecha - timedelta(minutes=settings.TELEMETRIA_VENTANA_MINUTOS)
+    # El rango de tiempo lo resuelve el índice BRIN; DISTINCT ON se queda con la más reciente
+    qs = (
+        PosicionPipa.objects.filter(fecha__gt=inicio, fecha__lte=fecha)
+        .order_by('pipa_id', '-fecha')
+        .distinct('pipa_id')
+    )
+    return list(_puntos(qs))
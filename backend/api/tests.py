@@ -1,3 +1,1122 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point
+from django.db import connection, models
+from django.test import TestCase, TransactionTestCase
+
+from .models import Reporte, Validacion
+
+
+def crear_reporte(**kwargs):
+    datos = {
+        'ubicacion': Point(-98.88, 19.31, srid=4326),
+        'tipo_problema': 'FUGA',
+        'descripcion': 'Fuga en la banqueta',
+    }
+    datos.update(kwargs)
+    return Reporte.objects.create(**datos)
+
+
+# ---------------------------------------------------------------------
+# VALIDACIONES (voto atómico)
+# ---------------------------------------------------------------------
+class ValidacionTests(TestCase):
+    def setUp(self):
+        self.reporte = crear_reporte()
+        self.usuario = User.objects.create_user('vecino', password='x')
+
+    def test_voto_repetido_no_cuenta(self):
+        self.assertEqual(Validacion.registrar(self.reporte.pk, self.usuario.pk), (1, 'PENDIENTE'))
+        self.assertIsNone(Validacion.registrar(self.reporte.pk, self.usuario.pk))
+        self.reporte.refresh_from_db()
+        self.assertEqual((self.reporte.validaciones, self.reporte.prioridad), (1, 10))
+
+    def test_save_desde_admin_usa_el_mismo_calculo(self):
+        Validacion.objects.create(reporte=self.reporte, usuario=self.usuario)
+        self.reporte.refresh_from_db()
+        self.assertEqual((self.reporte.validaciones, self.reporte.prioridad), (1, 10))
+
+
+class ValidacionConcurrenteTests(TransactionTestCase):
+    VOTANTES = 300
+
+    def test_votos_en_paralelo_no_se_pierden(self):
+        reporte = crear_reporte()
+        usuarios = User.objects.bulk_create(
+            [User(username=f'votante{i}') for i in range(self.VOTANTES)]
+        )
+
+        def votar(usuario):
+            try:
+                return Validacion.registrar(reporte.pk, usuario.pk)
+            finally:
+                connection.close()
+
+        # Cada usuario vota dos veces: los duplicados deben rebotar
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            resultados = list(pool.map(votar, usuarios + usuarios))
+
+        reporte.refresh_from_db()
+        self.assertEqual(sum(r is not None for r in resultados), self.VOTANTES)
+        self.assertEqual(reporte.validaciones, self.VOTANTES)
+        self.assertEqual(reporte.prioridad, self.VOTANTES * Validacion.PUNTOS_POR_VOTO)
+        self.assertEqual(reporte.status, 'ASIGNADO')
+        self.assertEqual(Validacion.objects.filter(reporte=reporte).count(), self.VOTANTES)
+
+
+# ---------------------------------------------------------------------
+# LISTA RÁPIDA (mismos bytes que el serializer)
+# ---------------------------------------------------------------------
+class ListaRapidaTests(TestCase):
+    def test_mismos_bytes_que_el_serializer(self):
+        from rest_framework.renderers import JSONRenderer
+        from rest_framework.test import APIRequestFactory
+
+        from .listado import consulta, json_lista
+        from .serializers import ReporteCiudadanoSerializer
+
+        usuario = User.objects.create_user('vecino', password='x')
+        crear_reporte(usuario=usuario, foto='reportes/calle ñ.jpg', descripcion='Fuga "grande"')
+        crear_reporte(ubicacion=Point(-98.87654321098765, 19.123456789012344, srid=4326))
+        crear_reporte(ubicacion=Point(0.30000000000000004, -0.00001234, srid=4326), nota_seguimiento='Atendido')
+
+        request = APIRequestFactory().get('/api/reportes/')
+        qs = Reporte.objects.order_by('id')
+        esperado = JSONRenderer().render(
+            ReporteCiudadanoSerializer(qs, many=True, context={'request': request}).data
+        )
+        self.assertEqual(json_lista(consulta(qs), request).encode(), esperado)
+
+
+# ---------------------------------------------------------------------
+# CARGA MASIVA (COPY + validación en la base)
+# ---------------------------------------------------------------------
+class ImportacionTests(TestCase):
+    def test_csv_con_rechazos(self):
+        import io
+
+        from .importar import importar
+        from .models import EstadisticaDiaria
+
+        existente = crear_reporte()
+        texto = io.StringIO(
+            'tipo,descripcion,latitud,longitud,folio\n'
+            'fuga,Fuga en la esquina,19.31,-98.88,\n'
+            'ESCASEZ,Sin agua,19.32,-98.87,LEGADO-1\n'
+            'OTRO,x,19.31,-98.88,\n'
+            'FUGA,x,abc,-98.88,\n'
+            'FUGA,x,40.0,-98.88,\n'
+            f'FUGA,x,19.31,-98.88,{existente.folio}\n'
+        )
+        resumen = importar(texto, 'csv', progreso=lambda etapa, filas: None)
+
+        self.assertEqual((resumen['leidas'], resumen['insertadas'], resumen['rechazadas']), (6, 2, 4))
+        self.assertEqual([r['linea'] for r in resumen['rechazos']], [4, 5, 6, 7])
+        self.assertEqual(resumen['rechazos'][3]['motivo'], 'el folio ya existe')
+        nuevo = Reporte.objects.get(descripcion='Fuga en la esquina')
+        self.assertRegex(nuevo.folio, r'^IXT-[0-9A-F]{8}$')
+        self.assertTrue(Reporte.objects.filter(folio='LEGADO-1', tipo_problema='ESCASEZ').exists())
+        self.assertEqual(EstadisticaDiaria.objects.aggregate(t=models.Sum('total'))['t'], 3)
+
+
+# ---------------------------------------------------------------------
+# ROLLUP DIARIO (trigger sobre api_reporte)
+# ---------------------------------------------------------------------
+class EstadisticaDiariaTests(TestCase):
+    def assertCuadra(self):
+        from django.db.models.functions import TruncDate
+
+        from .models import EstadisticaDiaria
+
+        rollup = {
+            (f, t, s, c): n
+            for f, t, s, c, n in EstadisticaDiaria.objects.exclude(total=0)
+            .values_list('fecha', 'tipo_problema', 'status', 'colonia', 'total')
+        }
+        tabla = {
+            (f, t, s, c): n
+            for f, t, s, c, n in Reporte.objects.annotate(fecha=TruncDate('fecha_hora'))
+            .values_list('fecha', 'tipo_problema', 'status', 'colonia').annotate(n=models.Count('id'))
+        }
+        self.assertEqual(rollup, tabla)
+
+    def test_sigue_a_las_escrituras(self):
+        import io
+        from datetime import timedelta
+
+        from django.core.management import call_command
+        from django.utils import timezone
+
+        from .models import EstadisticaDiaria, PerfilCiudadano
+
+        vecino = User.objects.create_user('vecino', password='x')
+        PerfilCiudadano.objects.filter(user=vecino).update(colonia='Centro')
+        fuga = crear_reporte(usuario=vecino)
+        escasez = crear_reporte(tipo_problema='ESCASEZ')
+        otra = crear_reporte()
+        self.assertCuadra()
+
+        fuga.status = 'RESUELTO'
+        fuga.save()
+        self.assertCuadra()
+        # UPDATE directo (sin señales) de estatus y de fecha; un voto no mueve el rollup
+        Reporte.objects.filter(pk=escasez.pk).update(status='EN_PROCESO')
+        Reporte.objects.filter(pk=otra.pk).update(fecha_hora=timezone.now() - timedelta(days=3))
+        filas = EstadisticaDiaria.objects.count()
+        Reporte.objects.filter(pk=otra.pk).update(validaciones=models.F('validaciones') + 1)
+        self.assertEqual(EstadisticaDiaria.objects.count(), filas)
+        self.assertCuadra()
+
+        fuga.delete()
+        Reporte.objects.filter(tipo_problema='ESCASEZ').delete()
+        self.assertCuadra()
+
+        call_command('reconciliar_estadisticas', stdout=io.StringIO())
+        self.assertCuadra()
+
+
+# ---------------------------------------------------------------------
+# CACHÉ DE RESPUESTAS (LRU versionada)
+# ---------------------------------------------------------------------
+class RespuestaCacheTests(TestCase):
+    def test_acierto_y_edicion_del_admin(self):
+        from .models import Noticia
+        from .respuestas import respuestas
+
+        noticia = Noticia.objects.create(titulo='Corte programado', contenido='Martes')
+        primera = self.client.get('/api/noticias/', HTTP_ACCEPT='application/json')
+        aciertos = respuestas.contadores['aciertos']
+        segunda = self.client.get('/api/noticias/', HTTP_ACCEPT='application/json')
+        self.assertEqual(respuestas.contadores['aciertos'], aciertos + 1)
+        self.assertEqual(segunda.content, primera.content)
+
+        noticia.titulo = 'Corte cancelado'
+        noticia.save()
+        tercera = self.client.get('/api/noticias/', HTTP_ACCEPT='application/json')
+        self.assertIn('Corte cancelado', tercera.json()[0]['titulo'])
+
+    def test_acierto_conserva_encabezados_de_la_vista(self):
+        from django.test import override_settings
+
+        from .respuestas import respuestas
+
+        for _ in range(3):
+            crear_reporte()
+        url = '/api/reportes/?bbox=-98.9,19.3,-98.86,19.32&zoom=15'
+        with override_settings(MAPA_MAX_RESULTADOS=2, MAPA_MIN_RESULTADOS=1):
+            primera = self.client.get(url, HTTP_ACCEPT='application/json')
+            aciertos = respuestas.contadores['aciertos']
+            segunda = self.client.get(url, HTTP_ACCEPT='application/json')
+        self.assertEqual(respuestas.contadores['aciertos'], aciertos + 1)
+        self.assertEqual(primera['X-Resultados-Truncados'], 'true')
+        self.assertEqual(segunda['X-Resultados-Truncados'], 'true')
+        self.assertEqual(segunda.content, primera.content)
+
+    def test_lru_desaloja_la_mas_vieja(self):
+        from .respuestas import CacheLRU
+
+        lru = CacheLRU(max_bytes=100)
+        for i in range(10):
+            lru.guardar(f'k{i}', b'x' * 10, 'application/json', 'pozos')
+        self.assertIsNotNone(lru.obtener('k0'))
+        lru.guardar('k10', b'x' * 10, 'application/json', 'pozos')
+        self.assertIsNone(lru.obtener('k1'))
+        self.assertIsNotNone(lru.obtener('k0'))
+        self.assertEqual(lru.estado()['desalojos'], 1)
+
+
+# ---------------------------------------------------------------------
+# GET CONDICIONAL (ETag / Last-Modified desde VersionTabla)
+# ---------------------------------------------------------------------
+class GetCondicionalTests(TestCase):
+    URL = '/api/noticias/'
+
+    def setUp(self):
+        from .models import Noticia
+
+        Noticia.objects.create(titulo='Corte programado', contenido='Martes')
+
+    def test_304_con_if_none_match_y_if_modified_since(self):
+        primera = self.client.get(self.URL, HTTP_ACCEPT='application/json')
+        self.assertEqual(primera.status_code, 200)
+        por_etag = self.client.get(self.URL, HTTP_ACCEPT='application/json', HTTP_IF_NONE_MATCH=primera['ETag'])
+        self.assertEqual(por_etag.status_code, 304)
+        self.assertEqual(por_etag['ETag'], primera['ETag'])
+        por_fecha = self.client.get(
+            self.URL, HTTP_ACCEPT='application/json', HTTP_IF_MODIFIED_SINCE=primera['Last-Modified'],
+        )
+        self.assertEqual(por_fecha.status_code, 304)
+        # If-None-Match manda sobre If-Modified-Since
+        otro_etag = self.client.get(
+            self.URL, HTTP_ACCEPT='application/json',
+            HTTP_IF_NONE_MATCH='W/"0-otra"', HTTP_IF_MODIFIED_SINCE=primera['Last-Modified'],
+        )
+        self.assertEqual(otro_etag.status_code, 200)
+
+    def test_el_etag_cambia_tras_una_escritura(self):
+        from .models import Noticia
+
+        primera = self.client.get(self.URL, HTTP_ACCEPT='application/json')
+        # UPDATE directo, sin señales: solo lo ve el trigger
+        Noticia.objects.update(titulo='Corte cancelado')
+        segunda = self.client.get(self.URL, HTTP_ACCEPT='application/json', HTTP_IF_NONE_MATCH=primera['ETag'])
+        self.assertEqual(segunda.status_code, 200)
+        self.assertNotEqual(segunda['ETag'], primera['ETag'])
+        self.assertEqual(segunda.json()[0]['titulo'], 'Corte cancelado')
+
+    def test_plegar_no_cambia_la_version(self):
+        from .models import CambioTabla, Noticia, VersionTabla
+
+        Noticia.objects.update(contenido='Miércoles')
+        Noticia.objects.update(contenido='Jueves')
+        antes = VersionTabla.de(Noticia)
+        self.assertTrue(CambioTabla.objects.filter(tabla='api_noticia').exists())
+        VersionTabla.plegar('api_noticia')
+        self.assertFalse(CambioTabla.objects.filter(tabla='api_noticia').exists())
+        self.assertEqual(VersionTabla.de(Noticia), antes)
+        Noticia.objects.update(contenido='Viernes')
+        self.assertEqual(VersionTabla.de(Noticia)[0], antes[0] + 1)
+
+
+# ---------------------------------------------------------------------
+# MAPA DE CALOR (celdas hexagonales mantenidas por trigger)
+# ---------------------------------------------------------------------
+class MapaCalorTests(TestCase):
+    def test_celdas_siguen_altas_y_cambios(self):
+        import json
+
+        from .calor import mapa_calor
+
+        crear_reporte()
+        crear_reporte(descripcion='Otra fuga en la misma esquina')
+        escasez = crear_reporte(tipo_problema='ESCASEZ')
+
+        features = json.loads(mapa_calor(1000, '24h'))['features']
+        self.assertEqual(len(features), 1)
+        self.assertEqual(features[0]['properties']['por_tipo'], {'FUGA': 2, 'ESCASEZ': 1})
+
+        escasez.tipo_problema = 'FUGA'
+        escasez.save()
+        features = json.loads(mapa_calor(1000, '24h', tipos=['ESCASEZ']))['features']
+        self.assertEqual(features, [])
+
+
+# ---------------------------------------------------------------------
+# ANALÍTICA (series con huecos en cero y percentiles de resolución)
+# ---------------------------------------------------------------------
+class AnaliticaTests(TestCase):
+    def test_serie_diaria_rellena_huecos(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        from .analitica import serie
+
+        ahora = timezone.now()
+        crear_reporte()
+        viejo = crear_reporte(descripcion='Fuga de hace días')
+        Reporte.objects.filter(pk=viejo.pk).update(fecha_hora=ahora - timedelta(days=3))
+
+        totales = [total for _, _, total in serie(ahora - timedelta(days=4), ahora, 'dia')]
+        self.assertEqual(totales, [0, 1, 0, 0, 1])
+
+    def test_percentiles_de_resueltos(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        from .analitica import percentiles
+
+        ahora = timezone.now()
+        reporte = crear_reporte()
+        reporte.status = 'RESUELTO'
+        reporte.save()
+
+        [(grupo, t, resueltos, p50, p90, p95)] = percentiles(ahora - timedelta(days=1), ahora, por='tipo_problema')
+        self.assertEqual((grupo, t, resueltos), ('FUGA', None, 1))
+        self.assertIsNotNone(p50)
+        self.assertLessEqual(p50, p95)
+
+
+# ---------------------------------------------------------------------
+# DATOS SINTÉTICOS (generar_sinteticos, base de los benchmarks)
+# ---------------------------------------------------------------------
+class GeneradorSinteticosTests(TestCase):
+    def test_copy_deja_conteos_y_votos_consistentes(self):
+        import io
+
+        from django.core.management import call_command
+        from django.db.models import Sum
+
+        from .models import EstadisticaDiaria
+
+        call_command('generar_sinteticos', reportes=300, usuarios=20, pipas=3, bloque=120, stdout=io.StringIO())
+
+        self.assertEqual(Reporte.objects.count(), 300)
+        self.assertEqual(EstadisticaDiaria.objects.aggregate(t=Sum('total'))['t'], 300)
+        self.assertEqual(Validacion.objects.count(), Reporte.objects.aggregate(v=Sum('validaciones'))['v'])
+        self.assertFalse(Reporte.objects.filter(folio__isnull=True).exists())
+        self.assertFalse(Reporte.objects.filter(status='RESUELTO', fecha_resolucion__isnull=True).exists())
+
+
+# ---------------------------------------------------------------------
+# MÉTRICAS (/metrics en formato Prometheus)
+# ---------------------------------------------------------------------
+class MetricasTests(TestCase):
+    def test_peticion_queda_en_metrics_con_sql_y_serializacion(self):
+        self.client.get('/api/noticias/', HTTP_ACCEPT='application/json')
+        texto = self.client.get('/metrics').content.decode()
+
+        self.assertIn('api_http_peticiones_total{ruta="noticia-list",metodo="GET",codigo="200"}', texto)
+        self.assertIn('api_http_sql_consultas_count{ruta="noticia-list",metodo="GET"}', texto)
+        self.assertIn('api_http_serializacion_segundos_sum{ruta="noticia-list",metodo="GET"}', texto)
+        self.assertIn('api_get_condicional_total{resultado="completo"}', texto)
+        # /metrics no se mide a sí mismo
+        self.assertNotIn('ruta="metricas"', texto)
+
+    async def test_asgi_tambien_cuenta_sql(self):
+        from unittest import mock
+
+        from django.test import AsyncClient
+
+        from . import metricas
+
+        # Bajo ASGI el middleware va por _acall y la vista síncrona corre en otro hilo
+        with mock.patch.object(metricas.registro, 'observar') as observar:
+            respuesta = await AsyncClient().get('/readyz')
+        self.assertEqual(respuesta.status_code, 200)
+        valores = observar.call_args.args[3]
+        self.assertGreaterEqual(valores['api_http_sql_consultas'], 1)
+        self.assertGreater(valores['api_http_sql_segundos'], 0)
+
+
+# ---------------------------------------------------------------------
+# SERVIDOR DE PRODUCCIÓN (sondas y pool de conexiones)
+# ---------------------------------------------------------------------
+class ServidorTests(TestCase):
+    def test_sondas(self):
+        self.assertEqual(self.client.get('/healthz').status_code, 200)
+        respuesta = self.client.get('/readyz')
+        self.assertEqual((respuesta.status_code, respuesta.json()['estado']), (200, 'ok'))
+
+    def test_pool_reusa_la_conexion_entre_peticiones(self):
+        import copy
+
+        from django.db import connections
+        from django.db.utils import load_backend
+
+        configuracion = copy.deepcopy(connections.settings['default'])
+        configuracion.update(ENGINE='mysite.pool', CONN_MAX_AGE=0, POOL_MAX=2)
+        conexion = load_backend('mysite.pool').DatabaseWrapper(configuracion, alias='prueba_pool')
+        for _ in range(3):
+            with conexion.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            # Fin de petición: con CONN_MAX_AGE=0 Django la "cierra" y vuelve al pool
+            conexion.close_if_unusable_or_obsolete()
+        estado = conexion.estado_pool()
+        conexion.close()
+        self.assertEqual((estado['creadas'], estado['reusadas'], estado['libres']), (1, 2, 1))
+
+
+# ---------------------------------------------------------------------
+# DUPLICADOS AL CREAR (?forzar=1 y modo sugerir)
+# ---------------------------------------------------------------------
+class DuplicadosTests(TestCase):
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        self.existente = crear_reporte(usuario=User.objects.create_user('primero', password='x'))
+        self.cliente = APIClient()
+        self.cliente.force_authenticate(User.objects.create_user('vecino', password='x'))
+
+    def crear(self, ubicacion, tipo='FUGA'):
+        datos = {'tipo_problema': tipo, 'descripcion': 'Fuga', 'ubicacion': ubicacion}
+        return self.cliente.post('/api/reportes/', datos, format='json')
+
+    def test_duplicado_cercano_responde_409(self):
+        # ~30 m al norte del existente
+        respuesta = self.crear('POINT(-98.88 19.3103)')
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertEqual(respuesta.json()['duplicado']['folio'], self.existente.folio)
+        self.assertEqual(Reporte.objects.count(), 1)
+
+    def test_lejos_u_otro_tipo_se_crea(self):
+        self.assertEqual(self.crear('POINT(-98.87 19.32)').status_code, 201)
+        Reporte.objects.exclude(pk=self.existente.pk).delete()  # sin el anti-spam de 5 minutos
+        self.assertEqual(self.crear('POINT(-98.88 19.3103)', tipo='ESCASEZ').status_code, 201)
+
+    def test_ubicacion_invalida_es_400(self):
+        self.assertEqual(self.crear('no es un punto').status_code, 400)
+
+
+# ---------------------------------------------------------------------
+# CLUSTERS POR TILE (la caché no depende del viewport)
+# ---------------------------------------------------------------------
+class ClustersTests(TestCase):
+    def test_viewports_que_comparten_tiles(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        crear_reporte(ubicacion=Point(-98.88, 19.31, srid=4326))
+        crear_reporte(ubicacion=Point(-98.86, 19.31, srid=4326))
+
+        def total(bbox):
+            respuesta = self.client.get('/api/reportes/clusters/', {'bbox': bbox, 'zoom': 10})
+            self.assertEqual(respuesta.status_code, 200)
+            return sum(cluster['total'] for cluster in respuesta.json()['clusters'])
+
+        # El primero solo ve un reporte, pero los dos caen en los mismos tiles de zoom 10
+        self.assertEqual(total('-98.89,19.30,-98.87,19.32'), 2)
+        self.assertEqual(total('-98.89,19.30,-98.85,19.32'), 2)
+
+
+# ---------------------------------------------------------------------
+# BÚSQUEDA (?search=) con paginación por relevancia
+# ---------------------------------------------------------------------
+class BusquedaTests(TestCase):
+    def test_paginas_por_relevancia_sin_repetir_ni_saltar(self):
+        # Mismo texto: puntajes empatados, el cursor desempata por id
+        fugas = {crear_reporte(descripcion='Fuga en la esquina').pk for _ in range(5)}
+        crear_reporte(descripcion='Sin agua desde el lunes', tipo_problema='ESCASEZ')
+
+        vistos, url = [], '/api/reportes/?search=fugas&page_size=2'
+        while url:
+            datos = self.client.get(url).json()
+            vistos += [reporte['id'] for reporte in datos['results']]
+            url = datos['next']
+        self.assertEqual(len(vistos), len(fugas))
+        self.assertEqual(set(vistos), fugas)
+
+    def test_fragmento_de_folio(self):
+        buscado = crear_reporte()
+        crear_reporte()
+        datos = self.client.get('/api/reportes/', {'search': buscado.folio.lower()}).json()
+        self.assertEqual([reporte['id'] for reporte in datos['results']], [buscado.pk])
+
+
+# ---------------------------------------------------------------------
+# FEED DE CAMBIOS (?since=) con la misma visibilidad que la lista
+# ---------------------------------------------------------------------
+class CambiosTests(TestCase):
+    def test_anonimo_recibe_lapida_de_resueltos_viejos(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+        from rest_framework.test import APIClient
+
+        hace = timezone.now() - timedelta(days=60)
+        viejo = crear_reporte()
+        reciente = crear_reporte()
+        Reporte.objects.filter(pk=viejo.pk).update(status='RESUELTO', fecha_hora=hace)
+        # Fuera del margen de transacciones en vuelo del feed
+        Reporte.objects.update(fecha_actualizacion=timezone.now() - timedelta(hours=1))
+
+        anonimo = self.client.get('/api/reportes/cambios/').json()
+        self.assertEqual([r['id'] for r in anonimo['cambios']], [reciente.pk])
+        # Salió del mapa público: el cliente que lo tenía abierto lo quita
+        self.assertEqual([e['id'] for e in anonimo['eliminados']], [viejo.pk])
+
+        admin = APIClient()
+        admin.force_authenticate(User.objects.create_user('admin', password='x', is_staff=True))
+        todos = admin.get('/api/reportes/cambios/').json()
+        self.assertEqual({r['id'] for r in todos['cambios']}, {viejo.pk, reciente.pk})
+        self.assertEqual(todos['eliminados'], [])
+
+    def test_transaccion_abierta_detiene_el_corte(self):
+        from datetime import timedelta
+        from unittest import mock
+
+        from django.utils import timezone
+
+        from . import sincronizacion
+
+        # Una carga que empezó hace una hora y no ha hecho commit
+        inicio = timezone.now() - timedelta(hours=1)
+        with mock.patch.object(sincronizacion, 'connection') as conexion:
+            conexion.cursor.return_value.__enter__.return_value.fetchone.return_value = (inicio,)
+            self.assertEqual(sincronizacion.corte_seguro(), inicio)
+        self.assertLess(sincronizacion.corte_seguro(), timezone.now())
+
+
+# ---------------------------------------------------------------------
+# PIPELINE DE FOTOS (una foto que no se puede procesar no se reintenta)
+# ---------------------------------------------------------------------
+class ImagenesTests(TestCase):
+    def test_bomba_de_descompresion_queda_marcada(self):
+        import io
+        import tempfile
+        from unittest import mock
+
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from django.test import override_settings
+        from PIL import Image
+
+        from .imagenes import procesar_foto
+
+        png = io.BytesIO()
+        Image.new('RGB', (100, 100)).save(png, 'PNG')
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            nombre = default_storage.save('reportes/enorme.png', ContentFile(png.getvalue()))
+            reporte = crear_reporte(foto=nombre)
+            # 10 000 px contra un tope de 10: Pillow la trata como bomba
+            with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 10):
+                procesar_foto(Reporte, reporte.pk, 'foto', 'foto_miniatura')
+
+            reporte.refresh_from_db()
+            self.assertEqual(reporte.fotos_fallidas, ['foto'])
+            with self.captureOnCommitCallbacks() as encolados:
+                reporte.descripcion = 'Otra descripción'
+                reporte.save()
+            self.assertEqual(encolados, [])
+
+    def test_original_se_borra_solo_si_gana_el_update(self):
+        import io
+        import tempfile
+        from unittest import mock
+
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from django.test import override_settings
+        from PIL import Image
+
+        from . import imagenes
+
+        png = io.BytesIO()
+        Image.new('RGB', (100, 100)).save(png, 'PNG')
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            nombre = default_storage.save('reportes/foto.png', ContentFile(png.getvalue()))
+            reporte = crear_reporte(foto=nombre)
+            imagenes.procesar_foto(Reporte, reporte.pk, 'foto', 'foto_miniatura')
+            reporte.refresh_from_db()
+            self.assertFalse(default_storage.exists(nombre))
+            self.assertTrue(default_storage.exists(reporte.foto.name))
+            self.assertTrue(default_storage.exists(reporte.foto_miniatura.name))
+
+            # El ciudadano cambia la foto mientras se recodificaba la anterior
+            otra = default_storage.save('reportes/otra.png', ContentFile(png.getvalue()))
+            Reporte.objects.filter(pk=reporte.pk).update(foto=otra)
+            escritos, procesar = [], imagenes.procesar_archivo
+
+            def con_cambio(actual):
+                escritos.extend(procesar(actual))
+                Reporte.objects.filter(pk=reporte.pk).update(foto='reportes/nueva.png')
+                return escritos
+
+            with mock.patch.object(imagenes, 'procesar_archivo', side_effect=con_cambio):
+                imagenes.procesar_foto(Reporte, reporte.pk, 'foto', 'foto_miniatura')
+            self.assertTrue(default_storage.exists(otra))
+            self.assertEqual(len(escritos), 2)
+            self.assertFalse(any(default_storage.exists(e) for e in escritos))
+
+
+# ---------------------------------------------------------------------
+# DESPACHO DE PIPAS (asignación individual desde la API)
+# ---------------------------------------------------------------------
+class AsignarPipaTests(TestCase):
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        from .models import Pipa
+
+        self.admin = APIClient()
+        self.admin.force_authenticate(User.objects.create_user('admin', password='x', is_staff=True))
+        # ~110 km al norte: fuera de DESPACHO_MAX_KM
+        self.lejana = Pipa.objects.create(numero_economico='PIPA-01', ubicacion_actual=Point(-98.88, 20.31, srid=4326))
+
+    def asignar(self, reporte):
+        return self.admin.post(f'/api/reportes/{reporte.pk}/asignar_pipa/')
+
+    def test_solo_escasez_abierta(self):
+        from .models import Pipa
+
+        Pipa.objects.create(numero_economico='PIPA-02', ubicacion_actual=Point(-98.881, 19.31, srid=4326))
+        self.assertEqual(self.asignar(crear_reporte(tipo_problema='FUGA')).status_code, 400)
+        self.assertEqual(self.asignar(crear_reporte(tipo_problema='ESCASEZ', status='RESUELTO')).status_code, 400)
+        respuesta = self.asignar(crear_reporte(tipo_problema='ESCASEZ'))
+        self.assertEqual((respuesta.status_code, respuesta.json()['numero_economico']), (200, 'PIPA-02'))
+
+    def test_pipa_mas_lejos_que_el_tope(self):
+        reporte = crear_reporte(tipo_problema='ESCASEZ')
+        self.assertEqual(self.asignar(reporte).status_code, 409)
+        reporte.refresh_from_db()
+        self.assertIsNone(reporte.pipa_asignada_id)
+
+
+# ---------------------------------------------------------------------
+# EXPORTACIÓN EN STREAMING (CSV, GeoJSON Lines, gzip y filtros)
+# ---------------------------------------------------------------------
+class ExportacionTests(TestCase):
+    URL = '/api/admin-dashboard/exportar_reportes/'
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        self.admin = User.objects.create_user('admin', password='x', is_staff=True)
+        self.cliente = APIClient()
+        self.cliente.force_authenticate(self.admin)
+        self.fuga = crear_reporte(direccion_texto='Av. Cuauhtémoc, 12')
+        self.escasez = crear_reporte(tipo_problema='ESCASEZ', ubicacion=Point(-98.5, 19.5, srid=4326))
+
+    def cuerpo(self, respuesta):
+        return b''.join(respuesta.streaming_content)
+
+    def test_csv_con_filtro(self):
+        import csv
+        import io
+
+        respuesta = self.cliente.get(self.URL, {'tipo_problema': 'FUGA'})
+        self.assertEqual(respuesta['Content-Type'], 'text/csv')
+        filas = list(csv.reader(io.StringIO(self.cuerpo(respuesta).decode())))
+        self.assertEqual(filas[0][0], 'Folio')
+        self.assertEqual([(f[0], f[3], float(f[4]), float(f[5])) for f in filas[1:]],
+                         [(self.fuga.folio, 'Av. Cuauhtémoc, 12', 19.31, -98.88)])
+
+    def test_geojsonseq_comprimido_con_bbox(self):
+        import gzip
+        import json
+
+        respuesta = self.cliente.get(self.URL, {
+            'formato': 'geojsonseq', 'comprimir': 'gzip', 'bbox': '-98.6,19.4,-98.4,19.6',
+        })
+        self.assertEqual(respuesta['Content-Type'], 'application/gzip')
+        self.assertIn('reporte.geojsonl.gz', respuesta['Content-Disposition'])
+        registros = gzip.decompress(self.cuerpo(respuesta)).decode().split('\n')
+        self.assertEqual(registros[-1], '')
+        self.assertTrue(all(r.startswith('\x1e') for r in registros[:-1]))
+        features = [json.loads(r[1:]) for r in registros[:-1]]
+        self.assertEqual([f['properties']['folio'] for f in features], [self.escasez.folio])
+        self.assertEqual(features[0]['geometry']['coordinates'], [-98.5, 19.5])
+
+    def test_formato_y_filtro_invalidos(self):
+        self.assertEqual(self.cliente.get(self.URL, {'formato': 'xlsx'}).status_code, 400)
+        self.assertEqual(self.cliente.get(self.URL, {'fecha_desde': 'ayer'}).status_code, 400)
+
+    async def test_asgi_responde_con_iterador_async(self):
+        from django.test import AsyncClient
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        token = AccessToken.for_user(self.admin)
+        respuesta = await AsyncClient().get(self.URL, headers={'Authorization': f'Bearer {token}'})
+        self.assertTrue(respuesta.is_async)
+        cuerpo = b''.join([parte async for parte in respuesta.streaming_content]).decode()
+        self.assertIn(self.fuga.folio, cuerpo)
+        self.assertIn(self.escasez.folio, cuerpo)
+
+
+# ---------------------------------------------------------------------
+# PAGINACIÓN POR LLAVE (cursor)
+# ---------------------------------------------------------------------
+class PaginacionCursorTests(TestCase):
+    def setUp(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+        from rest_framework.test import APIClient
+
+        self.cliente = APIClient()
+        ahora = timezone.now()
+        for i, votos in enumerate([1, 0, 1, 0, 2]):
+            reporte = crear_reporte()
+            Reporte.objects.filter(pk=reporte.pk).update(
+                validaciones=votos, fecha_hora=ahora - timedelta(hours=i),
+            )
+
+    def recorrer(self, **params):
+        # Páginas de 2: el `next` ya trae los filtros y el cursor
+        folios = []
+        respuesta = self.cliente.get('/api/reportes/', {**params, 'page_size': 2}, HTTP_ACCEPT='application/json')
+        while True:
+            self.assertEqual(respuesta.status_code, 200)
+            folios += [r['folio'] for r in respuesta.json()['results']]
+            if respuesta.json()['next'] is None:
+                return folios
+            respuesta = self.cliente.get(respuesta.json()['next'], HTTP_ACCEPT='application/json')
+
+    def test_ida_y_vuelta_del_cursor(self):
+        esperado = list(Reporte.objects.order_by('-prioridad', '-fecha_hora', '-id').values_list('folio', flat=True))
+        self.assertEqual(self.recorrer(), esperado)
+
+    def test_orden_con_sentidos_mezclados(self):
+        esperado = list(Reporte.objects.order_by('validaciones', '-fecha_hora', 'id').values_list('folio', flat=True))
+        self.assertEqual(self.recorrer(ordering='validaciones,-fecha_hora'), esperado)
+
+    def test_cursor_invalido(self):
+        import base64
+        import json
+
+        def cursor(valores):
+            return base64.urlsafe_b64encode(json.dumps(valores).encode()).decode()
+
+        for crudo in ['no-es-base64!', cursor({'id': 1}), cursor([1]), cursor([0, 'ayer', 1])]:
+            with self.subTest(cursor=crudo):
+                respuesta = self.cliente.get('/api/reportes/', {'cursor': crudo}, HTTP_ACCEPT='application/json')
+                self.assertEqual(respuesta.status_code, 404)
+
+
+# ---------------------------------------------------------------------
+# TELEMETRÍA GPS (ingesta por lotes)
+# ---------------------------------------------------------------------
+class TelemetriaTests(TestCase):
+    URL = '/api/telemetria/'
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        from .models import Pipa
+
+        self.pipa = Pipa.objects.create(numero_economico='PIPA-04')
+        self.cliente = APIClient()
+        self.cliente.force_authenticate(User.objects.create_user('admin', password='x', is_staff=True))
+
+    def lectura(self, fecha, lon=-98.88, pipa='PIPA-04'):
+        return {'pipa': pipa, 'fecha': fecha, 'lon': lon, 'lat': 19.31}
+
+    def enviar(self, *lecturas):
+        return self.cliente.post(self.URL, {'posiciones': list(lecturas)}, format='json')
+
+    def test_reintentos_no_duplican(self):
+        from .models import PosicionPipa
+
+        lote = [self.lectura('2026-01-15T12:00:00Z'), self.lectura('2026-01-15T12:00:10Z')]
+        self.assertEqual(self.enviar(*lote).json(), {'recibidas': 2, 'guardadas': 2})
+        # El GPS reintenta el lote completo más una lectura nueva: ON CONFLICT ignora las repetidas
+        respuesta = self.enviar(*lote, self.lectura('2026-01-15T12:00:20Z'))
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.json(), {'recibidas': 3, 'guardadas': 1})
+        self.assertEqual(PosicionPipa.objects.filter(pipa=self.pipa).count(), 3)
+
+    def test_solo_la_posicion_mas_nueva(self):
+        from datetime import datetime, timezone as tz
+
+        self.enviar(self.lectura('2026-01-15T12:05:00Z', lon=-98.80), self.lectura('2026-01-15T12:00:00Z', lon=-98.90))
+        self.pipa.refresh_from_db()
+        self.assertEqual(self.pipa.ubicacion_actual.x, -98.80)
+        # Un lote atrasado (otro worker, reintento) no regresa la pipa
+        self.enviar(self.lectura('2026-01-15T12:01:00Z', lon=-98.70))
+        self.pipa.refresh_from_db()
+        self.assertEqual(self.pipa.ubicacion_actual.x, -98.80)
+        self.assertEqual(self.pipa.ubicacion_fecha, datetime(2026, 1, 15, 12, 5, tzinfo=tz.utc))
+
+    def test_pipa_desconocida(self):
+        from .models import PosicionPipa
+
+        respuesta = self.enviar(self.lectura('2026-01-15T12:00:00Z'), self.lectura('2026-01-15T12:00:00Z', pipa='PIPA-99'))
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('Lectura 1', str(respuesta.json()))
+        self.assertFalse(PosicionPipa.objects.exists())
+
+    def test_cuerpo_que_no_es_objeto(self):
+        for cuerpo in ([self.lectura('2026-01-15T12:00:00Z')], 7):
+            with self.subTest(cuerpo=cuerpo):
+                self.assertEqual(self.cliente.post(self.URL, cuerpo, format='json').status_code, 400)
+
+
+# ---------------------------------------------------------------------
+# PRIORIDAD (puntaje vectorizado y escritura por lotes)
+# ---------------------------------------------------------------------
+class PrioridadTests(TestCase):
+    SIN_PESOS = {'PRIORIDAD_PESO_EDAD': 0, 'PRIORIDAD_PESO_DENSIDAD': 0, 'PRIORIDAD_PESO_POZO': 0}
+
+    def test_puntaje_por_termino(self):
+        import numpy as np
+        from django.test import override_settings
+
+        from .prioridad import calcular
+
+        xy = np.array([[0.0, 0.0], [100.0, 0.0], [2000.0, 0.0]])
+        votos, edad = np.array([2, 0, 1]), np.array([0.0, 1e6, 0.0])
+        pozos = np.array([[0.0, 0.0]])
+        casos = {
+            'votos': ({}, [20, 0, 10]),
+            'edad': ({'PRIORIDAD_PESO_EDAD': 10, 'PRIORIDAD_DIAS_EDAD': 1}, [20, 10, 10]),
+            # Dos vecinos a 100 m; el tercero queda fuera del radio
+            'densidad': ({'PRIORIDAD_PESO_DENSIDAD': 10, 'PRIORIDAD_RADIO_DENSIDAD': 300}, [27, 7, 10]),
+            # 10·e^(-d/100); a 2 km (más de 3 radios) no suma
+            'pozo': ({'PRIORIDAD_PESO_POZO': 10, 'PRIORIDAD_RADIO_POZO': 100}, [30, 4, 10]),
+        }
+        for nombre, (pesos, esperado) in casos.items():
+            with self.subTest(nombre), override_settings(**{**self.SIN_PESOS, **pesos}):
+                self.assertEqual(calcular(xy, votos, edad, pozos).tolist(), esperado)
+
+    def test_escritura_por_lotes_solo_lo_distinto(self):
+        import numpy as np
+        from django.test import override_settings
+        from django.test.utils import CaptureQueriesContext
+
+        from . import prioridad
+
+        reportes = [crear_reporte() for _ in range(5)]
+        ids = np.array([r.pk for r in reportes])
+        Reporte.objects.filter(pk=reportes[4].pk).update(prioridad=40, validaciones=1)
+        antes = Reporte.objects.get(pk=reportes[4].pk).fecha_actualizacion
+        # Entra un voto entre la foto (validaciones=0) y el UPDATE
+        Reporte.objects.filter(pk=reportes[0].pk).update(validaciones=1)
+
+        with override_settings(PRIORIDAD_LOTE=2), CaptureQueriesContext(connection) as consultas:
+            actualizados = prioridad.escribir(ids, np.array([5, 6, 7, 8, 40]), np.array([0, 0, 0, 0, 1]))
+
+        # 5 filas en lotes de 2: tres UPDATE
+        self.assertEqual(sum(c['sql'].lstrip().startswith('UPDATE') for c in consultas.captured_queries), 3)
+        self.assertEqual(actualizados, 4)
+        finales = dict(Reporte.objects.filter(pk__in=ids.tolist()).values_list('pk', 'prioridad'))
+        self.assertEqual([finales[pk] for pk in ids.tolist()], [15, 6, 7, 8, 40])
+        self.assertEqual(Reporte.objects.get(pk=reportes[4].pk).fecha_actualizacion, antes)
+
+
+# ---------------------------------------------------------------------
+# VIEWPORT DEL MAPA (?bbox= y tope por zoom)
+# ---------------------------------------------------------------------
+class ViewportTests(TestCase):
+    def test_bbox_de_texto(self):
+        from rest_framework.exceptions import ValidationError
+
+        from .filtros import bbox_de_texto
+
+        self.assertIsNone(bbox_de_texto(''))
+        bbox = bbox_de_texto('-98.9,19.3,-98.8,19.4')
+        self.assertEqual((bbox.srid, bbox.extent), (4326, (-98.9, 19.3, -98.8, 19.4)))
+        for crudo in ['-98.9,19.3,-98.8', 'a,b,c,d', '-98.8,19.3,-98.9,19.4', '-98.9,19.3,-98.8,91']:
+            with self.subTest(crudo=crudo), self.assertRaises(ValidationError):
+                bbox_de_texto(crudo)
+
+    def test_tope_por_zoom(self):
+        from django.test import override_settings
+
+        from .filtros import limite_por_zoom
+
+        with override_settings(MAPA_MAX_RESULTADOS=2000, MAPA_MIN_RESULTADOS=250, MAPA_ZOOM_DETALLE=14):
+            self.assertEqual(
+                [limite_por_zoom(z) for z in (None, 18, 14, 13, 12, 11, 10, 0)],
+                [2000, 2000, 2000, 1000, 500, 250, 250, 250],
+            )
+
+    def test_solo_lo_visible_sin_truncar(self):
+        dentro = crear_reporte()
+        crear_reporte(ubicacion=Point(-99.5, 19.9, srid=4326))
+        respuesta = self.client.get(
+            '/api/reportes/', {'bbox': '-98.9,19.3,-98.86,19.32', 'zoom': 15}, HTTP_ACCEPT='application/json',
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([r['folio'] for r in respuesta.json()], [dentro.folio])
+        self.assertEqual(respuesta['X-Resultados-Truncados'], 'false')
+
+    def test_parametros_invalidos(self):
+        for params in [{'bbox': '1,2,3'}, {'bbox': '-98.9,19.3,-98.86,19.32', 'zoom': 23},
+                       {'bbox': '-98.9,19.3,-98.86,19.32', 'zoom': 'cerca'}]:
+            with self.subTest(params=params):
+                respuesta = self.client.get('/api/reportes/', params, HTTP_ACCEPT='application/json')
+                self.assertEqual(respuesta.status_code, 400)
+
+
+# ---------------------------------------------------------------------
+# TILES VECTORIALES (ST_AsMVT por capa)
+# ---------------------------------------------------------------------
+class TilesMVTTests(TestCase):
+    Z = 12
+
+    def setUp(self):
+        import tempfile
+
+        from django.test import override_settings
+
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        ajustes = override_settings(TILES_CACHE_DIR=carpeta.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def url(self, capa, lon=-98.88, lat=19.31):
+        import math
+
+        # Tile XYZ (Web Mercator) que contiene el punto
+        n = 2 ** self.Z
+        x = int((lon + 180) / 360 * n)
+        y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+        return f'/tiles/{capa}/{self.Z}/{x}/{y}.pbf'
+
+    def test_capa_publica(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        visible = crear_reporte()
+        viejo = crear_reporte(status='RESUELTO')
+        Reporte.objects.filter(pk=viejo.pk).update(fecha_hora=timezone.now() - timedelta(days=31))
+
+        respuesta = self.client.get(self.url('reportes'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Content-Type'], 'application/vnd.mapbox-vector-tile')
+        self.assertTrue(respuesta['Cache-Control'].startswith('public'))
+        # Las cadenas del MVT van tal cual en el protobuf
+        self.assertIn(visible.folio.encode(), respuesta.content)
+        self.assertNotIn(viejo.folio.encode(), respuesta.content)
+        self.assertEqual(self.client.get(self.url('reportes', lon=10, lat=10)).content, b'')
+
+        repetida = self.client.get(self.url('reportes'), HTTP_IF_NONE_MATCH=respuesta['ETag'])
+        self.assertEqual(repetida.status_code, 304)
+
+    def test_pipas_solo_staff(self):
+        from rest_framework.test import APIClient
+
+        from .models import Pipa
+
+        Pipa.objects.create(numero_economico='PIPA-04', ubicacion_actual=Point(-98.88, 19.31, srid=4326))
+        self.assertEqual(self.client.get(self.url('pipas')).status_code, 403)
+
+        admin = APIClient()
+        admin.force_authenticate(User.objects.create_user('admin', password='x', is_staff=True))
+        respuesta = admin.get(self.url('pipas'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn(b'PIPA-04', respuesta.content)
+        self.assertTrue(respuesta['Cache-Control'].startswith('private'))
+
+    def test_capa_o_coordenadas_invalidas(self):
+        for url in ['/tiles/usuarios/0/0/0.pbf', '/tiles/reportes/23/0/0.pbf', '/tiles/reportes/2/4/0.pbf']:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+
+# ---------------------------------------------------------------------
+# EVENTOS SSE (filtros y ?token=)
+# ---------------------------------------------------------------------
+class EventosTests(TestCase):
+    URL = '/api/eventos/reportes/'
+
+    def setUp(self):
+        self.vecino = User.objects.create_user('vecino', password='x')
+        self.otro = User.objects.create_user('otro', password='x')
+
+    def evento(self, folio, usuario, lon=-98.88):
+        return {
+            'evento': 'actualizado', 'id': 1, 'folio': folio, 'tipo_problema': 'FUGA', 'status': 'PENDIENTE',
+            'validaciones': 0, 'latitud': 19.31, 'longitud': lon, 'usuario_id': usuario.pk,
+        }
+
+    def test_filtro(self):
+        from .eventos import construir_filtro
+        from .filtros import bbox_de_texto
+
+        mio, ajeno = self.evento('IXT-1', self.vecino), self.evento('IXT-2', self.otro, lon=-99.5)
+        casos = [
+            (construir_filtro(None, None, None), [True, True]),
+            (construir_filtro(None, 'IXT-2', None), [False, True]),
+            (construir_filtro(None, None, self.vecino.pk), [True, False]),
+            (construir_filtro(bbox_de_texto('-98.9,19.3,-98.8,19.4'), None, None), [True, False]),
+        ]
+        for filtro, esperado in casos:
+            self.assertEqual([filtro(mio), filtro(ajeno)], esperado)
+
+    async def test_mios_requiere_token_valido(self):
+        from django.test import AsyncClient
+
+        cliente = AsyncClient()
+        self.assertEqual((await cliente.get(self.URL, {'mios': '1'})).status_code, 401)
+        self.assertEqual((await cliente.get(self.URL, {'mios': '1', 'token': 'basura'})).status_code, 401)
+        self.assertEqual((await cliente.get(self.URL, {'bbox': '1,2'})).status_code, 400)
+
+    async def test_mios_con_token_en_la_url(self):
+        import json
+        from unittest import mock
+
+        from django.test import AsyncClient
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        from . import eventos
+
+        central = eventos.difusor()
+        # Sin LISTEN real: los eventos se publican a mano
+        central.conexion = mock.Mock()
+        token = str(AccessToken.for_user(self.vecino))
+        respuesta = await AsyncClient().get(self.URL, {'mios': '1', 'token': token})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Content-Type'], 'text/event-stream')
+
+        flujo = respuesta.streaming_content
+        self.assertTrue((await anext(flujo)).startswith(b'retry:'))
+        central.publicar(self.evento('IXT-AJENO', self.otro))
+        central.publicar(self.evento('IXT-MIO', self.vecino))
+        mensaje = (await anext(flujo)).decode()
+        await flujo.aclose()
+
+        self.assertIn('event: actualizado', mensaje)
+        datos = json.loads(mensaje.split('data: ', 1)[1])
+        self.assertEqual(datos['folio'], 'IXT-MIO')
+        # El dueño no viaja en el evento público
+        self.assertNotIn('usuario_id', datos)
+
+
+# ---------------------------------------------------------------------
+# SUBIDAS REANUDABLES (PATCH por bloques con Upload-Offset)
+# ---------------------------------------------------------------------
+class SubidaTests(TestCase):
+    PNG = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 4
+
+    def setUp(self):
+        import tempfile
+
+        from django.test import override_settings
+        from rest_framework.test import APIClient
+
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        ajustes = override_settings(SUBIDAS_DIR=carpeta.name, SUBIDAS_MAX_BYTES=4096, SUBIDAS_MAX_BLOQUE=1024)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.cliente = APIClient()
+        self.cliente.force_authenticate(User.objects.create_user('vecino', password='x'))
+
+    def crear(self, tamano=None, tipo='image/png'):
+        respuesta = self.cliente.post('/api/subidas/', {'tamano': tamano or len(self.PNG), 'tipo_contenido': tipo})
+        self.assertEqual(respuesta.status_code, 201)
+        return f"/api/subidas/{respuesta.json()['token']}/"
+
+    def enviar(self, url, offset, datos):
+        return self.cliente.patch(
+            url, datos, content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_offset_equivocado(self):
+        url = self.crear()
+        self.assertEqual(self.enviar(url, 0, self.PNG[:100]).status_code, 200)
+        respuesta = self.enviar(url, 50, self.PNG[50:150])
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertEqual(respuesta['Upload-Offset'], '100')
+
+    def test_demasiado_grande(self):
+        self.assertEqual(
+            self.cliente.post('/api/subidas/', {'tamano': 5000, 'tipo_contenido': 'image/png'}).status_code, 413,
+        )
+        url = self.crear()
+        # Más de lo declarado, y más de SUBIDAS_MAX_BLOQUE en una sola petición
+        self.assertEqual(self.enviar(url, 0, self.PNG + b'x').status_code, 413)
+        self.assertEqual(self.enviar(url, 0, self.PNG[:1025]).status_code, 413)
+        self.assertEqual(self.cliente.get(url).json()['recibido'], 0)
+
+    def test_firma_que_no_corresponde(self):
+        url = self.crear(tipo='image/jpeg')
+        respuesta = self.enviar(url, 0, self.PNG[:100])
+        self.assertEqual(respuesta.status_code, 415)
+        self.assertEqual(respuesta['Upload-Offset'], '0')
+        self.assertEqual(
+            self.cliente.post('/api/subidas/', {'tamano': 10, 'tipo_contenido': 'image/gif'}).status_code, 415,
+        )
+
+    def test_reanuda_tras_un_patch_cortado(self):
+        from .models import SubidaFoto
+        from .subidas import ruta_parcial
+
+        url = self.crear()
+        self.assertEqual(self.enviar(url, 0, self.PNG[:600]).status_code, 200)
+        subida = SubidaFoto.objects.get()
+        # El siguiente PATCH escribió parte del bloque y se cortó antes de actualizar `recibido`
+        with open(ruta_parcial(subida.token), 'ab') as parcial:
+            parcial.write(b'basura a medias')
+
+        estado = self.cliente.get(url)
+        self.assertEqual((estado.json()['recibido'], estado['Upload-Offset']), (600, '600'))
+        respuesta = self.enviar(url, 600, self.PNG[600:])
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.json()['completa'])
+        self.assertEqual(ruta_parcial(subida.token).read_bytes(), self.PNG)
@@ -0,0 +1,93 @@
+import hashlib
+
+from django.conf import settings
+from django.db import connection
+from django.http import Http404, HttpResponse
+from rest_framework import permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import PermissionDenied
+
+from .cache import guardar_tile, leer_tile
+from .models import Reporte, Pozo, Pipa
+
+
+# ---------------------------------------------------------------------
+# CAPAS MVT: pocos atributos, la geometría la arma PostGIS (ST_AsMVT)
+# ---------------------------------------------------------------------
+CAPAS = {
+    'reportes': {
+        'modelo': Reporte,
+        'geom': 'ubicacion',
+        'atributos': ['id', 'folio', 'tipo_problema', 'status', 'prioridad', 'validaciones'],
+        # Mismo criterio que el mapa público: lo resuelto hace más de 30 días no sale
+        'filtro': "(t.fecha_hora >= now() - interval '30 days' OR t.status <> 'RESUELTO')",
+        'solo_staff': False,
+        'cache_disco': True,
+    },
+    'pozos': {
+        'modelo': Pozo,
+        'geom': 'ubicacion',
+        'atributos': ['id', 'nombre', 'estado'],
+        'filtro': None,
+        'solo_staff': False,
+        'cache_disco': True,
+    },
+    'pipas': {
+        'modelo': Pipa,
+        'geom': 'ubicacion_actual',
+        'atributos': ['id', 'numero_economico', 'estado', 'capacidad_litros'],
+        'filtro': 't.ubicacion_actual IS NOT NULL',
+        'solo_staff': True,
+        # Cambia cada pocos segundos con la telemetría: no vale la pena cachearla
+        'cache_disco': False,
+    },
+}
+
+
+def generar_tile(capa, z, x, y):
+    conf = CAPAS[capa]
+    geom = connection.ops.quote_name(conf['geom'])
+    atributos = ', '.join(f't.{connection.ops.quote_name(a)}' for a in conf['atributos'])
+    filtro = f"AND {conf['filtro']}" if conf['filtro'] else ''
+    sql = f"""
+        WITH limites AS (
+            SELECT ST_TileEnvelope(%s, %s, %s, margin => %s) AS envolvente
+        ), mvtgeom AS (
+            SELECT ST_AsMVTGeom(ST_Transform(t.{geom}, 3857), ST_TileEnvelope(%s, %s, %s)) AS geom,
+                   {atributos}
+            FROM {connection.ops.quote_name(conf['modelo']._meta.db_table)} t, limites
+            WHERE t.{geom} && ST_Transform(limites.envolvente, 4326) {filtro}
+        )
+        SELECT ST_AsMVT(mvtgeom.*, %s) FROM mvtgeom
+    """
+    margen = settings.TILES_MARGEN_PX / 4096
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [z, x, y, margen, z, x, y, capa])
+        fila = cursor.fetchone()
+    return bytes(fila[0]) if fila and fila[0] is not None else b''
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def tile_mvt(request, capa, z, x, y):
+    conf = CAPAS.get(capa)
+    if conf is None or not 0 <= z <= 22 or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise Http404
+    if conf['solo_staff'] and not request.user.is_staff:
+        raise PermissionDenied()
+
+    contenido = leer_tile(capa, z, x, y) if conf['cache_disco'] else None
+    if contenido is None:
+        contenido = generar_tile(capa, z, x, y)
+        if conf['cache_disco']:
+            guardar_tile(capa, z, x, y, contenido)
+
+    etag = '"%s"' % hashlib.md5(contenido).hexdigest()
+    privacidad = 'private' if conf['solo_staff'] else 'public'
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponse(status=304)
+    else:
+        response = HttpResponse(contenido, content_type='application/vnd.mapbox-vector-tile')
+    response['ETag'] = etag
+    response['Cache-Control'] = f'{privacidad}, max-age={settings.TILES_MAX_AGE}'
+    return response
@@ -1,17 +1,38 @@
-import csv
+import hmac
+import io
+from django.conf import settings
+from django.contrib.gis.geos import GEOSException, GEOSGeometry
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError
+from django.db.models import Q, Sum
 from django.http import HttpResponse
-from django.db.models.functions import TruncDate
-from django.db.models import Count, Q
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from datetime import timedelta
+from itertools import groupby
 from django.utils import timezone
 from drf_spectacular.utils import extend_schema, OpenApiTypes
 
-from .models import Reporte, Noticia, Pozo, Validacion, Pipa
+from .models import Reporte, Noticia, Pozo, Validacion, Pipa, EstadisticaDiaria, SubidaFoto, CeldaHexagonal
+from .filtros import BBoxFilter, BusquedaReporteFilter, ReporteFilter, leer_bbox, leer_zoom, limite_por_zoom
+from .analitica import DIMENSIONES, GRANULARIDADES, PERCENTILES, cubetas_en, percentiles, serie
+from .calor import VENTANAS, mapa_calor
+from .clusters import clusters_en_bbox
+from .paginacion import KeysetPagination
+from .exportar import FORMATOS, respuesta_exportacion
+from .respuestas import RespuestaCacheMixin
+from .duplicados import ReporteDuplicado, buscar_duplicado
+from .despacho import asignar_cercana, cola_escasez, despachar_lote
+from .listado import consulta, respuesta_lista, respuesta_pagina
+from .importar import ArchivoInvalido, formato_de, importar
+from .telemetria import guardar_lote, leer_fecha, leer_lote, posiciones_en, recorrido
+from .sincronizacion import cambios_desde
+from .subidas import FIRMAS, SubidaInvalida, firma_valida, recibir_bloque
 from .serializers import (
     ReporteCiudadanoSerializer, 
     ReporteAdminSerializer, # Importante
@@ -29,17 +50,30 @@ class EsDueñoOAdmin(permissions.BasePermission):
         # Solo staff puede editar/borrar
         return request.user.is_staff
 
+class EsGPSOAdmin(permissions.BasePermission):
+    # Los GPS de las pipas mandan X-Telemetria-Token; el staff también puede cargar lecturas
+    def has_permission(self, request, view):
+        enviado = request.headers.get('X-Telemetria-Token', '')
+        if settings.TELEMETRIA_TOKEN and hmac.compare_digest(enviado, settings.TELEMETRIA_TOKEN):
+            return True
+        return request.user.is_staff
+
 # ---------------------------------------------------------------------
 # VIEWSET REPORTE (DINÁMICO)
 # ---------------------------------------------------------------------
-class ReporteViewSet(viewsets.ModelViewSet):
+class ReporteViewSet(RespuestaCacheMixin, viewsets.ModelViewSet):
     queryset = Reporte.objects.all().order_by('-prioridad', '-fecha_hora')
-    parser_classes = [MultiPartParser, FormParser]
+    # Solo la lista pública va a la caché de respuestas (una entrada por combinación de filtros)
+    nombre_cache = 'reportes'
+    acciones_cache = ('list',)
+    # JSON sirve cuando la foto ya llegó por /api/subidas/ y solo se manda el token
+    parser_classes = [MultiPartParser, FormParser, JSONParser]
     permission_classes = [EsDueñoOAdmin]
+    pagination_class = KeysetPagination
     
     # Filtros
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['status', 'tipo_problema', 'usuario__username', 'folio']
+    filter_backends = [DjangoFilterBackend, BBoxFilter, BusquedaReporteFilter, filters.OrderingFilter]
+    filterset_class = ReporteFilter
     search_fields = ['descripcion', 'folio', 'direccion_texto']
     ordering_fields = ['prioridad', 'fecha_hora', 'validaciones']
 
@@ -56,46 +90,175 @@ class ReporteViewSet(viewsets.ModelViewSet):
         if ultimo:
             delta = timezone.now() - ultimo.fecha_hora
             if delta.total_seconds() < 300: # 5 minutos
-                raise serializers.ValidationError("Espera 5 minutos para reportar de nuevo.")
+                raise ValidationError("Espera 5 minutos para reportar de nuevo.")
+
+        if settings.DUPLICADOS_MODO != 'apagado' and self.request.query_params.get('forzar') not in ('1', 'true'):
+            self.revisar_duplicado(serializer.validated_data, user)
         
         if user.is_authenticated:
             serializer.save(usuario=user)
         else:
             serializer.save()
 
+    def revisar_duplicado(self, datos, user):
+        # Fugas grandes llegan como decenas de reportes a pocos metros: se agrupan en uno
+        # La ubicación llega como texto (WKT) del CharField del serializer
+        try:
+            punto = GEOSGeometry(datos['ubicacion'], srid=4326)
+        except (GEOSException, ValueError):
+            punto = None
+        if punto is None or punto.geom_type != 'Point':
+            raise ValidationError({'ubicacion': 'Ubicación inválida: se espera un punto WKT.'})
+        existente = buscar_duplicado(datos['tipo_problema'], punto)
+        if existente is None:
+            return
+        validado = False
+        if settings.DUPLICADOS_MODO == 'validar' and user.is_authenticated and existente.usuario_id != user.pk:
+            validado = Validacion.registrar(existente.pk, user.pk) is not None
+            if validado:
+                existente.refresh_from_db(fields=['validaciones', 'status'])
+        raise ReporteDuplicado(existente, validado)
+
     def get_queryset(self):
         qs = super().get_queryset()
         # Si es ciudadano normal, filtramos cosas viejas/resueltas del mapa público
-        if self.action == 'list' and not self.request.user.is_staff:
-            limite = timezone.now() - timedelta(days=30)
-            qs = qs.filter(Q(fecha_hora__gte=limite) | ~Q(status='RESUELTO'))
+        if self.action in ('list', 'clusters') and not self.request.user.is_staff:
+            qs = qs.filter(self.filtro_publico())
         return qs
 
+    def filtro_publico(self):
+        limite = timezone.now() - timedelta(days=30)
+        return Q(fecha_hora__gte=limite) | ~Q(status='RESUELTO')
+
+    def list(self, request, *args, **kwargs):
+        if leer_bbox(request) is not None:
+            return self.responder_condicional(request, self.listar_en_vista)
+        if self.lista_rapida(request):
+            return self.responder_condicional(request, self.listar_rapido)
+        return super().list(request, *args, **kwargs)
+
+    def lista_rapida(self, request):
+        # Solo el JSON compacto que consume la app; la API navegable e ?indent= van por el serializer
+        return (
+            settings.REPORTES_LISTA_RAPIDA
+            and request.accepted_renderer.format == 'json'
+            and 'indent' not in (request.accepted_media_type or '')
+        )
+
+    def paginar_rapido(self, request, queryset):
+        # values() debe traer los campos del orden para armar el cursor
+        orden = [c.lstrip('-') for c in self.paginator.get_ordering(queryset)]
+        pagina = self.paginator.paginate_queryset(consulta(queryset, extra=orden), request, view=self)
+        return respuesta_pagina(pagina, request, self.paginator.get_next_link())
+
+    def listar_rapido(self, request):
+        return self.paginar_rapido(request, self.filter_queryset(self.get_queryset()))
+
+    def listar_en_vista(self, request):
+        # Modo mapa: con ?bbox= solo va lo visible, con tope según el zoom
+        limite = limite_por_zoom(leer_zoom(request))
+        qs = self.filter_queryset(self.get_queryset())
+        if self.lista_rapida(request):
+            reportes = list(consulta(qs)[:limite + 1])
+            response = respuesta_lista(reportes[:limite], request)
+        else:
+            reportes = list(qs[:limite + 1])
+            response = Response(self.get_serializer(reportes[:limite], many=True).data)
+        response['X-Resultados-Truncados'] = 'true' if len(reportes) > limite else 'false'
+        return response
+
+    @extend_schema(responses={200: OpenApiTypes.OBJECT})
+    @action(detail=False, methods=['get'])
+    def clusters(self, request):
+        # Agregados por celda (conteo, centroide, desglose) para mapas con miles de puntos
+        bbox, zoom = leer_bbox(request), leer_zoom(request)
+        if bbox is None or zoom is None:
+            return Response({'error': 'Se requieren bbox y zoom'}, status=400)
+        # El bbox/zoom ya van en la llave del tile; el resto de filtros y el rol no
+        params = sorted((k, v) for k, v in request.query_params.lists() if k not in ('bbox', 'zoom'))
+        variante = f'{request.user.is_staff}:{params}'
+        # Sin BBoxFilter: el recorte espacial lo pone cada tile. Con él, el primer
+        # viewport guardaría tiles cortados en su orilla y los demás verían conteos de menos.
+        qs = self.get_queryset()
+        for backend in self.filter_backends:
+            if backend is not BBoxFilter:
+                qs = backend().filter_queryset(request, qs, self)
+        # Misma lectura de VersionTabla que el ETag de esta petición
+        clusters = clusters_en_bbox(qs, bbox.extent, zoom, variante, self.version_tabla()[0])
+        if clusters is None:
+            return Response({'error': 'Bbox demasiado grande para ese zoom'}, status=400)
+        return Response({'zoom': zoom, 'clusters': clusters})
+
+    @extend_schema(responses={200: OpenApiTypes.OBJECT})
+    @action(detail=False, methods=['get'])
+    def cambios(self, request):
+        # Sincronización incremental: lo creado/cambiado/borrado desde ?since=<cursor>
+        limite = KeysetPagination().get_page_size(request)
+        # Lo que sale del mapa público llega como lápida, no se omite
+        visible = None if request.user.is_staff else self.filtro_publico()
+        reportes, lapidas, cursor, hay_mas = cambios_desde(
+            self.get_queryset(), request.query_params.get('since'), limite, visible,
+        )
+        return Response({
+            'cambios': self.get_serializer(reportes, many=True).data,
+            'eliminados': lapidas,
+            'cursor': cursor,
+            'hay_mas': hay_mas,
+        })
+
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def validar(self, request, pk=None):
-        reporte = self.get_object()
-        user = request.user
-        if Validacion.objects.filter(reporte=reporte, usuario=user).exists():
+        # Un solo round trip: el INSERT del voto y el UPDATE del reporte van juntos
+        try:
+            resultado = Validacion.registrar(int(pk), request.user.pk)
+        except (ValueError, IntegrityError):
+            raise NotFound()
+        if resultado is None:
             return Response({'error': 'Ya validado'}, status=400)
-        Validacion.objects.create(reporte=reporte, usuario=user)
-        return Response({'status': 'Validado'})
+        validaciones, estatus = resultado
+        return Response({'status': 'Validado', 'validaciones': validaciones, 'estatus_reporte': estatus})
+
+    @extend_schema(responses={200: OpenApiTypes.OBJECT})
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
+    def asignar_pipa(self, request, pk=None):
+        reporte = self.get_object()
+        if reporte.pipa_asignada_id is not None:
+            return Response({'error': 'El reporte ya tiene pipa'}, status=400)
+        # La misma cola que el despacho en lote: ESCASEZ abiertos
+        if not cola_escasez(Reporte.objects.filter(pk=reporte.pk)).exists():
+            return Response({'error': 'Solo se despachan pipas a reportes de ESCASEZ abiertos'}, status=400)
+        resultado = asignar_cercana(reporte)
+        if resultado is None:
+            return Response(
+                {'error': f'No hay pipas disponibles a menos de {settings.DESPACHO_MAX_KM:g} km'}, status=409,
+            )
+        pipa, distancia_km = resultado
+        return Response({'pipa': pipa.pk, 'numero_economico': pipa.numero_economico, 'distancia_km': round(distancia_km, 2)})
 
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def mis_reportes(self, request):
-        reportes = Reporte.objects.filter(usuario=request.user)
-        serializer = self.get_serializer(reportes, many=True)
-        return Response(serializer.data)
+        return self.responder_condicional(request, self.listar_mis_reportes)
+
+    def listar_mis_reportes(self, request):
+        reportes = Reporte.objects.filter(usuario=request.user).order_by('-fecha_hora')
+        if self.lista_rapida(request):
+            return self.paginar_rapido(request, reportes)
+        pagina = self.paginate_queryset(reportes)
+        serializer = self.get_serializer(pagina, many=True)
+        return self.get_paginated_response(serializer.data)
 
 # ---------------------------------------------------------------------
 # VIEWSETS INFORMATIVOS
 # ---------------------------------------------------------------------
-class NoticiaViewSet(viewsets.ReadOnlyModelViewSet):
+class NoticiaViewSet(RespuestaCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Noticia.objects.filter(activa=True)
+    nombre_cache = 'noticias'
     serializer_class = NoticiaSerializer
     permission_classes = [permissions.AllowAny]
 
-class PozoViewSet(viewsets.ReadOnlyModelViewSet):
+class PozoViewSet(RespuestaCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Pozo.objects.all()
+    nombre_cache = 'pozos'
     serializer_class = PozoSerializer
     permission_classes = [permissions.AllowAny]
 
@@ -104,6 +267,107 @@ class PipaViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = PipaSerializer
     permission_classes = [permissions.IsAdminUser] # Solo admin ve las pipas por ahora
 
+    @extend_schema(responses={200: OpenApiTypes.OBJECT})
+    @action(detail=False, methods=['post'])
+    def despachar(self, request):
+        # Cola de la mañana: todas las pipas libres contra los reportes de ESCASEZ abiertos
+        asignaciones, pipas_libres, pendientes = despachar_lote()
+        return Response({'asignaciones': asignaciones, 'pipas_libres': pipas_libres, 'reportes_pendientes': pendientes})
+
+    @extend_schema(responses={200: OpenApiTypes.OBJECT})
+    @action(detail=True, methods=['get'])
+    def recorrido(self, request, pk=None):
+        # ?desde=&hasta= (ISO 8601); por omisión, la última hora
+        pipa = self.get_object()
+        hasta = leer_fecha(request, 'hasta', timezone.now())
+        desde = leer_fecha(request, 'desde', hasta - timedelta(hours=1))
+        return Response({'pipa': pipa.pk, 'puntos': recorrido(pipa.pk, desde, hasta)})
+
+    @extend_schema(responses={200: OpenApiTypes.OBJECT})
+    @action(detail=False, methods=['get'])
+    def posiciones(self, request):
+        # ?fecha= : dónde estaba cada pipa a esa hora (por omisión, ahora)
+        fecha = leer_fecha(request, 'fecha', timezone.now())
+        return Response({'fecha': fecha, 'posiciones': posiciones_en(fecha)})
+
+# ---------------------------------------------------------------------
+# TELEMETRÍA GPS (lotes de lecturas de las pipas)
+# ---------------------------------------------------------------------
+class TelemetriaViewSet(viewsets.ViewSet):
+    """POST {"posiciones": [{"pipa": "PIPA-04", "fecha": "...", "lon": .., "lat": ..}, ...]}"""
+    permission_classes = [EsGPSOAdmin]
+
+    @extend_schema(responses={201: OpenApiTypes.OBJECT})
+    def create(self, request):
+        # Un cuerpo JSON que no es objeto (lista, número) no trae `posiciones`
+        if not isinstance(request.data, dict):
+            return Response({'error': 'Se espera un objeto con "posiciones"'}, status=400)
+        columnas = leer_lote(request.data.get('posiciones'))
+        nuevas = guardar_lote(columnas)
+        return Response({'recibidas': len(columnas['pipa']), 'guardadas': nuevas}, status=status.HTTP_201_CREATED)
+
+# ---------------------------------------------------------------------
+# SUBIDAS REANUDABLES (foto por bloques, luego se manda el reporte con el token)
+# ---------------------------------------------------------------------
+class SubidaViewSet(viewsets.ViewSet):
+    """POST crea la subida; PATCH con `Upload-Offset` anexa un bloque crudo;
+    GET dice cuánto lleva, para reanudar tras un corte."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def _subida(self, request, pk):
+        try:
+            return SubidaFoto.objects.get(pk=pk, usuario=request.user)
+        except (SubidaFoto.DoesNotExist, DjangoValidationError):
+            raise NotFound()
+
+    def _estado(self, subida, codigo=200):
+        response = Response({
+            'token': subida.token,
+            'tamano': subida.tamano_total,
+            'recibido': subida.recibido,
+            'completa': subida.completa,
+        }, status=codigo)
+        response['Upload-Offset'] = subida.recibido
+        return response
+
+    def create(self, request):
+        SubidaFoto.objects.filter(creada__lt=timezone.now() - timedelta(hours=settings.SUBIDAS_EXPIRA_HORAS)).delete()
+        try:
+            tamano = int(request.data.get('tamano'))
+        except (TypeError, ValueError):
+            return Response({'tamano': 'Entero requerido'}, status=400)
+        tipo = request.data.get('tipo_contenido')
+        if tipo not in FIRMAS:
+            return Response({'tipo_contenido': f'Permitidos: {", ".join(FIRMAS)}'}, status=415)
+        if not 0 < tamano <= settings.SUBIDAS_MAX_BYTES:
+            return Response({'tamano': f'Máximo {settings.SUBIDAS_MAX_BYTES} bytes'}, status=413)
+        subida = SubidaFoto.objects.create(usuario=request.user, tamano_total=tamano, tipo_contenido=tipo)
+        return self._estado(subida, codigo=201)
+
+    def retrieve(self, request, pk=None):
+        return self._estado(self._subida(request, pk))
+
+    def partial_update(self, request, pk=None):
+        subida = self._subida(request, pk)
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            longitud = request.META.get('CONTENT_LENGTH')
+            longitud = int(longitud) if longitud else None
+        except ValueError:
+            return Response({'error': 'Upload-Offset y Content-Length deben ser enteros'}, status=400)
+        # Leemos el cuerpo crudo en bloques; nunca tocamos request.data
+        try:
+            nuevo = recibir_bloque(subida, request.stream or io.BytesIO(), offset, longitud)
+            if nuevo == subida.tamano_total and not firma_valida(subida):
+                raise SubidaInvalida(f'El archivo no es {subida.tipo_contenido}', 415)
+        except SubidaInvalida as error:
+            response = Response({'error': str(error)}, status=error.status)
+            response['Upload-Offset'] = subida.recibido
+            return response
+        SubidaFoto.objects.filter(pk=subida.pk, recibido=offset).update(recibido=nuevo)
+        subida.recibido = nuevo
+        return self._estado(subida)
+
 # ---------------------------------------------------------------------
 # PERFIL
 # ---------------------------------------------------------------------
@@ -129,31 +393,123 @@ class DashboardAdminViewSet(viewsets.ViewSet):
     @extend_schema(responses={200: OpenApiTypes.OBJECT})
     @action(detail=False, methods=['get'])
     def estadisticas_generales(self, request):
-        total = Reporte.objects.count()
-        pendientes = Reporte.objects.filter(status='PENDIENTE').count()
-        resueltos = Reporte.objects.filter(status='RESUELTO').count()
-        moda = Reporte.objects.values('tipo_problema').annotate(t=Count('tipo_problema')).order_by('-t').first()
-        
+        # Una sola lectura del rollup (días × tipo × estatus), no de la tabla de reportes
+        filas = EstadisticaDiaria.objects.values('tipo_problema', 'status').annotate(t=Sum('total'))
+        por_status, por_tipo = {}, {}
+        for fila in filas:
+            por_status[fila['status']] = por_status.get(fila['status'], 0) + fila['t']
+            por_tipo[fila['tipo_problema']] = por_tipo.get(fila['tipo_problema'], 0) + fila['t']
+        moda = max(por_tipo, key=por_tipo.get) if any(por_tipo.values()) else None
+
         return Response({
-            "kpis": { "total_historico": total, "pendientes_urgentes": pendientes, "resueltos": resueltos },
-            "moda_problema": { "tipo": moda['tipo_problema'] if moda else "N/A" }
+            "kpis": {
+                "total_historico": sum(por_status.values()),
+                "pendientes_urgentes": por_status.get('PENDIENTE', 0),
+                "resueltos": por_status.get('RESUELTO', 0),
+            },
+            "moda_problema": { "tipo": moda or "N/A" }
         })
 
     @extend_schema(responses={200: OpenApiTypes.OBJECT})
     @action(detail=False, methods=['get'])
     def reporte_semanal(self, request):
-        sem = timezone.now() - timedelta(days=7)
-        data = Reporte.objects.filter(fecha_hora__gte=sem)\
-            .annotate(fecha=TruncDate('fecha_hora')).values('fecha')\
-            .annotate(total=Count('id')).order_by('fecha')
-        return Response(data)
+        # Compatibilidad con la gráfica actual: analitica/?granularidad=dia de los últimos 7 días
+        data = serie(timezone.now() - timedelta(days=7), timezone.now(), 'dia')
+        return Response([{'fecha': t.date(), 'total': total} for _, t, total in data])
+
+    @extend_schema(responses={200: OpenApiTypes.OBJECT})
+    @action(detail=False, methods=['get'])
+    def analitica(self, request):
+        # ?desde=&hasta=&granularidad=hora|dia|semana|mes&por=tipo_problema|status|colonia
+        # &tipo_problema=&status=&colonia= (listas separadas por coma)
+        hasta = leer_fecha(request, 'hasta', timezone.now())
+        desde = leer_fecha(request, 'desde', hasta - timedelta(days=30))
+        granularidad = request.query_params.get('granularidad', 'dia')
+        por = request.query_params.get('por') or None
+        if granularidad not in GRANULARIDADES:
+            return Response({'error': f'Granularidad no soportada: usa {", ".join(GRANULARIDADES)}'}, status=400)
+        if por is not None and por not in DIMENSIONES:
+            return Response({'error': f'por debe ser uno de {", ".join(DIMENSIONES)}'}, status=400)
+        if desde > hasta:
+            return Response({'error': 'desde es posterior a hasta'}, status=400)
+        if cubetas_en(desde, hasta, granularidad) > settings.ANALITICA_MAX_CUBETAS:
+            return Response({'error': 'Rango demasiado grande para esa granularidad'}, status=400)
+        filtros = {
+            dimension: [v for v in request.query_params.get(dimension, '').split(',') if v]
+            for dimension in DIMENSIONES
+        }
+
+        def fecha(t):
+            return t.isoformat() if granularidad == 'hora' else t.date().isoformat()
+
+        def tiempos(resueltos, *cuantiles):
+            return {'resueltos': resueltos, **{f'p{p}_horas': c for p, c in zip(PERCENTILES, cuantiles)}}
+
+        conteos = serie(desde, hasta, granularidad, por, filtros)
+        resolucion = percentiles(desde, hasta, granularidad, por, filtros)
+        return Response({
+            'desde': desde, 'hasta': hasta, 'granularidad': granularidad, 'por': por,
+            'series': [
+                {'grupo': grupo, 'puntos': [{'t': fecha(t), 'total': total} for _, t, total in filas]}
+                for grupo, filas in groupby(conteos, key=lambda fila: fila[0])
+            ],
+            'resolucion': {
+                'total': [
+                    {'grupo': grupo, **tiempos(*resto)}
+                    for grupo, _, *resto in percentiles(desde, hasta, None, por, filtros)
+                ],
+                'series': [
+                    {'grupo': grupo, 'puntos': [{'t': fecha(t), **tiempos(*resto)} for _, t, *resto in filas]}
+                    for grupo, filas in groupby(resolucion, key=lambda fila: fila[0])
+                ],
+            },
+        })
+
+    @extend_schema(responses={200: OpenApiTypes.OBJECT})
+    @action(detail=False, methods=['get'])
+    def mapa_calor(self, request):
+        # ?ventana=24h|7d|30d&tamano=250|1000&tipo_problema=FUGA,ESCASEZ&bbox=...
+        ventana = request.query_params.get('ventana', '24h')
+        if ventana not in VENTANAS:
+            return Response({'error': f'Ventana no soportada: usa {", ".join(VENTANAS)}'}, status=400)
+        tamano = request.query_params.get('tamano', str(CeldaHexagonal.TAMANOS[-1]))
+        if not tamano.isdigit() or int(tamano) not in CeldaHexagonal.TAMANOS:
+            return Response({'error': f'Tamaño no soportado: usa {CeldaHexagonal.TAMANOS}'}, status=400)
+        tipos = [t for t in request.query_params.get('tipo_problema', '').split(',') if t]
+        validos = {clave for clave, _ in Reporte.TIPOS_PROBLEMA}
+        if not set(tipos) <= validos:
+            return Response({'error': f'tipo_problema inválido: {", ".join(sorted(set(tipos) - validos))}'}, status=400)
+        contenido = mapa_calor(int(tamano), ventana, tipos, leer_bbox(request))
+        return HttpResponse(contenido, content_type='application/geo+json')
 
     @action(detail=False, methods=['get'])
     def exportar_reportes(self, request):
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="reporte.csv"'
-        writer = csv.writer(response)
-        writer.writerow(['Folio', 'Tipo', 'Estatus', 'Dirección'])
-        for r in Reporte.objects.all():
-            writer.writerow([r.folio, r.tipo_problema, r.status, r.direccion_texto])
-        return response
\ No newline at end of file
+        # Mismos filtros que /api/reportes/ (?status, ?tipo_problema, ?fecha_desde/hasta, ?bbox)
+        formato = request.query_params.get('formato', 'csv')
+        if formato not in FORMATOS:
+            return Response({'error': f'Formato no soportado: {formato}'}, status=400)
+        filtro = ReporteFilter(request.query_params, queryset=Reporte.objects.all(), request=request)
+        if not filtro.is_valid():
+            return Response(filtro.errors, status=400)
+        qs = BBoxFilter().filter_queryset(request, filtro.qs, self)
+        comprimir = request.query_params.get('comprimir') == 'gzip'
+        # Bajo ASGI (SERVIDOR=asgi) el cuerpo tiene que ser un iterador async para ir por bloques
+        asincrono = isinstance(request._request, ASGIRequest)
+        return respuesta_exportacion(qs, formato, comprimir, asincrono)
+
+    @extend_schema(responses={200: OpenApiTypes.OBJECT, 201: OpenApiTypes.OBJECT})
+    @action(detail=False, methods=['post'], parser_classes=[MultiPartParser])
+    def importar_reportes(self, request):
+        # Carga masiva (call center / sistema anterior): multipart con `archivo` .csv o .geojson.
+        # ?simular=1 valida sin guardar. Para millones de filas: manage.py importar_reportes
+        archivo = request.FILES.get('archivo')
+        if archivo is None:
+            return Response({'error': 'Falta el archivo'}, status=400)
+        simular = request.query_params.get('simular') == '1'
+        try:
+            formato = formato_de(archivo.name)
+            texto = io.TextIOWrapper(archivo.file, encoding='utf-8-sig', newline='')
+            resumen = importar(texto, formato, simular=simular)
+        except ArchivoInvalido as error:
+            return Response({'error': str(error)}, status=400)
+        return Response(resumen, status=200 if simular else 201)
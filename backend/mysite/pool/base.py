@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+
+from django.contrib.gis.db.backends.postgis.base import DatabaseWrapper as PostGISDatabaseWrapper
+from django.db import OperationalError
+from psycopg2 import extensions
+
+
+# ---------------------------------------------------------------------
+# POOL POR PROCESO (lo comparten los hilos de un worker)
+# ---------------------------------------------------------------------
+class Pool:
+    """Conexiones ya abiertas para los hilos del worker.
+
+    Django sigue cerrando la conexión al terminar cada petición (CONN_MAX_AGE=0);
+    este backend convierte ese cierre en devolverla aquí. Con todas ocupadas se
+    espera hasta POOL_ESPERA segundos por una libre.
+    """
+
+    def __init__(self, maximo, espera, revisar):
+        self.espera = espera
+        self.revisar = revisar
+        self.pid = os.getpid()
+        self._cupo = threading.BoundedSemaphore(maximo)
+        self._candado = threading.Lock()
+        self._libres = []  # (conexión, desde cuándo está libre); la última en volver sale primero
+        self.contadores = {'creadas': 0, 'reusadas': 0, 'descartadas': 0, 'esperas_agotadas': 0}
+
+    def tomar(self, crear):
+        if not self._cupo.acquire(timeout=self.espera):
+            with self._candado:
+                self.contadores['esperas_agotadas'] += 1
+            raise OperationalError(f'Pool de conexiones agotado después de {self.espera:g} s')
+        try:
+            while True:
+                with self._candado:
+                    if not self._libres:
+                        break
+                    conexion, libre_desde = self._libres.pop()
+                if self._sana(conexion, libre_desde):
+                    with self._candado:
+                        self.contadores['reusadas'] += 1
+                    return conexion
+                self._descartar(conexion)
+            conexion = crear()
+            with self._candado:
+                self.contadores['creadas'] += 1
+            return conexion
+        except BaseException:
+            self._cupo.release()
+            raise
+
+    def devolver(self, conexion):
+        try:
+            estado = conexion.get_transaction_status() if not conexion.closed else None
+            if estado in (extensions.TRANSACTION_STATUS_INTRANS, extensions.TRANSACTION_STATUS_INERROR):
+                conexion.rollback()
+                estado = conexion.get_transaction_status()
+            if estado == extensions.TRANSACTION_STATUS_IDLE:
+                with self._candado:
+                    self._libres.append((conexion, time.monotonic()))
+                return
+            self._descartar(conexion)
+        except Exception:
+            self._descartar(conexion)
+        finally:
+            self._cupo.release()
+
+    def _sana(self, conexion, libre_desde):
+        if conexion.closed:
+            return False
+        if time.monotonic() - libre_desde < self.revisar:
+            return True
+        # Mucho tiempo sin uso: la base pudo reiniciarse o cortar por inactividad
+        try:
+            with conexion.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return True
+        except Exception:
+            return False
+
+    def _descartar(self, conexion):
+        with self._candado:
+            self.contadores['descartadas'] += 1
+        try:
+            conexion.close()
+        except Exception:
+            pass
+
+    def estado(self):
+        with self._candado:
+            return {**self.contadores, 'libres': len(self._libres)}
+
+
+_pools = {}
+_candado_pools = threading.Lock()
+
+
+def pool_de(alias, settings_dict):
+    with _candado_pools:
+        pool = _pools.get(alias)
+        # Tras un fork (gunicorn --preload) el hijo no hereda conexiones del padre
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[alias] = Pool(
+                settings_dict.get('POOL_MAX', 10), settings_dict.get('POOL_ESPERA', 10),
+                settings_dict.get('POOL_REVISAR', 30),
+            )
+        return pool
+
+
+# ---------------------------------------------------------------------
+# BACKEND: PostGIS con get_new_connection/_close contra el pool
+# ---------------------------------------------------------------------
+class DatabaseWrapper(PostGISDatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        crear = super().get_new_connection
+        return pool_de(self.alias, self.settings_dict).tomar(lambda: crear(conn_params))
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                pool_de(self.alias, self.settings_dict).devolver(self.connection)
+
+    def estado_pool(self):
+        return pool_de(self.alias, self.settings_dict).estado()
@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.gis',
+    'django.contrib.postgres',
     'django_filters',
     'rest_framework',        
     'corsheaders',
@@ -50,6 +51,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero: la latencia en /metrics incluye al resto de los middlewares
+    'api.metricas.MetricasMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -85,14 +88,30 @@ WSGI_APPLICATION = 'mysite.wsgi.application'
 
 import os
 
+# Perfil del servidor (lo lee servir.sh): desarrollo = runserver; wsgi = gunicorn
+# con hilos; asgi = uvicorn con varios workers (necesario para los eventos SSE).
+SERVIDOR = os.environ.get('SERVIDOR', 'desarrollo')
+
+# Conexiones a la base: con DB_POOL_MAX > 0 cada worker comparte un pool entre sus
+# hilos (mysite/pool) y cada petición solo toma una ya abierta; si no, una conexión
+# por hilo que vive DB_CONN_MAX_AGE segundos (0 = una nueva por petición).
+DB_POOL_MAX = int(os.environ.get('DB_POOL_MAX', 0 if SERVIDOR == 'desarrollo' else 10))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.contrib.gis.db.backends.postgis',
+        'ENGINE': 'mysite.pool' if DB_POOL_MAX else 'django.contrib.gis.db.backends.postgis',
         'NAME': os.environ.get('DB_NAME', 'hackaton_db'),
         'USER': os.environ.get('DB_USER', 'hackaton_user'),
         'PASSWORD': os.environ.get('DB_PASSWORD', 'hackaton_password'),
         'HOST': os.environ.get('DB_HOST', 'db'),
         'PORT': '5432',
+        # Con pool, "cerrar" al terminar la petición es devolverla al pool
+        'CONN_MAX_AGE': 0 if DB_POOL_MAX else int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        'CONN_HEALTH_CHECKS': True,
+        'POOL_MAX': DB_POOL_MAX,
+        # Segundos de espera por una conexión libre y de inactividad antes de revisarla con SELECT 1
+        'POOL_ESPERA': float(os.environ.get('DB_POOL_ESPERA', 10)),
+        'POOL_REVISAR': float(os.environ.get('DB_POOL_REVISAR', 30)),
     }
 }
 
@@ -151,6 +170,12 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+
+    # JSONRenderer que suma su tiempo a la serialización de /metrics
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.metricas.JSONRendererMedido',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 SPECTACULAR_SETTINGS = {
@@ -168,4 +193,116 @@ DJOSER = {
         'user': ['rest_framework.permissions.AllowAny'],
         'user_create': ['rest_framework.permissions.AllowAny'], # Cualquiera puede registrarse
     }
-}
\ No newline at end of file
+}
+
+# Mapa público (?bbox=): tope de pines por respuesta. Debajo de MAPA_ZOOM_DETALLE
+# el tope se reduce a la mitad por cada nivel de zoom, sin bajar de MAPA_MIN_RESULTADOS.
+MAPA_MAX_RESULTADOS = int(os.environ.get('MAPA_MAX_RESULTADOS', 2000))
+MAPA_MIN_RESULTADOS = int(os.environ.get('MAPA_MIN_RESULTADOS', 250))
+MAPA_ZOOM_DETALLE = int(os.environ.get('MAPA_ZOOM_DETALLE', 14))
+
+# Clusters del mapa (/api/reportes/clusters/): rejilla por tile XYZ y caché por tile.
+CLUSTERS_CELDAS_TILE = int(os.environ.get('CLUSTERS_CELDAS_TILE', 4))
+CLUSTERS_MAX_TILES = int(os.environ.get('CLUSTERS_MAX_TILES', 64))
+CLUSTERS_CACHE_SEGUNDOS = int(os.environ.get('CLUSTERS_CACHE_SEGUNDOS', 300))
+
+# Tiles vectoriales (/tiles/{capa}/{z}/{x}/{y}.pbf) y su caché en disco.
+TILES_CACHE_DIR = os.environ.get('TILES_CACHE_DIR', str(BASE_DIR / 'cache_tiles'))
+TILES_CACHE_MAX_MB = int(os.environ.get('TILES_CACHE_MAX_MB', 512))
+TILES_CACHE_ZOOM_MAX = int(os.environ.get('TILES_CACHE_ZOOM_MAX', 18))
+TILES_CACHE_SEGUNDOS = int(os.environ.get('TILES_CACHE_SEGUNDOS', 3600))
+TILES_MAX_AGE = int(os.environ.get('TILES_MAX_AGE', 60))
+TILES_MARGEN_PX = int(os.environ.get('TILES_MARGEN_PX', 64))
+
+# Paginación por llave de /api/reportes/ (?page_size= no pasa de PAGINA_TAMANO_MAX).
+PAGINA_TAMANO = int(os.environ.get('PAGINA_TAMANO', 50))
+PAGINA_TAMANO_MAX = int(os.environ.get('PAGINA_TAMANO_MAX', 500))
+
+# Feed de cambios (/api/reportes/cambios/?since=): no entrega filas más nuevas que
+# este margen, para no adelantar el cursor a transacciones sin commit.
+SINCRONIZACION_MARGEN_SEGUNDOS = int(os.environ.get('SINCRONIZACION_MARGEN_SEGUNDOS', 5))
+
+# Eventos en tiempo real (SSE en /api/eventos/reportes/).
+EVENTOS_COLA_MAX = int(os.environ.get('EVENTOS_COLA_MAX', 100))
+EVENTOS_LATIDO_SEGUNDOS = int(os.environ.get('EVENTOS_LATIDO_SEGUNDOS', 25))
+EVENTOS_REINTENTO_MS = int(os.environ.get('EVENTOS_REINTENTO_MS', 5000))
+
+# Pipeline de fotos: lado máximo de la foto recodificada y de su miniatura (px).
+IMAGENES_MAX_LADO = int(os.environ.get('IMAGENES_MAX_LADO', 1600))
+IMAGENES_MINIATURA_LADO = int(os.environ.get('IMAGENES_MINIATURA_LADO', 320))
+IMAGENES_CALIDAD = int(os.environ.get('IMAGENES_CALIDAD', 82))
+IMAGENES_WORKERS = int(os.environ.get('IMAGENES_WORKERS', 2))
+
+# Subidas reanudables (/api/subidas/): tope total, tope por PATCH y vigencia.
+SUBIDAS_DIR = os.environ.get('SUBIDAS_DIR', str(BASE_DIR / 'subidas_parciales'))
+SUBIDAS_MAX_BYTES = int(os.environ.get('SUBIDAS_MAX_BYTES', 15 * 1024 * 1024))
+SUBIDAS_MAX_BLOQUE = int(os.environ.get('SUBIDAS_MAX_BLOQUE', 2 * 1024 * 1024))
+SUBIDAS_EXPIRA_HORAS = int(os.environ.get('SUBIDAS_EXPIRA_HORAS', 24))
+
+# Detección de duplicados al crear un reporte: 'sugerir' responde 409 con el folio
+# existente, 'validar' además lo cuenta como voto; 'apagado' la desactiva.
+DUPLICADOS_MODO = os.environ.get('DUPLICADOS_MODO', 'sugerir')
+DUPLICADOS_RADIO_METROS = int(os.environ.get('DUPLICADOS_RADIO_METROS', 100))
+DUPLICADOS_VENTANA_HORAS = int(os.environ.get('DUPLICADOS_VENTANA_HORAS', 48))
+
+# Despacho de pipas: distancia máxima, cuántos km "vale" la prioridad más alta,
+# peso extra de la capacidad de la pipa y candidatos por pipa en el lote.
+DESPACHO_MAX_KM = float(os.environ.get('DESPACHO_MAX_KM', 25))
+DESPACHO_PESO_PRIORIDAD = float(os.environ.get('DESPACHO_PESO_PRIORIDAD', 5))
+DESPACHO_PESO_CAPACIDAD = float(os.environ.get('DESPACHO_PESO_CAPACIDAD', 0.5))
+DESPACHO_CANDIDATOS = int(os.environ.get('DESPACHO_CANDIDATOS', 20))
+
+# Telemetría GPS de pipas: token de los equipos, tope por lote, ventana de
+# "posición a una hora" y tope del recorrido.
+TELEMETRIA_TOKEN = os.environ.get('TELEMETRIA_TOKEN', '')
+TELEMETRIA_MAX_LOTE = int(os.environ.get('TELEMETRIA_MAX_LOTE', 5000))
+TELEMETRIA_VENTANA_MINUTOS = int(os.environ.get('TELEMETRIA_VENTANA_MINUTOS', 15))
+TELEMETRIA_MAX_PUNTOS = int(os.environ.get('TELEMETRIA_MAX_PUNTOS', 20000))
+
+# Prioridad de reportes abiertos (manage.py recalcular_prioridad): puntos máximos
+# por antigüedad y sus días característicos, peso y radio (m) de la densidad de
+# reportes vecinos, peso y distancia de decaimiento (m) de la cercanía a pozos.
+PRIORIDAD_PESO_EDAD = float(os.environ.get('PRIORIDAD_PESO_EDAD', 50))
+PRIORIDAD_DIAS_EDAD = float(os.environ.get('PRIORIDAD_DIAS_EDAD', 7))
+PRIORIDAD_PESO_DENSIDAD = float(os.environ.get('PRIORIDAD_PESO_DENSIDAD', 15))
+PRIORIDAD_RADIO_DENSIDAD = float(os.environ.get('PRIORIDAD_RADIO_DENSIDAD', 300))
+PRIORIDAD_PESO_POZO = float(os.environ.get('PRIORIDAD_PESO_POZO', 20))
+PRIORIDAD_RADIO_POZO = float(os.environ.get('PRIORIDAD_RADIO_POZO', 500))
+PRIORIDAD_LOTE = int(os.environ.get('PRIORIDAD_LOTE', 5000))
+
+# Listas de reportes en JSON armadas desde values() (api/listado.py) en lugar del
+# serializer; mismos bytes de salida. En False se regresa al serializer.
+REPORTES_LISTA_RAPIDA = os.environ.get('REPORTES_LISTA_RAPIDA', 'True') == 'True'
+
+# Carga masiva de reportes (manage.py importar_reportes y /api/admin/importar_reportes/):
+# área de servicio válida (minLon,minLat,maxLon,maxLat), cada cuántas filas se
+# informa el avance y cuántos rechazos se detallan en el resumen.
+IMPORTACION_BBOX = [float(v) for v in os.environ.get('IMPORTACION_BBOX', '-99.2,19.0,-98.6,19.6').split(',')]
+IMPORTACION_PROGRESO = int(os.environ.get('IMPORTACION_PROGRESO', 100000))
+IMPORTACION_MAX_RECHAZOS = int(os.environ.get('IMPORTACION_MAX_RECHAZOS', 1000))
+
+# Caché LRU de respuestas JSON públicas (noticias, pozos, lista de reportes), por
+# proceso: tope de memoria en MB; no se guarda una respuesta de más del 10% del tope.
+RESPUESTAS_CACHE_MAX_MB = int(os.environ.get('RESPUESTAS_CACHE_MAX_MB', 64))
+
+# Tope de puntos por serie en /dashboard/analitica/ (p. ej. ~41 días por hora)
+ANALITICA_MAX_CUBETAS = int(os.environ.get('ANALITICA_MAX_CUBETAS', 1000))
+
+# Métricas por ruta en /metrics (formato Prometheus, por proceso). Con token, el
+# scraper manda Authorization: Bearer <token>. METRICAS_LENTAS_MS > 0 manda al log
+# las peticiones más lentas que eso junto con sus consultas SQL más caras.
+METRICAS_ACTIVAS = os.environ.get('METRICAS_ACTIVAS', 'True') == 'True'
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN', '')
+METRICAS_LENTAS_MS = int(os.environ.get('METRICAS_LENTAS_MS', 0))
+
+# Logs de la app (p. ej. tasa de 304 del GET condicional) a consola.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api': {'handlers': ['console'], 'level': os.environ.get('API_LOG_LEVEL', 'INFO')},
+    },
+}
@@ -4,7 +4,11 @@ from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework.routers import DefaultRouter
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
-from api.views import ReporteViewSet, NoticiaViewSet, PozoViewSet, PerfilViewSet, DashboardAdminViewSet, PipaViewSet
+from api.views import ReporteViewSet, NoticiaViewSet, PozoViewSet, PerfilViewSet, DashboardAdminViewSet, PipaViewSet, SubidaViewSet, TelemetriaViewSet
+from api.tiles import tile_mvt
+from api.eventos import eventos_reportes
+from api.metricas import vista_metricas
+from api.salud import listo, vivo
 
 # Router para tus ViewSets (Aquí irán tus futuros endpoints)
 router = DefaultRouter()
@@ -14,14 +18,29 @@ router.register(r'pozos', PozoViewSet)
 router.register(r'perfil', PerfilViewSet, basename='perfil')
 router.register(r'admin-dashboard', DashboardAdminViewSet, basename='admin-dashboard')
 router.register(r'pipas', PipaViewSet)
+router.register(r'subidas', SubidaViewSet, basename='subidas')
+router.register(r'telemetria', TelemetriaViewSet, basename='telemetria')
 # router.register(r'ejemplo', EjemploViewSet)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     
+    # Eventos en tiempo real (SSE, requiere servidor ASGI)
+    path('api/eventos/reportes/', eventos_reportes, name='eventos-reportes'),
+
     # Rutas de la API (Tus ViewSets)
     path('api/', include(router.urls)),
+
+    # Tiles vectoriales (MVT) para las capas del mapa
+    path('tiles/<str:capa>/<int:z>/<int:x>/<int:y>.pbf', tile_mvt, name='tile-mvt'),
     
+    # Sondas del orquestador: proceso vivo / listo para tráfico (base y migraciones)
+    path('healthz', vivo, name='healthz'),
+    path('readyz', listo, name='readyz'),
+
+    # Métricas de Prometheus (por proceso)
+    path('metrics', vista_metricas, name='metricas'),
+
     # Rutas de Autenticación (Djoser)
     path('auth/', include('djoser.urls')),
     path('auth/', include('djoser.urls.jwt')),
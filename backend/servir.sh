@@ -0,0 +1,41 @@
+#!/bin/sh
+# Arranca el servidor según $SERVIDOR (el entrypoint ya esperó a la base y migró):
+#   desarrollo  runserver con autorecarga (por defecto)
+#   wsgi        gunicorn: WEB_WORKERS procesos x WEB_THREADS hilos (sin eventos SSE)
+#   asgi        uvicorn: WEB_WORKERS procesos, API y eventos SSE en el mismo puerto
+# Con wsgi/asgi, settings.py activa el pool de conexiones por worker (DB_POOL_MAX).
+# Cada worker tiene su propia caché (LocMemCache, sin CACHES compartido): las llaves
+# de clusters y de la caché de respuestas llevan la versión de VersionTabla, que sube
+# un trigger en la base, así que una escritura en un worker invalida en todos.
+# /metrics también es por worker.
+
+PUERTO=${PUERTO:-8000}
+WORKERS=${WEB_WORKERS:-$(( $(nproc) * 2 + 1 ))}
+
+case "${SERVIDOR:-desarrollo}" in
+  desarrollo)
+    exec python manage.py runserver 0.0.0.0:"$PUERTO"
+    ;;
+  wsgi)
+    # max-requests recicla workers de vez en cuando (fugas de memoria de librerías)
+    exec gunicorn mysite.wsgi:application \
+      --bind 0.0.0.0:"$PUERTO" \
+      --workers "$WORKERS" \
+      --worker-class gthread \
+      --threads "${WEB_THREADS:-4}" \
+      --timeout "${WEB_TIMEOUT:-60}" \
+      --max-requests 2000 --max-requests-jitter 200 \
+      --access-logfile -
+    ;;
+  asgi)
+    exec uvicorn mysite.asgi:application \
+      --host 0.0.0.0 --port "$PUERTO" \
+      --workers "$WORKERS" \
+      --timeout-keep-alive 5 \
+      --proxy-headers
+    ;;
+  *)
+    echo "SERVIDOR desconocido: $SERVIDOR (usa desarrollo, wsgi o asgi)" >&2
+    exit 1
+    ;;
+esac
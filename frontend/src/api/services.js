@@ -18,7 +18,19 @@ export const servicios = {
     // --- 2. GESTIÓN DE REPORTES (Ciudadano y Gobierno) ---
     reportes: {
         // Ver todos (Mapa y Lista Admin)
-        getAll: () => api.get('/api/reportes/'),
+        // Paginado por cursor: la respuesta trae { next, results }
+        getAll: (params) => api.get('/api/reportes/', { params }),
+        getPagina: (url) => api.get(url),
+
+        // Solo lo visible en el mapa: bbox = [minLon, minLat, maxLon, maxLat]
+        getEnVista: (bbox, zoom) => api.get('/api/reportes/', {
+            params: { bbox: bbox.join(','), zoom }
+        }),
+
+        // Agregados por celda para zoom bajo (conteo + centroide + desglose)
+        getClusters: (bbox, zoom) => api.get('/api/reportes/clusters/', {
+            params: { bbox: bbox.join(','), zoom }
+        }),
         
         // Ver solo los míos (Ciudadano)
         getMisReportes: () => api.get('/api/reportes/mis_reportes/'),
@@ -28,6 +40,11 @@ export const servicios = {
             headers: { 'Content-Type': 'multipart/form-data' }
         }),
         
+        // Sincronización incremental: guardar `cursor` y mandarlo en la siguiente llamada
+        getCambios: (cursor) => api.get('/api/reportes/cambios/', {
+            params: cursor ? { since: cursor } : {}
+        }),
+
         // Validar (Anti-Buzón)
         validar: (id) => api.post(`/api/reportes/${id}/validar/`),
 
@@ -38,6 +55,48 @@ export const servicios = {
         })
     },
 
+    // --- 2a. SUBIDA REANUDABLE DE FOTO (por bloques) ---
+    // Regresa el token para mandarlo como `subida` al crear el reporte
+    subidas: {
+        subirFoto: async (archivo, tamanoBloque = 512 * 1024) => {
+            const { data } = await api.post('/api/subidas/', {
+                tamano: archivo.size, tipo_contenido: archivo.type
+            })
+            let offset = data.recibido
+            while (offset < archivo.size) {
+                try {
+                    const res = await api.patch(`/api/subidas/${data.token}/`,
+                        archivo.slice(offset, offset + tamanoBloque), {
+                            headers: { 'Content-Type': 'application/offset+octet-stream', 'Upload-Offset': offset },
+                            timeout: 60000
+                        })
+                    offset = res.data.recibido
+                } catch (e) {
+                    // Corte de red: preguntamos cuánto llegó y seguimos desde ahí
+                    if (e.response && e.response.status !== 409) throw e
+                    offset = (await api.get(`/api/subidas/${data.token}/`)).data.recibido
+                }
+            }
+            return data.token
+        }
+    },
+
+    // --- 2b. TIEMPO REAL (SSE) ---
+    // filtros: { bbox: 'minLon,minLat,maxLon,maxLat' } | { folio } | { mios: 1 }
+    // Regresa el EventSource: llamar .close() al desmontar el componente
+    eventos: {
+        suscribir: (filtros, alEvento) => {
+            const params = new URLSearchParams(filtros)
+            const token = localStorage.getItem('access_token')
+            if (token) params.set('token', token)
+            const fuente = new EventSource(`${api.defaults.baseURL}/api/eventos/reportes/?${params}`)
+            for (const tipo of ['creado', 'validado', 'estatus']) {
+                fuente.addEventListener(tipo, (e) => alEvento(tipo, JSON.parse(e.data)))
+            }
+            return fuente
+        }
+    },
+
     // --- 3. RECURSOS DE GOBIERNO (PIPAS) ---
     pipas: {
         getAll: () => api.get('/api/pipas/'), // Para llenar el Select del Admin
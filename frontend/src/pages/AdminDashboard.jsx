@@ -51,12 +51,12 @@ export default function AdminDashboard() {
       const [resKpi, resGraf, resRep, resPipas] = await Promise.all([
         servicios.admin.getEstadisticas(),
         servicios.admin.getGraficaSemanal(),
-        servicios.reportes.getAll(), 
+        servicios.reportes.getAll({ page_size: 500 }),
         servicios.pipas.getAll()     
       ])
       setDashboardData(resKpi.data)
       setGrafica(resGraf.data)
-      setListaReportes(resRep.data)
+      setListaReportes(resRep.data.results)
       setListaPipas(resPipas.data)
     } catch (error) {
       toast.error("Error cargando panel")
@@ -21,6 +21,9 @@ const COLORS = {
   bg: '#F9FAFB'
 }
 
+// Vista inicial del mapa (Ixtapaluca): [minLon, minLat, maxLon, maxLat]
+const BBOX_INICIAL = [-98.98, 19.25, -98.78, 19.37]
+
 const STATUS_CONFIG = {
   'PENDIENTE': { color: 'yellow', label: 'Recibido' },
   'ASIGNADO': { color: 'blue', label: 'En Asignación' },
@@ -53,11 +56,11 @@ export default function VentanillaUnica() {
       const [perfilRes, misRepRes, todoRepRes, noticiasRes] = await Promise.all([
         servicios.auth.getPerfil(),
         servicios.reportes.getMisReportes(),
-        servicios.reportes.getAll(),
+        servicios.reportes.getEnVista(BBOX_INICIAL, 13),
         servicios.publico.getNoticias()
       ])
       setUser(perfilRes.data)
-      setMisSolicitudes(misRepRes.data)
+      setMisSolicitudes(misRepRes.data.results)
       setPuntosMapa(todoRepRes.data)
       setNoticias(noticiasRes.data || [])
     } catch (error) {
@@ -103,6 +106,12 @@ export default function VentanillaUnica() {
       setFormData({ titulo: '', tipo: 'FUGA', desc: '', direccion: '', foto: null })
       setCoords(null)
     } catch (e) {
+        // 409: ya hay un reporte abierto igual a pocos metros
+        if (e.response?.status === 409) {
+          toast.info(e.response.data.detail)
+          if (e.response.data.validado) { onClose(); cargarDatos() }
+          return
+        }
         let msg = 'Error al enviar'
         if (e.response?.data && Array.isArray(e.response.data)) msg = e.response.data[0]
         toast.error(msg)